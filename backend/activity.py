@@ -0,0 +1,127 @@
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session
+from collections import defaultdict
+from typing import Callable, Optional
+import threading
+import queue
+import os
+
+from database import ActivityEvent, SessionLocal
+
+
+# "inline" writes each event in the caller's transaction (atomic with the action).
+# "batched" defers events until the caller commits, then a background writer groups
+# them into multi-row inserts so the request path never waits on the log.
+ACTIVITY_LOG_MODE = os.getenv("ACTIVITY_LOG_MODE", "inline")
+ACTIVITY_BATCH_SIZE = int(os.getenv("ACTIVITY_BATCH_SIZE", 500))
+ACTIVITY_FLUSH_INTERVAL = float(os.getenv("ACTIVITY_FLUSH_INTERVAL", 0.5))
+
+
+# Background thread that hands queued rows to flush(db, batch) in groups, in its own session
+class BatchWriter:
+    def __init__(self, name: str, flush: Callable[[Session, list], None], batch_size: int, flush_interval: float):
+        self.name = name
+        self.flush = flush
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def enqueue(self, rows: list):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+        for row in rows:
+            self._queue.put(row)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            if batch[0] is None:
+                return
+            stop = self._drain(batch)
+            self._flush(batch)
+            if stop:
+                return
+
+    def _drain(self, batch: list) -> bool:
+        # Collect until the batch is full or the flush interval passes without new rows
+        while len(batch) < self.batch_size:
+            try:
+                row = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                return False
+            if row is None:
+                return True
+            batch.append(row)
+        return False
+
+    def _flush(self, batch: list):
+        db = SessionLocal()
+        try:
+            self.flush(db, batch)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"{self.name}: dropped batch of {len(batch)}: {e}")
+        finally:
+            db.close()
+
+    def shutdown(self, timeout: float = 5.0):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout)
+
+
+def defer_until_commit(db: Session, writer: BatchWriter, row):
+    # Rows reach the writer only if the caller's transaction commits
+    db.info.setdefault("deferred_writes", []).append((writer, row))
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _enqueue_deferred_writes(session: Session):
+    deferred = session.info.pop("deferred_writes", None)
+    if not deferred:
+        return
+    rows_by_writer = defaultdict(list)
+    for writer, row in deferred:
+        rows_by_writer[writer].append(row)
+    for writer, rows in rows_by_writer.items():
+        writer.enqueue(rows)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_deferred_writes(session: Session):
+    session.info.pop("deferred_writes", None)
+
+
+def _insert_activity(db: Session, rows: list):
+    db.execute(insert(ActivityEvent), rows)
+
+
+activity_writer = BatchWriter("activity-writer", _insert_activity, ACTIVITY_BATCH_SIZE, ACTIVITY_FLUSH_INTERVAL)
+
+
+def record_activity(
+    db: Session,
+    actor_id: int,
+    verb: str,
+    post_id: Optional[int] = None,
+    comment_id: Optional[int] = None,
+    target_user_id: Optional[int] = None,
+):
+    row = {
+        "actor_id": actor_id,
+        "verb": verb,
+        "post_id": post_id,
+        "comment_id": comment_id,
+        "target_user_id": target_user_id,
+    }
+    if ACTIVITY_LOG_MODE == "batched":
+        defer_until_commit(db, activity_writer, row)
+    else:
+        db.add(ActivityEvent(**row))
@@ -1,11 +1,11 @@
 from datetime import datetime, timedelta, timezone
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import APIRouter, HTTPException, status, Depends, Request
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-import models, database
+import models, database, replicas
+from dbpool import check_admission
 import bcrypt
 from typing import Optional
 
@@ -16,7 +16,6 @@ ACCESS_TOKEN_EXPIRE_MINUTES=30
 REFRESH_TOKEN_EXPIRE_WEEKS=24
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth_2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
 
@@ -47,6 +46,7 @@ def create_refresh_token(data: dict):
 
 
 def get_db():
+    check_admission(database.engine)
     db = database.SessionLocal()
     try:
         yield db
@@ -54,7 +54,16 @@ def get_db():
         db.close()
 
 
-def get_current_user(token: str = Depends(oauth_2_scheme), db: Session = Depends(get_db)):
+# Session for read-only routes; may be served by a replica (see replicas.py)
+def get_read_db():
+    db = replicas.new_read_session()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_user_id_from_token(token: str) -> int:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -65,14 +74,33 @@ def get_current_user(token: str = Depends(oauth_2_scheme), db: Session = Depends
         user_id: str = payload.get("sub")
         if user_id is None:
             raise credentials_exception
-    except JWTError:
+        return int(user_id)
+    except (JWTError, ValueError):
         raise credentials_exception
-    user = db.query(database.AuthUser).filter(database.AuthUser.id == int(user_id)).first()
+
+
+def load_current_user(token: str, db: Session):
+    user_id = get_user_id_from_token(token)
+    user = db.query(database.AuthUser).filter(database.AuthUser.id == user_id, database.AuthUser.deleted_at.is_(None)).first()
     if user is None:
-        raise credentials_exception
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     return user
 
 
+def get_current_user(token: str = Depends(oauth_2_scheme), db: Session = Depends(get_db)):
+    return load_current_user(token, db)
+
+
+# For read-only routes: authenticates through the route's read session, so the request
+# never checks out a primary connection when a replica serves it
+def get_current_read_user(token: str = Depends(oauth_2_scheme), db: Session = Depends(get_read_db)):
+    return load_current_user(token, db)
+
+
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -81,7 +109,7 @@ router = APIRouter(prefix="/auth", tags=["auth"])
 def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     # Check if credentials are valid
     db_user = db.query(database.AuthUser).filter(database.AuthUser.username == form_data.username).first()
-    if not db_user or not verify_password(form_data.password, db_user.hashed_password):
+    if not db_user or db_user.deleted_at is not None or not verify_password(form_data.password, db_user.hashed_password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
 
     # Immediately delete any existing refresh tokens for this user
@@ -153,7 +181,7 @@ def register(user_form: models.UserCreateInput, db: Session = Depends(get_db)):
 def login(user_form: models.UserLoginInput, db: Session = Depends(get_db)):
     # Check if credentials are valid
     db_user = db.query(database.AuthUser).filter(database.AuthUser.username == user_form.username).first()
-    if not db_user or not verify_password(user_form.password, db_user.hashed_password):
+    if not db_user or db_user.deleted_at is not None or not verify_password(user_form.password, db_user.hashed_password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
 
     # Immediately delete any existing refresh tokens for this user
@@ -229,6 +257,8 @@ def google_callback(data: models.GoogleCallbackInput, db: Session = Depends(get_
     # For now let’s pretend the Google user id is just the code
     google_id = data.code  
     user = db.query(database.AuthUser).filter(database.AuthUser.google_id == google_id).first()
+    if user and user.deleted_at is not None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Account has been deleted")
 
     if user:
         # Existing user: clear old tokens and create new ones
@@ -0,0 +1,124 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+import logging
+import re
+
+from database import AuthUser
+from replicas import new_read_session
+from auth import get_current_read_user, oauth_2_scheme
+from loaders import get_user_loader
+from serializers import FastJSONResponse, dumps
+import models
+import users
+import posts
+import tags
+
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/batch",
+    tags=["batch"],
+    dependencies=[Depends(oauth_2_scheme)]  # all routes require auth; each one resolves its user
+)
+
+
+# Query params accepted per route: name -> (default, min, max) for ints, or str for an optional string
+PAGINATION_PARAMS = {"offset": (0, 0, None), "limit": (10, 1, 50)}
+CURSOR_PARAMS = {"cursor": str, "limit": (10, 1, 50)}
+
+# Read-only routes that can be composed into a batch, matched in order
+BATCH_ROUTES = [
+    (re.compile(r"^/users/suggestions$"), users.get_user_suggestions, models.SuggestedUserResponse, {"limit": (10, 1, 100)}),
+    (re.compile(r"^/users/(?P<username>[^/]+)$"), users.get_user_profile, models.UserProfileResponse, {}),
+    (re.compile(r"^/users/(?P<username>[^/]+)/posts$"), users.get_user_posts, models.PaginatedPostsResponse, PAGINATION_PARAMS),
+    (re.compile(r"^/users/(?P<username>[^/]+)/liked-posts$"), users.get_liked_posts, models.PaginatedPostsResponse, CURSOR_PARAMS),
+    (re.compile(r"^/users/(?P<username>[^/]+)/saved-posts$"), users.get_saved_posts, models.PaginatedPostsResponse, CURSOR_PARAMS),
+    (re.compile(r"^/users/(?P<username>[^/]+)/mentions$"), users.get_mentions, models.PaginatedPostsResponse, CURSOR_PARAMS),
+    (re.compile(r"^/posts/feed$"), posts.get_feed, models.PaginatedPostsResponse, CURSOR_PARAMS),
+    (re.compile(r"^/tags/(?P<tag>[^/]+)$"), tags.get_tag_posts, models.TagPostsResponse, CURSOR_PARAMS),
+]
+
+
+def resolve_route(path: str):
+    for pattern, handler, response_model, param_spec in BATCH_ROUTES:
+        match = pattern.match(path)
+        if match:
+            return handler, response_model, param_spec, match.groupdict()
+    return None
+
+
+def parse_params(param_spec: dict, params: dict) -> dict:
+    unknown = set(params) - set(param_spec)
+    if unknown:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"Unsupported parameters: {', '.join(sorted(unknown))}")
+
+    parsed = {}
+    for name, spec in param_spec.items():
+        if spec is str:
+            value = params.get(name)
+            if value is not None and not isinstance(value, str):
+                raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"Invalid value for {name}")
+            parsed[name] = value
+            continue
+
+        default, min_value, max_value = spec
+        try:
+            value = int(params.get(name, default))
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"Invalid value for {name}")
+        if (min_value is not None and value < min_value) or (max_value is not None and value > max_value):
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"Out of range value for {name}")
+        parsed[name] = value
+    return parsed
+
+
+# ---------------------------
+# Run several read requests in one round trip
+# ---------------------------
+@router.post("", status_code=status.HTTP_200_OK)
+def run_batch(data: models.BatchRequestInput, current_user: AuthUser = Depends(get_current_read_user)):
+    # Resolve every sub-request before streaming so bad paths fail individually, not the batch
+    resolved = [(sub, resolve_route(sub.path)) for sub in data.requests]
+    user_id = current_user.id
+
+    def stream():
+        # Own session: the request-scoped one is closed before a streamed body is sent
+        db = new_read_session()
+        try:
+            viewer = db.get(AuthUser, user_id)
+
+            # Resolve every username in the batch with a single query
+            get_user_loader(db).prime(
+                route[3]["username"] for _, route in resolved if route and "username" in route[3]
+            )
+
+            for sub, route in resolved:
+                try:
+                    if route is None:
+                        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unsupported batch path")
+                    handler, response_model, param_spec, path_params = route
+                    kwargs = parse_params(param_spec, sub.params)
+                    result = handler(**path_params, **kwargs, db=db, current_user=viewer)
+                    if isinstance(result, FastJSONResponse):
+                        # Already encoded by the fast path; splice the bytes in without re-parsing
+                        body = result.body
+                    else:
+                        body = dumps(jsonable_encoder(response_model.model_validate(result), by_alias=True))
+                    status_code = status.HTTP_200_OK
+                except HTTPException as e:
+                    body = dumps({"detail": e.detail})
+                    status_code = e.status_code
+                except Exception:
+                    # The stream already answered 200: fail this item alone and leave the
+                    # session usable for the rest of the batch
+                    db.rollback()
+                    logger.exception("batch: %s failed", sub.path)
+                    body = dumps({"detail": "Internal server error"})
+                    status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+                yield b'{"id":' + dumps(sub.id) + b',"status":' + str(status_code).encode() + b',"body":' + body + b'}\n'
+        finally:
+            db.close()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
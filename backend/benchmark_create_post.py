@@ -0,0 +1,53 @@
+# Create-post throughput with the reverse geocoder on the hot path, at several simulated
+# Google latencies, against the in-process fake client. Runs offline on a scratch SQLite
+# database: python benchmark_create_post.py [posts] [threads]
+from concurrent.futures import ThreadPoolExecutor
+import tempfile
+import random
+import time
+import sys
+import os
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'benchmark.db')}")
+os.environ.setdefault("GMAPS_CLIENT", "fake")
+os.environ.setdefault("GEOCODER_POLICY", "google")
+os.environ.setdefault("RATE_LIMITS_ENABLED", "false")
+os.environ.setdefault("PURGER_ENABLED", "false")
+
+from fastapi.testclient import TestClient
+
+from utils import get_gmaps_client
+import main
+
+
+POSTS = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+THREADS = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+LATENCIES_MS = (0, 20, 100)
+
+
+def run(client: TestClient, headers: dict, latency_ms: float) -> float:
+    get_gmaps_client().latency_ms = latency_ms
+    rng = random.Random(latency_ms)
+    bodies = [
+        {"image_url": f"http://localhost:8000/static/{i}.jpg", "latitude": rng.uniform(-60, 70), "longitude": rng.uniform(-180, 180)}
+        for i in range(POSTS)
+    ]
+
+    def create(body):
+        r = client.post("/posts/create", json=body, headers=headers)
+        assert r.status_code == 201, r.text
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(THREADS) as pool:
+        list(pool.map(create, bodies))
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    with TestClient(main.app) as client:
+        r = client.post("/auth/register", json={"email": "bench@example.com", "username": "bench", "password": "benchmark"})
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        get_gmaps_client().reverse_geocode((0, 0))  # Load the dataset outside the timed runs
+        for latency_ms in LATENCIES_MS:
+            seconds = run(client, headers, latency_ms)
+            print(f"geocoder {latency_ms:>4} ms  {POSTS / seconds:8.1f} posts/s  ({POSTS} posts, {THREADS} threads)")
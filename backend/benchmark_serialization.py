@@ -0,0 +1,58 @@
+# Per-page serialization cost of a 50-post listing: the validated response_model path
+# versus FastJSONResponse. Runs offline: python benchmark_serialization.py
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from fastapi.responses import JSONResponse
+import timeit
+
+import models
+from serializers import FastJSONResponse, orjson, post_card
+
+
+PAGE_SIZE = 50
+ROUNDS = 2000
+
+
+def make_page():
+    now = datetime.now(timezone.utc)
+    posts = []
+    for i in range(PAGE_SIZE):
+        user = SimpleNamespace(
+            id=i % 7,
+            username=f"user{i % 7}",
+            profile=SimpleNamespace(avatar_url=f"http://localhost:8000/static/avatar{i % 7}.png"),
+        )
+        posts.append(SimpleNamespace(
+            id=i,
+            user=user,
+            user_id=user.id,
+            created_at=now - timedelta(minutes=i),
+            caption=f"Sunset over the bay #{i}",
+            image_url=f"http://localhost:8000/static/{i:064x}.jpg",
+            width=1080,
+            height=1350,
+            location_name="San Francisco, California, United States",
+            latitude=37.77 + i / 1000,
+            longitude=-122.41 - i / 1000,
+            likes_count=i * 3,
+            comments_count=i,
+        ))
+    return {"posts": [post_card(p, i % 2 == 0, i % 3 == 0) for i, p in enumerate(posts)], "isEnd": False}
+
+
+def validated_path(payload):
+    # What FastAPI does for a dict returned under response_model: validate, dump, stdlib json
+    content = models.PaginatedPostsResponse.model_validate(payload).model_dump(mode="json", by_alias=True)
+    return JSONResponse(content).body
+
+
+def fast_path(payload):
+    return FastJSONResponse(payload).body
+
+
+if __name__ == "__main__":
+    payload = make_page()
+    for name, fn in [("response_model + json", validated_path), ("FastJSONResponse", fast_path)]:
+        seconds = min(timeit.repeat(lambda: fn(payload), number=ROUNDS, repeat=5)) / ROUNDS
+        print(f"{name:<24} {seconds * 1e6:8.1f} us/page ({PAGE_SIZE} posts)")
+    print(f"encoder: {'orjson' if orjson is not None else 'stdlib json (install orjson for the fast path)'}")
@@ -0,0 +1,269 @@
+# Bulk post ingestion and backfills, run outside the API:
+#   python bulk_posts.py import archive.jsonl --batch-size 1000
+#   python bulk_posts.py import archive.csv
+#   python bulk_posts.py backfill-geohash
+#   python bulk_posts.py backfill-tags
+# Rows are streamed, resolved in batches (one user lookup query per batch, cached
+# geocoding) and written with multi-row inserts; UserProfile.posts_count is recounted
+# once per touched user at the end. Bulk imports skip the activity log, notifications
+# and realtime events that /posts/create emits.
+from sqlalchemy import exists, func, insert, or_, select, update
+from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Dict, Iterator, Optional
+import argparse
+import csv
+import json
+import sys
+import geohash
+
+from database import AuthUser, Post, PostMention, PostTag, UserProfile, SessionLocal, copy_post_locations
+from geocoder import get_location_name_from_coords
+from tags import index_captions
+from utils import to_utc
+
+
+# Posts within the same ~600 m cell share one geocoder call
+LOCATION_CACHE_PRECISION = 6
+
+
+def read_records(path: str, fmt: Optional[str] = None) -> Iterator[dict]:
+    fmt = fmt or ("csv" if path.endswith(".csv") else "jsonl")
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def batched(records: Iterator[dict], size: int) -> Iterator[list]:
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def parse_coord(value) -> Optional[float]:
+    if value is None or value == "":
+        return None
+    return float(value)
+
+
+class PostImporter:
+    def __init__(self, db: Session, geocode: bool = True):
+        self.db = db
+        self.geocode = geocode
+        self.user_ids: Dict[str, Optional[int]] = {}
+        self.live_user_ids: Dict[int, bool] = {}
+        self.location_names: Dict[str, str] = {}
+        self.touched_users = set()
+        self.inserted = 0
+        self.skipped = 0
+
+    def resolve_users(self, batch: list):
+        # One IN query per batch for usernames and user IDs not seen before; only live
+        # accounts resolve, so posts are never imported for a deleted or unknown user
+        usernames, ids = set(), set()
+        for record in batch:
+            if record.get("user_id"):
+                try:
+                    user_id = int(record["user_id"])
+                except (TypeError, ValueError):
+                    continue
+                if user_id not in self.live_user_ids:
+                    ids.add(user_id)
+            elif record.get("username") and record["username"] not in self.user_ids:
+                usernames.add(record["username"])
+        if usernames:
+            rows = self.db.execute(
+                select(AuthUser.username, AuthUser.id).where(AuthUser.username.in_(usernames), AuthUser.deleted_at.is_(None))
+            ).all()
+            self.user_ids.update({username: user_id for username, user_id in rows})
+            for username in usernames:
+                self.user_ids.setdefault(username, None)
+        if ids:
+            live = set(self.db.scalars(select(AuthUser.id).where(AuthUser.id.in_(ids), AuthUser.deleted_at.is_(None))))
+            self.live_user_ids.update({user_id: user_id in live for user_id in ids})
+
+    def location_name(self, lat: float, lng: float, geo_hash: str) -> str:
+        cell = geo_hash[:LOCATION_CACHE_PRECISION]
+        if cell not in self.location_names:
+            self.location_names[cell] = get_location_name_from_coords(lat, lng)
+        return self.location_names[cell]
+
+    def to_row(self, record: dict) -> Optional[dict]:
+        if record.get("user_id"):
+            user_id = int(record["user_id"])
+            if not self.live_user_ids.get(user_id):
+                return None
+        else:
+            user_id = self.user_ids.get(record.get("username"))
+        if user_id is None or not record.get("image_url"):
+            return None
+
+        lat, lng = parse_coord(record.get("latitude")), parse_coord(record.get("longitude"))
+        row = {
+            "user_id": user_id,
+            "image_url": record["image_url"],
+            "caption": record.get("caption") or None,
+            "location_name": record.get("location_name") or None,
+            "latitude": None,
+            "longitude": None,
+            "geoHash": None,
+        }
+        if lat is not None and lng is not None:
+            if not (-90 <= lat <= 90) or not (-180 <= lng <= 180):
+                return None
+            geo_hash = geohash.encode(lat, lng, precision=8)
+            row.update(latitude=lat, longitude=lng, geoHash=geo_hash)
+            if self.geocode:
+                row["location_name"] = self.location_name(lat, lng, geo_hash)
+        if record.get("created_at"):
+            # Stored as UTC: SQLite drops an offset instead of converting it
+            row["created_at"] = to_utc(datetime.fromisoformat(record["created_at"].replace("Z", "+00:00")))
+        return row
+
+    def import_batch(self, batch: list):
+        self.resolve_users(batch)
+        rows = []
+        for record in batch:
+            try:
+                row = self.to_row(record)
+            except (KeyError, TypeError, ValueError):
+                row = None
+            if row is None:
+                self.skipped += 1
+                continue
+            rows.append(row)
+            self.touched_users.add(row["user_id"])
+
+        if rows:
+            # Executemany; SQLAlchemy renders this as multi-row INSERT ... VALUES ... RETURNING
+            # batches, so only this batch's posts are indexed even while the API is inserting too
+            post_ids = self.db.scalars(insert(Post).returning(Post.id), rows).all()
+            copy_post_locations(self.db, Post.id.in_(post_ids))
+            index_captions(self.db, self.db.execute(
+                select(Post.id, Post.user_id, Post.caption, Post.created_at)
+                .where(Post.id.in_(post_ids), Post.caption.isnot(None))
+            ).all(), notify_mentions=False)
+        self.db.commit()
+        self.inserted += len(rows)
+
+    def fix_post_counts(self):
+        # Recount rather than increment so a re-run or partial import stays correct
+        post_count = (
+            select(func.count(Post.id))
+            .where(Post.user_id == UserProfile.user_id, Post.deleted_at.is_(None))
+            .scalar_subquery()
+        )
+        self.db.execute(
+            update(UserProfile)
+            .where(UserProfile.user_id.in_(self.touched_users))
+            .values(posts_count=post_count)
+        )
+        self.db.commit()
+
+
+def run_import(args):
+    db = SessionLocal()
+    importer = PostImporter(db, geocode=not args.no_geocode)
+    try:
+        for batch in batched(read_records(args.path, args.format), args.batch_size):
+            importer.import_batch(batch)
+            print(f"Imported {importer.inserted} posts ({importer.skipped} skipped)", file=sys.stderr)
+    finally:
+        # Batches already committed count even when a later one fails
+        db.rollback()
+        importer.fix_post_counts()
+        db.close()
+
+
+def run_backfill_geohash(args):
+    # Walk posts by primary key in bounded batches so each transaction stays small
+    db = SessionLocal()
+    try:
+        last_id, updated = 0, 0
+        while True:
+            rows = db.execute(
+                select(Post.id, Post.latitude, Post.longitude)
+                .where(
+                    Post.id > last_id,
+                    Post.geoHash.is_(None),
+                    Post.latitude.is_not(None),
+                    Post.longitude.is_not(None)
+                )
+                .order_by(Post.id)
+                .limit(args.batch_size)
+            ).all()
+            if not rows:
+                break
+            db.execute(
+                update(Post),
+                [{"id": post_id, "geoHash": geohash.encode(lat, lng, precision=8)} for post_id, lat, lng in rows]
+            )
+            copy_post_locations(db, Post.id.in_([post_id for post_id, _, _ in rows]))
+            db.commit()
+            last_id = rows[-1][0]
+            updated += len(rows)
+            print(f"Backfilled {updated} geohashes", file=sys.stderr)
+    finally:
+        db.close()
+
+
+def run_backfill_tags(args):
+    # Index hashtags and mentions of posts created before caption indexing existed;
+    # posts that already have tag or mention rows are skipped, so re-runs are safe
+    db = SessionLocal()
+    try:
+        last_id, indexed = 0, 0
+        while True:
+            rows = db.execute(
+                select(Post.id, Post.user_id, Post.caption, Post.created_at)
+                .where(
+                    Post.id > last_id,
+                    Post.deleted_at.is_(None),
+                    or_(Post.caption.contains("#"), Post.caption.contains("@")),
+                    ~exists().where(PostTag.post_id == Post.id),
+                    ~exists().where(PostMention.post_id == Post.id),
+                )
+                .order_by(Post.id)
+                .limit(args.batch_size)
+            ).all()
+            if not rows:
+                break
+            index_captions(db, rows, notify_mentions=False)
+            db.commit()
+            last_id = rows[-1][0]
+            indexed += len(rows)
+            print(f"Indexed captions of {indexed} posts", file=sys.stderr)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk post import and backfills")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import", help="Import posts from CSV or JSONL")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--format", choices=["csv", "jsonl"], default=None)
+    import_parser.add_argument("--batch-size", type=int, default=1000)
+    import_parser.add_argument("--no-geocode", action="store_true", help="Keep location_name from the input")
+    import_parser.set_defaults(func=run_import)
+
+    backfill_parser = commands.add_parser("backfill-geohash", help="Compute missing geohashes for existing posts")
+    backfill_parser.add_argument("--batch-size", type=int, default=1000)
+    backfill_parser.set_defaults(func=run_backfill_geohash)
+
+    tags_parser = commands.add_parser("backfill-tags", help="Index hashtags and mentions of existing posts")
+    tags_parser.add_argument("--batch-size", type=int, default=1000)
+    tags_parser.set_defaults(func=run_backfill_tags)
+
+    args = parser.parse_args()
+    args.func(args)
@@ -0,0 +1,44 @@
+from concurrent.futures import Future
+from typing import Callable, Dict, Hashable
+import threading
+
+from replicas import read_from_primary
+
+
+# Single-flight: concurrent callers with the same key share one execution of fn.
+# Only in-flight calls are shared (nothing is cached), so results are never staler than
+# the request that computed them. Results are shared objects; callers must not mutate them.
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+
+    def do(self, key: Hashable, fn: Callable):
+        with self._lock:
+            future = self._calls.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = self._calls[key] = Future()
+
+        if not is_leader:
+            return future.result()
+
+        try:
+            result = fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+# Viewer-independent reads shared by identical concurrent requests
+read_flights = SingleFlight()
+
+
+def coalesce_read(key: Hashable, fn: Callable):
+    # A client pinned to the primary after a write must not join a replica read
+    return read_flights.do((read_from_primary.get(), key), fn)
@@ -1,16 +1,52 @@
-from sqlalchemy import create_engine, Column, Integer, String, ForeignKey, DateTime, Float, inspect
+from sqlalchemy import create_engine, Column, Integer, String, ForeignKey, DateTime, Float, Boolean, Index, PrimaryKeyConstraint, event, exists, insert, inspect, literal, select, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.sql import func
+from datetime import datetime
 import os
 
+from dbpool import InstrumentedQueuePool
+
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./test.db")
+# Optional comma separated read replicas, used by read-only routes (see replicas.py)
+DATABASE_REPLICA_URLS = [u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()]
+
+
+def make_engine(url: str, **kwargs):
+    if url.startswith("sqlite"):
+        if ":memory:" not in url and url != "sqlite://":  # File databases pool like any other
+            kwargs.setdefault("poolclass", InstrumentedQueuePool)
+        sqlite_engine = create_engine(url, connect_args={"check_same_thread": False}, **kwargs)
+        event.listen(sqlite_engine, "connect", _enable_sqlite_foreign_keys)
+        return sqlite_engine
+
+    # Per-worker pool size; gunicorn.conf.py splits the connection budget across workers
+    if os.getenv("DB_POOL_SIZE"):
+        kwargs.setdefault("pool_size", int(os.getenv("DB_POOL_SIZE")))
+    if os.getenv("DB_MAX_OVERFLOW"):
+        kwargs.setdefault("max_overflow", int(os.getenv("DB_MAX_OVERFLOW")))
+    # Seconds a checkout may wait before failing; admission control (dbpool.py) sheds
+    # load well before this when the pool has a standing queue
+    kwargs.setdefault("pool_timeout", float(os.getenv("DB_POOL_TIMEOUT", 10)))
+    if os.getenv("DB_POOL_RECYCLE"):
+        kwargs.setdefault("pool_recycle", int(os.getenv("DB_POOL_RECYCLE")))
+    if os.getenv("DB_POOL_PRE_PING"):
+        kwargs.setdefault("pool_pre_ping", os.getenv("DB_POOL_PRE_PING").lower() == "true")
+    return create_engine(url, poolclass=InstrumentedQueuePool, **kwargs)
+
+
+# SQLite ignores foreign keys, ON DELETE CASCADE included, unless each connection opts in
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
 
-if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-else:
-    engine = create_engine(DATABASE_URL)
+
+engine = make_engine(DATABASE_URL)
+# Replicas ping on checkout so a dead replica is detected before a handler uses it
+replica_engines = [make_engine(url, pool_pre_ping=True) for url in DATABASE_REPLICA_URLS]
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
@@ -19,13 +55,78 @@ Base = declarative_base()
 # Ensures tables are created if they do not exist (called on app startup)
 def create_tables_if_not_exist():
     inspector = inspect(engine)
-    tables = inspector.get_table_names()
-    if not tables:
-        print("No tables found — creating them.")
-        Base.metadata.create_all(bind=engine)
+    existing_tables = set(inspector.get_table_names())
+    missing_tables = [table for table in Base.metadata.sorted_tables if table.name not in existing_tables]
+    if missing_tables:
+        print(f"Creating missing tables: {', '.join(table.name for table in missing_tables)}")
+        Base.metadata.create_all(bind=engine, tables=missing_tables)
     else:
         print("Tables already exist — skipping create_all().")
 
+    # Nullable columns and indexes added to existing tables are not covered by create_all
+    for table in Base.metadata.sorted_tables:
+        if table.name in existing_tables:
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing_columns:
+                    add_column(table, column)
+            for index in table.indexes:
+                index.create(bind=engine, checkfirst=True)
+    normalize_sqlite_timestamps()
+
+
+def add_column(table, column):
+    if not column.nullable or column.server_default is not None:
+        print(f"Skipping {table.name}.{column.name}: only nullable columns without defaults are added automatically")
+        return
+    print(f"Adding column {table.name}.{column.name}")
+    column_type = column.type.compile(dialect=engine.dialect)
+    with engine.begin() as conn:
+        conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}'))
+
+
+# SQLite keeps timestamps as text, and server_default=func.now() writes 'YYYY-MM-DD HH:MM:SS'.
+# Keyset columns that are also stamped from Python (imports, backfills) use this type, which
+# writes that same shape instead of appending microseconds, so every row compares as one
+# format and keyset_value can bind cursors in it.
+Timestamp = DateTime(timezone=True).with_variant(sqlite.DATETIME(truncate_microseconds=True), "sqlite")
+SQLITE_TIMESTAMP_LENGTH = len("YYYY-MM-DD HH:MM:SS")
+
+
+def normalize_sqlite_timestamps():
+    # Rows written with microseconds before their column used Timestamp
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for column in table.columns:
+                if column.type is Timestamp:
+                    conn.execute(
+                        table.update()
+                        .where(func.length(column) > SQLITE_TIMESTAMP_LENGTH)
+                        .values({column.name: func.substr(column, 1, SQLITE_TIMESTAMP_LENGTH)})
+                    )
+
+
+# Binds a keyset cursor value so it compares correctly against stored rows: on SQLite,
+# datetimes are bound in the exact text shape stored above, or equal timestamps compare
+# as unequal.
+def keyset_value(value):
+    if engine.dialect.name == "sqlite" and isinstance(value, datetime):
+        return literal(value.strftime("%Y-%m-%d %H:%M:%S"), String)
+    return value
+
+
+# INSERT that skips rows already present under index_elements (a primary key or unique
+# index), for get-or-create paths two workers may run at once
+def insert_ignore(db, model, index_elements: list):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(model).on_conflict_do_nothing(index_elements=index_elements)
+    if dialect == "sqlite":
+        return sqlite.insert(model).on_conflict_do_nothing(index_elements=index_elements)
+    return insert(model)
+
 
 # ======================
 # AuthUser
@@ -37,16 +138,22 @@ class AuthUser(Base):
     username = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=True)
     google_id = Column(String, unique=True, nullable=True)
+    # Set on account deletion; purger.py removes the account and its rows later
+    deleted_at = Column(DateTime(timezone=True), nullable=True, index=True)
+    # Bumped by likes and saves; versions cached engagement snapshots (see engagement.py)
+    engagement_version = Column(Integer, nullable=True)
+    # Bumped by follows, unfollows and new posts; versions cached feed rankings (see feed_ranking.py)
+    feed_version = Column(Integer, nullable=True)
 
-    refresh_tokens = relationship("AuthRefreshToken", back_populates="user", cascade="all, delete-orphan")
-    posts = relationship("Post", back_populates="user", cascade="all, delete-orphan")
-    profile = relationship("UserProfile", back_populates="user", uselist=False, cascade="all, delete-orphan")
-    post_likes = relationship("PostLike", back_populates="user", cascade="all, delete-orphan")
-    comment_likes = relationship("CommentLike", back_populates="user", cascade="all, delete-orphan")
-    saved_posts = relationship("SavedPost", back_populates="user", cascade="all, delete-orphan")
-    comments = relationship("Comment", back_populates="user", cascade="all, delete-orphan")
-    followers = relationship("Following", foreign_keys="[Following.following_id]", back_populates="following", cascade="all, delete-orphan")
-    following = relationship("Following", foreign_keys="[Following.follower_id]", back_populates="follower", cascade="all, delete-orphan")
+    refresh_tokens = relationship("AuthRefreshToken", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    posts = relationship("Post", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    profile = relationship("UserProfile", back_populates="user", uselist=False, cascade="all, delete-orphan", passive_deletes=True)
+    post_likes = relationship("PostLike", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    comment_likes = relationship("CommentLike", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    saved_posts = relationship("SavedPost", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    comments = relationship("Comment", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    followers = relationship("Following", foreign_keys="[Following.following_id]", back_populates="following", cascade="all, delete-orphan", passive_deletes=True)
+    following = relationship("Following", foreign_keys="[Following.follower_id]", back_populates="follower", cascade="all, delete-orphan", passive_deletes=True)
 
 
 # ======================
@@ -55,7 +162,7 @@ class AuthUser(Base):
 class AuthRefreshToken(Base):
     __tablename__ = "auth_refresh_tokens"
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("auth_users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("auth_users.id", ondelete="CASCADE"), nullable=False)
     token = Column(String, unique=True, index=True, nullable=False)
     user_agent = Column(String, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -69,35 +176,50 @@ class AuthRefreshToken(Base):
 class Post(Base):
     __tablename__ = "posts"
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("auth_users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("auth_users.id", ondelete="CASCADE"), nullable=False)
     image_url = Column(String, nullable=False)
     caption = Column(String, nullable=True)
     geoHash = Column(String, nullable=True)
     location_name = Column(String, nullable=True)
     latitude = Column(Float, nullable=True)
     longitude = Column(Float, nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(Timestamp, server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     likes_count = Column(Integer, default=0)
     comments_count = Column(Integer, default=0)
+    # Copied from the uploaded media so clients can lay out feeds before images load
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+    # Set on delete; hidden from reads immediately, removed by purger.py later
+    deleted_at = Column(DateTime(timezone=True), nullable=True, index=True)
 
     user = relationship("AuthUser", back_populates="posts")
-    likes = relationship("PostLike", back_populates="post", cascade="all, delete-orphan")
-    comments = relationship("Comment", back_populates="post", cascade="all, delete-orphan")
-    saved_by = relationship("SavedPost", back_populates="post", cascade="all, delete-orphan")
+    likes = relationship("PostLike", back_populates="post", cascade="all, delete-orphan", passive_deletes=True)
+    comments = relationship("Comment", back_populates="post", cascade="all, delete-orphan", passive_deletes=True)
+    saved_by = relationship("SavedPost", back_populates="post", cascade="all, delete-orphan", passive_deletes=True)
+
+    __table_args__ = (
+        # Recent posts by a set of authors (feed candidates, profile listings)
+        Index("ix_posts_user_created", "user_id", "created_at"),
+    )
 
 # ======================
 # PostLike (composite PK)
 # ======================
 class PostLike(Base):
     __tablename__ = "post_likes"
-    user_id = Column(Integer, ForeignKey("auth_users.id"), primary_key=True)
-    post_id = Column(Integer, ForeignKey("posts.id"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("auth_users.id", ondelete="CASCADE"), primary_key=True)
+    post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     user = relationship("AuthUser", back_populates="post_likes")
     post = relationship("Post", back_populates="likes")
 
+    __table_args__ = (
+        # Covering index for the user's collection, paged by (created_at, post_id)
+        Index("ix_post_likes_user_created", "user_id", "created_at", "post_id"),
+    )
+
 
 # ======================
 # Comment
@@ -105,15 +227,21 @@ class PostLike(Base):
 class Comment(Base):
     __tablename__ = "comments"
     id = Column(Integer, primary_key=True, index=True)
-    post_id = Column(Integer, ForeignKey("posts.id"), nullable=False)
-    user_id = Column(Integer, ForeignKey("auth_users.id"), nullable=False)
+    post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("auth_users.id", ondelete="CASCADE"), nullable=False)
     content = Column(String, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     likes_count = Column(Integer, default=0)
 
     user = relationship("AuthUser", back_populates="comments")
     post = relationship("Post", back_populates="comments")
-    likes = relationship("CommentLike", back_populates="comment", cascade="all, delete-orphan")
+    likes = relationship("CommentLike", back_populates="comment", cascade="all, delete-orphan", passive_deletes=True)
+
+    __table_args__ = (
+        # Keyset pagination indexes for "top" and "newest" comment listings
+        Index("ix_comments_post_likes_id", "post_id", "likes_count", "id"),
+        Index("ix_comments_post_created_id", "post_id", "created_at", "id"),
+    )
 
 
 # ======================
@@ -121,8 +249,8 @@ class Comment(Base):
 # ======================
 class CommentLike(Base):
     __tablename__ = "comment_likes"
-    user_id = Column(Integer, ForeignKey("auth_users.id"), primary_key=True)
-    comment_id = Column(Integer, ForeignKey("comments.id"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("auth_users.id", ondelete="CASCADE"), primary_key=True)
+    comment_id = Column(Integer, ForeignKey("comments.id", ondelete="CASCADE"), primary_key=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     user = relationship("AuthUser", back_populates="comment_likes")
@@ -134,32 +262,43 @@ class CommentLike(Base):
 # ======================
 class SavedPost(Base):
     __tablename__ = "saved_posts"
-    user_id = Column(Integer, ForeignKey("auth_users.id"), primary_key=True)
-    post_id = Column(Integer, ForeignKey("posts.id"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("auth_users.id", ondelete="CASCADE"), primary_key=True)
+    post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     user = relationship("AuthUser", back_populates="saved_posts")
     post = relationship("Post", back_populates="saved_by")
 
+    __table_args__ = (
+        # Covering index for the user's collection, paged by (created_at, post_id)
+        Index("ix_saved_posts_user_created", "user_id", "created_at", "post_id"),
+    )
+
 # ======================
 # Following (composite PK)
 # ======================
 class Following(Base):
     __tablename__ = "followings"
 
-    follower_id = Column(Integer, ForeignKey("auth_users.id"), primary_key=True)
-    following_id = Column(Integer, ForeignKey("auth_users.id"), primary_key=True)
+    follower_id = Column(Integer, ForeignKey("auth_users.id", ondelete="CASCADE"), primary_key=True)
+    following_id = Column(Integer, ForeignKey("auth_users.id", ondelete="CASCADE"), primary_key=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     follower = relationship("AuthUser", foreign_keys=[follower_id], back_populates="following")
     following = relationship("AuthUser", foreign_keys=[following_id], back_populates="followers")
 
+    __table_args__ = (
+        # Keyset pagination indexes for follower and following lists
+        Index("ix_followings_following_created", "following_id", "created_at", "follower_id"),
+        Index("ix_followings_follower_created", "follower_id", "created_at", "following_id"),
+    )
+
 # ======================
 # UserProfile (1:1)
 # ======================
 class UserProfile(Base):
     __tablename__ = "user_profiles"
-    user_id = Column(Integer, ForeignKey("auth_users.id"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("auth_users.id", ondelete="CASCADE"), primary_key=True)
     full_name = Column(String, nullable=True)
     bio = Column(String, nullable=True)
     avatar_url = Column(String, nullable=True)
@@ -169,3 +308,214 @@ class UserProfile(Base):
     posts_count = Column(Integer, default=0)
 
     user = relationship("AuthUser", back_populates="profile")
+
+
+# ======================
+# ActivityEvent (append-only log)
+# ======================
+# Plain integer references (no foreign keys) so the log outlives the rows it describes
+class ActivityEvent(Base):
+    __tablename__ = "activity_events"
+    id = Column(Integer, primary_key=True, index=True)
+    actor_id = Column(Integer, nullable=False)
+    verb = Column(String, nullable=False)
+    post_id = Column(Integer, nullable=True)
+    comment_id = Column(Integer, nullable=True)
+    target_user_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_activity_events_actor_id", "actor_id", "id"),
+    )
+
+
+# ======================
+# Notification (aggregated per recipient + group)
+# ======================
+# While unread, repeat events for the same group_key (e.g. "like_post:12") fold into one
+# row: actor_count grows and last_actor_id moves, instead of one row per event.
+# actor_count is the number of distinct actors recorded in notification_actors.
+class Notification(Base):
+    __tablename__ = "notifications"
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("auth_users.id", ondelete="CASCADE"), nullable=False)
+    verb = Column(String, nullable=False)
+    group_key = Column(String, nullable=False)
+    post_id = Column(Integer, nullable=True)
+    last_actor_id = Column(Integer, nullable=False)
+    actor_count = Column(Integer, default=1)
+    is_read = Column(Boolean, default=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_notifications_user_group", "user_id", "group_key", "is_read"),
+        Index("ix_notifications_user_updated_id", "user_id", "updated_at", "id"),
+    )
+
+
+# ======================
+# NotificationActor (distinct actors folded into a notification)
+# ======================
+class NotificationActor(Base):
+    __tablename__ = "notification_actors"
+    notification_id = Column(Integer, ForeignKey("notifications.id", ondelete="CASCADE"), primary_key=True)
+    actor_id = Column(Integer, ForeignKey("auth_users.id", ondelete="CASCADE"), primary_key=True)
+
+    __table_args__ = (
+        Index("ix_notification_actors_actor_id", "actor_id"),
+    )
+
+
+# ======================
+# NotificationInbox (1:1 with AuthUser, O(1) unread count)
+# ======================
+class NotificationInbox(Base):
+    __tablename__ = "notification_inboxes"
+    user_id = Column(Integer, ForeignKey("auth_users.id", ondelete="CASCADE"), primary_key=True)
+    unread_count = Column(Integer, default=0)
+
+
+# ======================
+# Tag (hashtag with its live post count)
+# ======================
+class Tag(Base):
+    __tablename__ = "tags"
+    name = Column(String, primary_key=True)  # Normalized: casefolded, without the leading #
+    posts_count = Column(Integer, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# ======================
+# PostTag (hashtags parsed from a post's caption)
+# ======================
+class PostTag(Base):
+    __tablename__ = "post_tags"
+    tag = Column(String, ForeignKey("tags.name", ondelete="CASCADE"), primary_key=True)
+    post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True)
+    created_at = Column(Timestamp, server_default=func.now())
+
+    __table_args__ = (
+        # Tag pages, paged by (created_at, post_id)
+        Index("ix_post_tags_tag_created", "tag", "created_at", "post_id"),
+        Index("ix_post_tags_post_id", "post_id"),
+    )
+
+
+# ======================
+# PostMention (users @mentioned in a post's caption)
+# ======================
+class PostMention(Base):
+    __tablename__ = "post_mentions"
+    user_id = Column(Integer, ForeignKey("auth_users.id", ondelete="CASCADE"), primary_key=True)  # Mentioned user
+    post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True)
+    created_at = Column(Timestamp, server_default=func.now())
+
+    __table_args__ = (
+        # Covering index for the user's mentions, paged by (created_at, post_id)
+        Index("ix_post_mentions_user_created", "user_id", "created_at", "post_id"),
+        Index("ix_post_mentions_post_id", "post_id"),
+    )
+
+
+# ======================
+# UserAffinity (viewer -> author interaction score)
+# ======================
+# score decays with a half-life; it is stored as of a fixed epoch so its order never changes
+# (see feed_ranking.py). updated_at is the last interaction.
+class UserAffinity(Base):
+    __tablename__ = "user_affinities"
+    viewer_id = Column(Integer, ForeignKey("auth_users.id", ondelete="CASCADE"), primary_key=True)
+    author_id = Column(Integer, ForeignKey("auth_users.id", ondelete="CASCADE"), primary_key=True)
+    score = Column(Float, default=0.0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_user_affinities_viewer_score", "viewer_id", "score"),
+    )
+
+
+# ======================
+# MediaFile (validated upload metadata, keyed by stored filename)
+# ======================
+class MediaFile(Base):
+    __tablename__ = "media_files"
+    filename = Column(String, primary_key=True)
+    content_type = Column(String, nullable=False)
+    size = Column(Integer, nullable=False)
+    width = Column(Integer, nullable=False)
+    height = Column(Integer, nullable=False)
+    duration = Column(Float, nullable=True)
+    uploaded_by = Column(Integer, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# ======================
+# PostLocation (geohash-partitioned location index of posts)
+# ======================
+# posts stays one table (its id is the target of several foreign keys); the location
+# columns geographic queries filter on are mirrored here, partitioned by the leading
+# geohash characters. On Postgres this is a LIST-partitioned table with one partition
+# per region, so queries that filter geo_region only touch the viewer's regions and
+# maintenance (VACUUM, REINDEX) can run per partition. Other databases get the same
+# table unpartitioned, clustered by the (geo_region, geohash) index.
+GEO_PARTITION_PRECISION = 1
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+class PostLocation(Base):
+    __tablename__ = "post_locations"
+    geo_region = Column(String, nullable=False)
+    post_id = Column(Integer, nullable=False)
+    geohash = Column(String, nullable=False)
+    user_id = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # Partitioned tables need the partition key in the primary key
+        PrimaryKeyConstraint("geo_region", "post_id"),
+        Index("ix_post_locations_region_geohash", "geo_region", "geohash", "created_at"),
+        Index("ix_post_locations_post_id", "post_id"),
+        {"postgresql_partition_by": "LIST (geo_region)"},
+    )
+
+
+def geo_region(geo_hash: str) -> str:
+    return geo_hash[:GEO_PARTITION_PRECISION]
+
+
+def copy_post_locations(conn, *conditions):
+    # Set-based copy of posts (matching conditions) that are not indexed yet
+    conn.execute(
+        insert(PostLocation).from_select(
+            ["geo_region", "post_id", "geohash", "user_id", "created_at"],
+            select(
+                func.substr(Post.geoHash, 1, GEO_PARTITION_PRECISION),
+                Post.id,
+                Post.geoHash,
+                Post.user_id,
+                Post.created_at,
+            ).where(
+                Post.geoHash.isnot(None),
+                ~exists().where(PostLocation.post_id == Post.id),
+                *conditions,
+            ),
+        )
+    )
+
+
+@event.listens_for(PostLocation.__table__, "after_create")
+def _create_post_location_partitions(table, conn, **kwargs):
+    if conn.dialect.name == "postgresql":
+        for region in GEOHASH_ALPHABET:
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS post_locations_{region} "
+                f"PARTITION OF post_locations FOR VALUES IN ('{region}')"
+            ))
+    # Index posts that existed before this table (upgrades)
+    if inspect(conn).has_table("posts"):
+        copy_post_locations(conn)
+
+
+# One-off schema setup for deployments that skip it on startup (python database.py)
+if __name__ == "__main__":
+    create_tables_if_not_exist()
@@ -0,0 +1,175 @@
+# Connection pool instrumentation and admission control.
+# InstrumentedQueuePool records how long each checkout waited for a connection, how many
+# threads are waiting right now, and how many checkouts timed out. The admission check
+# reads those numbers before a request opens a session: when checkouts have had a
+# standing queue (every one in the last interval, or one still waiting, has waited longer
+# than the target), new requests are refused with 503 at once instead of joining the queue
+# and timing out in a cascade.
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+from typing import Optional
+import threading
+import math
+import time
+import os
+
+
+DB_ADMISSION_TARGET_MS = float(os.getenv("DB_ADMISSION_TARGET_MS", 100))  # 0 disables shedding
+DB_ADMISSION_INTERVAL = float(os.getenv("DB_ADMISSION_INTERVAL", 1.0))
+DB_ADMISSION_MAX_QUEUE = int(os.getenv("DB_ADMISSION_MAX_QUEUE", 0))  # 0 means no cap on waiters
+DB_ADMISSION_RETRY_AFTER = int(os.getenv("DB_ADMISSION_RETRY_AFTER", 1))
+
+# Upper bounds (seconds) of the checkout wait histogram
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class PoolOverloaded(Exception):
+    pass
+
+
+class PoolStats:
+    def __init__(self):
+        self.waiting = 0
+        self._wait_started = {}  # thread ident -> when its checkout began
+        self.timeouts = 0
+        self.shed = 0
+        self.wait_count = 0
+        self.wait_sum = 0.0
+        self.wait_buckets = [0] * len(WAIT_BUCKETS)
+        # Minimum wait in the current and the last completed interval
+        self._window_start = time.monotonic()
+        self._window_min = math.inf
+        self._previous_min = 0.0
+        self._lock = threading.Lock()
+
+    def _roll(self, now: float):
+        elapsed = now - self._window_start
+        if elapsed >= DB_ADMISSION_INTERVAL:
+            # An interval without checkouts (or an idle gap since the last one) had no queue
+            stale = self._window_min == math.inf or elapsed >= 2 * DB_ADMISSION_INTERVAL
+            self._previous_min = 0.0 if stale else self._window_min
+            self._window_start = now
+            self._window_min = math.inf
+
+    def enter(self):
+        with self._lock:
+            self.waiting += 1
+            self._wait_started[threading.get_ident()] = time.monotonic()
+
+    def leave(self, waited: float, timed_out: bool):
+        with self._lock:
+            self.waiting -= 1
+            self._wait_started.pop(threading.get_ident(), None)
+            if timed_out:
+                self.timeouts += 1
+            self.wait_count += 1
+            self.wait_sum += waited
+            for i, bound in enumerate(WAIT_BUCKETS):
+                if waited <= bound:
+                    self.wait_buckets[i] += 1
+                    break
+            self._roll(time.monotonic())
+            self._window_min = min(self._window_min, waited)
+
+    def record_shed(self):
+        with self._lock:
+            self.shed += 1
+
+    def queue_wait(self) -> float:
+        # Standing queue: the smallest wait over the last full interval and the current one
+        # so far. A checkout still waiting counts too, so a pool where nothing is returned
+        # (every connection held by slow queries) is caught before any waiter gives up.
+        with self._lock:
+            now = time.monotonic()
+            self._roll(now)
+            oldest = now - min(self._wait_started.values()) if self._wait_started else 0.0
+            return max(min(self._previous_min, self._window_min), oldest)
+
+
+class InstrumentedQueuePool(QueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+        self._local = threading.local()
+
+    def _do_get(self):
+        # QueuePool._do_get retries by calling itself; time only the outermost call
+        if getattr(self._local, "active", False):
+            return super()._do_get()
+
+        self._local.active = True
+        self.stats.enter()
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self._local.active = False
+            self.stats.leave(time.perf_counter() - start, timed_out)
+
+
+def pool_stats(engine) -> Optional[PoolStats]:
+    return getattr(engine.pool, "stats", None)
+
+
+def check_admission(engine):
+    # Raises PoolOverloaded instead of letting the request queue behind a saturated pool
+    stats = pool_stats(engine)
+    if stats is None or not DB_ADMISSION_TARGET_MS or not stats.waiting:
+        return
+    overloaded = (
+        (DB_ADMISSION_MAX_QUEUE and stats.waiting >= DB_ADMISSION_MAX_QUEUE)
+        or stats.queue_wait() * 1000 > DB_ADMISSION_TARGET_MS
+    )
+    if overloaded:
+        stats.record_shed()
+        raise PoolOverloaded()
+
+
+# ---------------------------
+# Prometheus text exposition
+# ---------------------------
+def render_metrics(engines: dict) -> str:
+    # engines: {"primary": engine, "replica0": engine, ...}; values are for this worker only
+    lines = []
+
+    def metric(name: str, kind: str, help_text: str, samples: list):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            label_text = ",".join(f'{key}="{val}"' for key, val in labels.items())
+            lines.append(f"{name}{{{label_text}}} {value}")
+
+    pid = os.getpid()
+    pools = [({"pool": name, "pid": pid}, engine.pool, pool_stats(engine)) for name, engine in engines.items()]
+    queue_pools = [(labels, pool) for labels, pool, _ in pools if isinstance(pool, QueuePool)]
+    instrumented = [(labels, stats) for labels, _, stats in pools if stats is not None]
+
+    metric("db_pool_size", "gauge", "Configured pool size.",
+           [(labels, pool.size()) for labels, pool in queue_pools])
+    metric("db_pool_checked_out", "gauge", "Connections currently checked out.",
+           [(labels, pool.checkedout()) for labels, pool in queue_pools])
+    metric("db_pool_overflow", "gauge", "Connections open beyond pool_size (negative while the pool is still filling).",
+           [(labels, pool.overflow()) for labels, pool in queue_pools])
+    metric("db_pool_waiting", "gauge", "Threads waiting for a connection.",
+           [(labels, stats.waiting) for labels, stats in instrumented])
+    metric("db_pool_timeouts_total", "counter", "Checkouts that gave up after pool_timeout.",
+           [(labels, stats.timeouts) for labels, stats in instrumented])
+    metric("db_pool_shed_total", "counter", "Requests refused by admission control.",
+           [(labels, stats.shed) for labels, stats in instrumented])
+
+    lines.append("# HELP db_pool_wait_seconds Time spent waiting for a pooled connection.")
+    lines.append("# TYPE db_pool_wait_seconds histogram")
+    for labels, stats in instrumented:
+        label_text = ",".join(f'{key}="{val}"' for key, val in labels.items())
+        cumulative = 0
+        for bound, count in zip(WAIT_BUCKETS, stats.wait_buckets):
+            cumulative += count
+            lines.append(f'db_pool_wait_seconds_bucket{{{label_text},le="{bound}"}} {cumulative}')
+        lines.append(f'db_pool_wait_seconds_bucket{{{label_text},le="+Inf"}} {stats.wait_count}')
+        lines.append(f"db_pool_wait_seconds_sum{{{label_text}}} {stats.wait_sum:.6f}")
+        lines.append(f"db_pool_wait_seconds_count{{{label_text}}} {stats.wait_count}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,166 @@
+# Per-viewer engagement snapshot: the post IDs a user has liked and saved, held as sorted
+# arrays so listings compute is_liked and is_saved in memory instead of querying per page.
+# Each snapshot keeps the newest ENGAGEMENT_RECENT_LIMIT IDs of each kind; posts older
+# than that (rare, and only for heavy users) fall back to one query for just those IDs.
+# Freshness across workers comes from auth_users.engagement_version, which every like,
+# unlike, save and unsave bumps: the current-user dependency already loads the row, so a cached
+# snapshot is checked against it for free and reloaded only when another worker wrote.
+# Memory: each cached ID is 8 bytes, and the cache holds at most ENGAGEMENT_CACHE_MAX_IDS
+# of them across all viewers (default 4M, ~32 MB per worker), evicting the least recently
+# used viewers first; ENGAGEMENT_CACHE_SIZE separately caps the number of viewers.
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, object_session
+from collections import OrderedDict
+from array import array
+from bisect import bisect_left, insort
+from typing import Iterable, Optional, Set, Tuple
+import threading
+import os
+
+from database import AuthUser, PostLike, SavedPost
+
+
+ENGAGEMENT_RECENT_LIMIT = int(os.getenv("ENGAGEMENT_RECENT_LIMIT", 5000))
+ENGAGEMENT_CACHE_SIZE = int(os.getenv("ENGAGEMENT_CACHE_SIZE", 10000))
+ENGAGEMENT_CACHE_MAX_IDS = int(os.getenv("ENGAGEMENT_CACHE_MAX_IDS", 4_000_000))
+
+COLLECTIONS = {"liked": PostLike, "saved": SavedPost}
+
+
+class PostIdSet:
+    __slots__ = ("ids", "floor")
+
+    def __init__(self, newest_first: list, limit: int):
+        # floor: IDs below it were not loaded, so membership there is unknown
+        complete = len(newest_first) <= limit
+        newest_first = newest_first[:limit]
+        self.floor = 0 if complete else newest_first[-1]
+        self.ids = array("q", reversed(newest_first))
+
+    def contains(self, post_id: int) -> Optional[bool]:
+        if post_id < self.floor:
+            return None
+        i = bisect_left(self.ids, post_id)
+        return i < len(self.ids) and self.ids[i] == post_id
+
+    def add(self, post_id: int):
+        if post_id >= self.floor and not self.contains(post_id):
+            insort(self.ids, post_id)
+
+    def discard(self, post_id: int):
+        i = bisect_left(self.ids, post_id)
+        if i < len(self.ids) and self.ids[i] == post_id:
+            del self.ids[i]
+
+
+class ViewerEngagement:
+    __slots__ = ("version", "liked", "saved")
+
+    def __init__(self, version: int, liked: PostIdSet, saved: PostIdSet):
+        self.version = version
+        self.liked = liked
+        self.saved = saved
+
+    def size(self) -> int:
+        return len(self.liked.ids) + len(self.saved.ids)
+
+
+def load_engagement(db: Session, user_id: int, version: int) -> ViewerEngagement:
+    # Newest IDs first over the (user_id, post_id) primary key; one extra row tells whether the list is complete
+    sets = {}
+    for kind, model in COLLECTIONS.items():
+        post_ids = db.scalars(
+            select(model.post_id)
+            .where(model.user_id == user_id)
+            .order_by(model.post_id.desc())
+            .limit(ENGAGEMENT_RECENT_LIMIT + 1)
+        ).all()
+        sets[kind] = PostIdSet(list(post_ids), ENGAGEMENT_RECENT_LIMIT)
+    return ViewerEngagement(version, sets["liked"], sets["saved"])
+
+
+def bump_engagement_version(db: Session, user: AuthUser) -> int:
+    # Atomic increment in the handler's transaction; returns the version it was read at
+    old_version = user.engagement_version or 0
+    user.engagement_version = func.coalesce(AuthUser.engagement_version, 0) + 1
+    return old_version
+
+
+class EngagementCache:
+    def __init__(self, max_entries: int, max_ids: int):
+        self.max_entries = max_entries
+        self.max_ids = max_ids
+        self._entries: "OrderedDict[int, ViewerEngagement]" = OrderedDict()
+        self._ids = 0  # IDs held across all entries
+        self._lock = threading.Lock()
+
+    def _evict(self):
+        # Least recently used first, until both the entry and the ID budgets hold
+        while self._entries and (len(self._entries) > self.max_entries or self._ids > self.max_ids):
+            _, entry = self._entries.popitem(last=False)
+            self._ids -= entry.size()
+
+    def get(self, db: Session, user: AuthUser) -> ViewerEngagement:
+        version = user.engagement_version or 0
+        with self._lock:
+            entry = self._entries.get(user.id)
+            if entry is not None and entry.version == version:
+                self._entries.move_to_end(user.id)
+                return entry
+
+        # Load through the session that read the version, so the snapshot comes from the
+        # same database and is never older than the version it is stored under
+        entry = load_engagement(object_session(user) or db, user.id, version)
+        with self._lock:
+            previous = self._entries.pop(user.id, None)
+            if previous is not None:
+                self._ids -= previous.size()
+            self._entries[user.id] = entry
+            self._ids += entry.size()
+            self._evict()
+        return entry
+
+    def flags(self, db: Session, user: AuthUser, post_ids: Iterable[int]) -> Tuple[Set[int], Set[int]]:
+        # (liked, saved) subsets of post_ids for this viewer
+        entry = self.get(db, user)
+        result = []
+        for kind, model in COLLECTIONS.items():
+            ids = getattr(entry, kind)
+            found, unknown = set(), []
+            for post_id in post_ids:
+                member = ids.contains(post_id)
+                if member is None:
+                    unknown.append(post_id)
+                elif member:
+                    found.add(post_id)
+            if unknown:
+                found.update(db.scalars(
+                    select(model.post_id).where(model.user_id == user.id, model.post_id.in_(unknown))
+                ).all())
+            result.append(found)
+        return result[0], result[1]
+
+    def record(self, user_id: int, kind: str, post_id: int, added: bool, old_version: int):
+        # Called after the handler commits. The bump made the version old_version + 1 unless
+        # another worker wrote in between, in which case the next get() sees a different
+        # version and reloads.
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return
+            if entry.version != old_version:
+                del self._entries[user_id]
+                self._ids -= entry.size()
+                return
+            ids = getattr(entry, kind)
+            size = entry.size()
+            if added:
+                ids.add(post_id)
+            else:
+                ids.discard(post_id)
+            entry.version = old_version + 1
+            self._ids += entry.size() - size
+            self._evict()
+
+
+engagement_cache = EngagementCache(ENGAGEMENT_CACHE_SIZE, ENGAGEMENT_CACHE_MAX_IDS)
@@ -0,0 +1,44 @@
+from fastapi import Request
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from typing import Optional
+import hashlib
+
+from database import Post
+
+
+# Clients must revalidate every time, but may reuse the body on a 304
+REVALIDATE_HEADERS = {"Cache-Control": "private, no-cache"}
+
+
+# Version tags come from data the listing already keeps current: Post.updated_at moves on
+# every write to a post row (likes and comments update its counters), so mutations never
+# touch a shared row just to invalidate caches.
+def posts_tag(db: Session, user_id: int) -> tuple:
+    # Viewer-independent parts of a user's post listing; the counter sums also catch two
+    # writes inside one updated_at tick (SQLite timestamps have one-second resolution)
+    return db.query(
+        func.max(Post.updated_at),
+        func.count(Post.id),
+        func.sum(Post.likes_count),
+        func.sum(Post.comments_count),
+    ).filter(Post.user_id == user_id, Post.deleted_at.is_(None)).one()
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.sha1(":".join(str(part) for part in parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def etag_matches(request: Optional[Request], etag: str) -> bool:
+    # request is None when a handler is called directly (e.g. from /batch)
+    if request is None:
+        return False
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: W/ prefixes are ignored
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in candidates
@@ -0,0 +1,167 @@
+# In-process stand-in for googlemaps.Client, for offline development and load tests.
+# Serves Google-shaped reverse_geocode payloads built from the bundled gazetteer, with
+# configurable latency and error injection. Every response, delay and failure is derived
+# from the coordinates and FAKE_GMAPS_SEED, so runs are reproducible across processes.
+# Selected with GMAPS_CLIENT=fake; to measure create-post with the geocoder on the hot
+# path, also set GEOCODER_POLICY=google so the offline provider does not answer first.
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+import threading
+import hashlib
+import random
+import time
+import csv
+import os
+import geohash
+
+from utils import haversine
+
+
+FAKE_GMAPS_LATENCY_MS = float(os.getenv("FAKE_GMAPS_LATENCY_MS", 0))
+FAKE_GMAPS_JITTER_MS = float(os.getenv("FAKE_GMAPS_JITTER_MS", 0))
+FAKE_GMAPS_ERROR_RATE = float(os.getenv("FAKE_GMAPS_ERROR_RATE", 0))
+FAKE_GMAPS_SEED = os.getenv("FAKE_GMAPS_SEED", "pintrigue")
+# Points further than this from any listed city get ZERO_RESULTS (open ocean, poles)
+FAKE_GMAPS_MAX_KM = float(os.getenv("FAKE_GMAPS_MAX_KM", 300))
+FAKE_GMAPS_DATASET = os.getenv(
+    "FAKE_GMAPS_DATASET", os.path.join(os.path.dirname(__file__), "data", "gazetteer.csv")
+)
+# Precision-2 cells are ~625 km tall, so the 3x3 neighbourhood always covers the max radius
+DATASET_CELL_PRECISION = 2
+
+# Injected failures, the ones GoogleGeocodingProvider treats as "Google unavailable"
+ERROR_KINDS = ("timeout", "over_query_limit", "transport")
+
+STREET_NAMES = ("Main St", "Market St", "Park Ave", "Station Rd", "High St", "Harbor Blvd", "Church St", "Hill Rd")
+POI_TYPES = (
+    ("park", "{city} Central Park"),
+    ("cafe", "Cafe {city}"),
+    ("transit_station", "{city} Station"),
+    ("natural_feature", "{city} Lookout"),
+)
+
+
+def _component(long_name: str, types: List[str]) -> dict:
+    return {"long_name": long_name, "short_name": long_name, "types": types}
+
+
+class FakeGoogleMapsClient:
+    def __init__(
+        self,
+        path: str = FAKE_GMAPS_DATASET,
+        latency_ms: float = FAKE_GMAPS_LATENCY_MS,
+        jitter_ms: float = FAKE_GMAPS_JITTER_MS,
+        error_rate: float = FAKE_GMAPS_ERROR_RATE,
+        seed: str = FAKE_GMAPS_SEED,
+        max_km: float = FAKE_GMAPS_MAX_KM,
+    ):
+        self.path = path
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.seed = seed
+        self.max_km = max_km
+        self.calls = 0
+        self._cells: Optional[Dict[str, List[Tuple[float, float, dict]]]] = None
+        self._lock = threading.Lock()
+
+    def _index(self) -> Dict[str, List[Tuple[float, float, dict]]]:
+        if self._cells is None:
+            with self._lock:
+                if self._cells is None:
+                    cells = defaultdict(list)
+                    with open(self.path, newline="", encoding="utf-8") as f:
+                        for row in csv.DictReader(f):
+                            lat, lng = float(row["latitude"]), float(row["longitude"])
+                            cells[geohash.encode(lat, lng, precision=DATASET_CELL_PRECISION)].append((lat, lng, row))
+                    self._cells = dict(cells)
+        return self._cells
+
+    def _nearest(self, lat: float, lng: float) -> Optional[dict]:
+        cells = self._index()
+        cell = geohash.encode(lat, lng, precision=DATASET_CELL_PRECISION)
+
+        best_row, best_km = None, self.max_km
+        for h in [cell] + geohash.neighbors(cell):
+            for city_lat, city_lng, row in cells.get(h, ()):
+                km = haversine(lat, lng, city_lat, city_lng)
+                if km <= best_km:
+                    best_row, best_km = row, km
+        return best_row
+
+    def _rng(self, lat: float, lng: float) -> random.Random:
+        # Same coordinates (to ~1 m) and seed always draw the same latency, failure and payload
+        key = f"{self.seed}:{lat:.5f}:{lng:.5f}".encode()
+        return random.Random(int.from_bytes(hashlib.sha1(key).digest()[:8], "big"))
+
+    def _inject(self, rng: random.Random):
+        delay_ms = self.latency_ms + rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else self.latency_ms
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000)
+
+        if self.error_rate and rng.random() < self.error_rate:
+            from googlemaps.exceptions import ApiError, Timeout, TransportError
+
+            kind = rng.choice(ERROR_KINDS)
+            if kind == "timeout":
+                raise Timeout()
+            if kind == "over_query_limit":
+                raise ApiError("OVER_QUERY_LIMIT", "You have exceeded your rate-limit for this API.")
+            raise TransportError("Connection reset by peer")
+
+    def reverse_geocode(self, latlng, result_type=None, location_type=None, language=None, **kwargs) -> List[dict]:
+        # Same call shape as googlemaps.Client.reverse_geocode; latlng is a (lat, lng) pair or a dict
+        if isinstance(latlng, dict):
+            lat, lng = float(latlng["lat"]), float(latlng["lng"])
+        else:
+            lat, lng = float(latlng[0]), float(latlng[1])
+
+        with self._lock:
+            self.calls += 1
+        rng = self._rng(lat, lng)
+        self._inject(rng)
+
+        row = self._nearest(lat, lng)
+        if row is None:
+            return []
+
+        city, admin1, country = row["name"], row["admin1"], row["country"]
+        area = [_component(city, ["locality", "political"])]
+        if admin1:
+            area.append(_component(admin1, ["administrative_area_level_1", "political"]))
+        area.append(_component(country, ["country", "political"]))
+
+        street = _component(rng.choice(STREET_NAMES), ["route"])
+        number = _component(str(rng.randint(1, 2000)), ["street_number"])
+        results = [self._result(lat, lng, "street_address", [number, street] + area, "ROOFTOP")]
+
+        # Roughly one point in four sits on a named place, which the display logic prefers
+        if rng.random() < 0.25:
+            poi_type, template = rng.choice(POI_TYPES)
+            poi = _component(template.format(city=city), [poi_type, "point_of_interest", "establishment"])
+            results.insert(0, self._result(lat, lng, poi_type, [poi] + area, "ROOFTOP", poi=True))
+
+        results.append(self._result(float(row["latitude"]), float(row["longitude"]), "locality", area, "APPROXIMATE"))
+        results += [
+            self._result(lat, lng, component["types"][0], area[i:], "APPROXIMATE")
+            for i, component in enumerate(area) if i > 0
+        ]
+
+        if result_type:
+            wanted = {result_type} if isinstance(result_type, str) else set(result_type)
+            results = [r for r in results if wanted.intersection(r["types"])]
+        return results
+
+    def _result(self, lat: float, lng: float, kind: str, components: List[dict], location_type: str, poi: bool = False) -> dict:
+        types = [kind, "point_of_interest", "establishment"] if poi else [kind] + (["political"] if kind != "street_address" else [])
+        names = [c["long_name"] for c in components]
+        if components[0]["types"] == ["street_number"]:
+            names[:2] = [f"{names[0]} {names[1]}"]
+        address = ", ".join(names)
+        return {
+            "address_components": components,
+            "formatted_address": address,
+            "geometry": {"location": {"lat": lat, "lng": lng}, "location_type": location_type},
+            "place_id": "fake_" + hashlib.sha1(f"{kind}:{address}".encode()).hexdigest()[:24],
+            "types": types,
+        }
@@ -0,0 +1,233 @@
+from sqlalchemy import case, func, select, update
+from sqlalchemy.orm import Session, object_session
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Set, Tuple
+import threading
+import random
+import math
+import time
+import os
+
+from database import AuthUser, Following, Post, UserAffinity, insert_ignore
+from activity import BatchWriter, defer_until_commit
+from utils import to_utc
+
+
+AFFINITY_HALF_LIFE_DAYS = float(os.getenv("AFFINITY_HALF_LIFE_DAYS", 30))
+AFFINITY_BATCH_SIZE = int(os.getenv("AFFINITY_BATCH_SIZE", 500))
+AFFINITY_FLUSH_INTERVAL = float(os.getenv("AFFINITY_FLUSH_INTERVAL", 1.0))
+# Candidate set bounds: recent posts from followed and high-affinity authors, plus recent posts overall
+FEED_CANDIDATES = int(os.getenv("FEED_CANDIDATES", 300))
+FEED_TOP_AUTHORS = int(os.getenv("FEED_TOP_AUTHORS", 50))
+FEED_CACHE_TTL = float(os.getenv("FEED_CACHE_TTL", 60))
+FEED_CACHE_SIZE = int(os.getenv("FEED_CACHE_SIZE", 10000))
+
+# Interaction weights; undoing an interaction takes its weight back
+AFFINITY_WEIGHTS = {
+    "like_post": 1.0,
+    "unlike_post": -1.0,
+    "save_post": 2.0,
+    "unsave_post": -2.0,
+    "comment": 3.0,
+}
+
+# Ranking weights
+FOLLOW_WEIGHT = 2.0
+AFFINITY_WEIGHT = 1.0
+POPULARITY_WEIGHT = 0.3
+RECENCY_WEIGHT = 3.0
+RECENCY_HALF_LIFE_HOURS = 24.0
+
+
+# ---------------------------
+# Affinity (viewer -> author), maintained incrementally
+# ---------------------------
+# Scores are stored as of a fixed epoch rather than as of their last update: an interaction
+# worth w at time t is stored as w * 2^((t - epoch) / half-life). Decaying to any "now" is
+# then one factor shared by every row, so stored order is decayed order and the top
+# authors come straight off the (viewer_id, score) index. Stored values double every
+# half-life past the epoch; a float lasts ~1000 half-lives (~80 years at the default).
+AFFINITY_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def epoch_weight(at: datetime) -> float:
+    half_lives = (to_utc(at) - AFFINITY_EPOCH).total_seconds() / 86400 / AFFINITY_HALF_LIFE_DAYS
+    return 2.0 ** half_lives
+
+
+def apply_affinity(db: Session, events: list):
+    # Sum the batch per pair, then create missing pairs and add to each in place, so
+    # workers writing the same pair at once neither conflict nor lose an update
+    deltas = defaultdict(float)
+    for e in events:
+        deltas[(e["viewer_id"], e["author_id"])] += e["delta"]
+    deltas = {pair: delta for pair, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    now = datetime.now(timezone.utc)
+    weight = epoch_weight(now)
+    db.execute(
+        insert_ignore(db, UserAffinity, ["viewer_id", "author_id"]),
+        [{"viewer_id": viewer_id, "author_id": author_id, "score": 0.0, "updated_at": now} for viewer_id, author_id in deltas]
+    )
+    for (viewer_id, author_id), delta in deltas.items():
+        score = func.coalesce(UserAffinity.score, 0.0) + delta * weight
+        db.execute(
+            update(UserAffinity)
+            .where(UserAffinity.viewer_id == viewer_id, UserAffinity.author_id == author_id)
+            .values(score=case((score > 0, score), else_=0.0), updated_at=now)
+        )
+
+
+affinity_writer = BatchWriter("affinity-writer", apply_affinity, AFFINITY_BATCH_SIZE, AFFINITY_FLUSH_INTERVAL)
+
+
+# Called by action handlers; applied after commit, off the request path
+def record_affinity(db: Session, viewer_id: int, author_id: int, verb: str):
+    if viewer_id == author_id or verb not in AFFINITY_WEIGHTS:
+        return
+    defer_until_commit(db, affinity_writer, {
+        "viewer_id": viewer_id,
+        "author_id": author_id,
+        "delta": AFFINITY_WEIGHTS[verb],
+    })
+
+
+# ---------------------------
+# Ranking
+# ---------------------------
+def score_post(created_at, likes: int, comments: int, affinity: float, followed: bool, now: datetime) -> float:
+    age_hours = max((now - to_utc(created_at)).total_seconds(), 0) / 3600
+    return (
+        RECENCY_WEIGHT * 0.5 ** (age_hours / RECENCY_HALF_LIFE_HOURS)
+        + FOLLOW_WEIGHT * followed
+        + AFFINITY_WEIGHT * math.log1p(affinity)
+        + POPULARITY_WEIGHT * math.log1p((likes or 0) + (comments or 0))
+    )
+
+
+def top_affinities(db: Session, viewer_id: int, now: datetime) -> dict:
+    # Highest stored scores are the highest decayed ones (see AFFINITY_EPOCH)
+    decay = 1.0 / epoch_weight(now)
+    return {
+        author_id: score * decay
+        for author_id, score in db.execute(
+            select(UserAffinity.author_id, UserAffinity.score)
+            .where(UserAffinity.viewer_id == viewer_id, UserAffinity.score > 0)
+            .order_by(UserAffinity.score.desc())
+            .limit(FEED_TOP_AUTHORS)
+        ).all()
+    }
+
+
+def rank_feed(db: Session, viewer_id: int) -> Tuple[List[int], Set[int]]:
+    now = datetime.now(timezone.utc)
+    following_ids = set(db.scalars(select(Following.following_id).where(Following.follower_id == viewer_id)).all())
+    affinity = top_affinities(db, viewer_id, now)
+
+    columns = (Post.id, Post.user_id, Post.created_at, Post.likes_count, Post.comments_count)
+    candidates = {}
+    authors = following_ids | set(affinity)
+    if authors:
+        for row in db.execute(
+            select(*columns)
+            .where(Post.user_id.in_(authors), Post.deleted_at.is_(None))
+            .order_by(Post.created_at.desc())
+            .limit(FEED_CANDIDATES)
+        ).all():
+            candidates[row[0]] = row
+    for row in db.execute(
+        select(*columns)
+        .where(Post.deleted_at.is_(None))
+        .order_by(Post.created_at.desc())
+        .limit(FEED_CANDIDATES)
+    ).all():
+        candidates.setdefault(row[0], row)
+
+    scored = sorted(
+        candidates.values(),
+        key=lambda r: (
+            score_post(r[2], r[3], r[4], affinity.get(r[1], 0.0), r[1] in following_ids, now),
+            r[0],
+        ),
+        reverse=True,
+    )
+    return [r[0] for r in scored], following_ids
+
+
+def bump_feed_version(user: AuthUser):
+    # Atomic increment in the handler's transaction, for changes that re-rank the viewer's feed
+    user.feed_version = func.coalesce(AuthUser.feed_version, 0) + 1
+
+
+# Ranked post IDs per viewer, kept as immutable snapshots under (viewer, snapshot id). A feed
+# cursor names its snapshot, so every page of one scroll walks the same order however
+# often the viewer's feed is re-ranked meanwhile. A first page reuses the viewer's latest
+# snapshot while it is younger than FEED_CACHE_TTL and was ranked at the viewer's current
+# feed_version, so a follow or a new post made through any worker is seen at once.
+# Snapshots are per worker: a cursor page served by a worker that does not hold its
+# snapshot (or after eviction) re-ranks once and keeps that ranking under the cursor's id.
+class FeedSnapshot:
+    __slots__ = ("expires", "version", "ranked_ids", "following_ids")
+
+    def __init__(self, expires: float, version: int, ranked_ids: List[int], following_ids: Set[int]):
+        self.expires = expires
+        self.version = version
+        self.ranked_ids = ranked_ids
+        self.following_ids = following_ids
+
+
+class FeedCache:
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._snapshots: "OrderedDict[Tuple[int, int], FeedSnapshot]" = OrderedDict()
+        self._latest: Dict[int, int] = {}  # viewer -> id of their newest snapshot
+        self._lock = threading.Lock()
+
+    def _store(self, viewer_id: int, snapshot_id: int, snapshot: FeedSnapshot):
+        with self._lock:
+            self._snapshots[(viewer_id, snapshot_id)] = snapshot
+            self._snapshots.move_to_end((viewer_id, snapshot_id))
+            while len(self._snapshots) > self.max_entries:
+                (evicted_viewer, evicted_id), _ = self._snapshots.popitem(last=False)
+                if self._latest.get(evicted_viewer) == evicted_id:
+                    del self._latest[evicted_viewer]
+
+    def _rank(self, db: Session, user: AuthUser, version: int) -> FeedSnapshot:
+        ranked_ids, following_ids = rank_feed(object_session(user) or db, user.id)
+        return FeedSnapshot(time.monotonic() + self.ttl, version, ranked_ids, following_ids)
+
+    def latest(self, db: Session, user: AuthUser) -> Tuple[int, FeedSnapshot]:
+        # For first pages: (snapshot id, snapshot)
+        version = user.feed_version or 0
+        with self._lock:
+            snapshot_id = self._latest.get(user.id)
+            snapshot = self._snapshots.get((user.id, snapshot_id))
+            if snapshot and snapshot.expires > time.monotonic() and snapshot.version == version:
+                self._snapshots.move_to_end((user.id, snapshot_id))
+                return snapshot_id, snapshot
+
+        snapshot = self._rank(db, user, version)
+        snapshot_id = random.getrandbits(48)
+        self._store(user.id, snapshot_id, snapshot)
+        with self._lock:
+            self._latest[user.id] = snapshot_id
+        return snapshot_id, snapshot
+
+    def pinned(self, db: Session, user: AuthUser, snapshot_id: int) -> FeedSnapshot:
+        # For cursor pages: the snapshot the cursor was issued from, whatever its age
+        with self._lock:
+            snapshot = self._snapshots.get((user.id, snapshot_id))
+            if snapshot is not None:
+                self._snapshots.move_to_end((user.id, snapshot_id))
+                return snapshot
+
+        snapshot = self._rank(db, user, user.feed_version or 0)
+        self._store(user.id, snapshot_id, snapshot)
+        return snapshot
+
+
+feed_cache = FeedCache(FEED_CACHE_TTL, FEED_CACHE_SIZE)
@@ -1,13 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, status, Response, UploadFile, File
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 import uuid
 import hashlib
 import os
 
 from database import (
     AuthUser,
+    MediaFile,
+    insert_ignore,
 )
 from auth import get_db, get_current_user 
+from media import EXTENSIONS, MediaError, validate_media
 
 import models
 
@@ -32,6 +36,11 @@ class LocalStorage:
             f.write(content)
         return f"{self.server_url}{self.base_url}/{filename}"
 
+    def delete(self, filename: str):
+        try:
+            os.remove(os.path.join(self.base_path, filename))
+        except FileNotFoundError:
+            pass
 
 
 # Dependency injector
@@ -52,17 +61,34 @@ router = APIRouter(
 async def upload_file(
     file: UploadFile = File(...), 
     storage: LocalStorage = Depends(get_storage), 
+    db: Session = Depends(get_db),
     current_user: AuthUser = Depends(get_current_user)
 ):
-    if file.content_type not in LocalStorage.ALLOWED_CONTENT_TYPES:
-        raise HTTPException(status_code=400, detail="Invalid file type.")
-
-    contents = await file.read()
+    # Read at most one byte past the limit instead of the whole body
+    contents = await file.read(LocalStorage.MAX_FILE_SIZE + 1)
     if len(contents) > LocalStorage.MAX_FILE_SIZE:
         raise HTTPException(status_code=400, detail="File too large (max 10MB).")
 
-    ext = os.path.splitext(file.filename)[1]
-    unique_name = hashlib.sha256(contents).hexdigest() + ext
+    # The client's content_type and filename are ignored; the bytes decide
+    try:
+        info = await validate_media(contents)
+    except MediaError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if info["content_type"] not in LocalStorage.ALLOWED_CONTENT_TYPES:
+        raise HTTPException(status_code=400, detail="Invalid file type.")
+
+    unique_name = hashlib.sha256(contents).hexdigest() + EXTENSIONS[info["content_type"]]
 
     file_url = await storage.save(unique_name, contents)
-    return models.FileUploadResponse(url=file_url)
+    await run_in_threadpool(record_media_file, db, unique_name, len(contents), info, current_user.id)
+    return models.FileUploadResponse(url=file_url, **info)
+
+
+def record_media_file(db: Session, filename: str, size: int, info: dict, user_id: int):
+    # Content-addressed names: re-uploads of the same bytes share one row, and two
+    # identical uploads racing each other both succeed
+    db.execute(
+        insert_ignore(db, MediaFile, ["filename"]),
+        {"filename": filename, "size": size, "uploaded_by": user_id, **info}
+    )
+    db.commit()
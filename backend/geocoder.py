@@ -0,0 +1,107 @@
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+import threading
+import logging
+import csv
+import os
+import geohash
+
+from utils import DEFAULT_LOCATION, MissingApiKeyError, get_gmaps_client, display_location_from_results, haversine
+
+
+# Which providers name a post's location, tried in order until one returns a name:
+#   offline-first  bundled gazetteer, then Google for points far from any listed city
+#   google-first   Google, then the gazetteer when Google is unavailable or errors
+#   google / offline  a single provider
+GEOCODER_POLICIES = {
+    "offline-first": ("offline", "google"),
+    "google-first": ("google", "offline"),
+    "google": ("google",),
+    "offline": ("offline",),
+}
+GEOCODER_POLICY = os.getenv("GEOCODER_POLICY", "offline-first")
+if GEOCODER_POLICY not in GEOCODER_POLICIES:
+    raise ValueError(f"Unsupported geocoder policy: {GEOCODER_POLICY}")
+
+# Cities (population >= 30k) derived from GeoNames, licensed CC BY 4.0 (https://www.geonames.org)
+GAZETTEER_PATH = os.getenv("GAZETTEER_PATH", os.path.join(os.path.dirname(__file__), "data", "gazetteer.csv"))
+OFFLINE_GEOCODER_MAX_KM = float(os.getenv("OFFLINE_GEOCODER_MAX_KM", 30))
+# Precision-3 cells are ~156 km tall, so the 3x3 neighbourhood always covers the max radius
+GAZETTEER_CELL_PRECISION = 3
+
+logger = logging.getLogger(__name__)
+
+
+class GoogleGeocodingProvider:
+    def __init__(self):
+        self._warned_no_key = False
+
+    def reverse(self, lat: float, lng: float) -> Optional[str]:
+        from googlemaps.exceptions import ApiError, HTTPError, Timeout, TransportError
+
+        try:
+            client = get_gmaps_client()
+        except MissingApiKeyError:
+            # Offline runs leave the key out on purpose; say so once and let the policy fall back
+            if not self._warned_no_key:
+                logger.warning("geocoder: GOOGLE_API is not set, skipping Google lookups")
+                self._warned_no_key = True
+            return None
+
+        try:
+            results = client.reverse_geocode((lat, lng))
+        except (ApiError, HTTPError, Timeout, TransportError):
+            return None
+        if not results:
+            return None
+        return display_location_from_results(results)
+
+
+# Nearest-city lookup over the bundled gazetteer, bucketed by geohash cell.
+# The index loads on first use and then answers in microseconds with no network.
+class OfflineGeocodingProvider:
+    def __init__(self, path: str = GAZETTEER_PATH, max_km: float = OFFLINE_GEOCODER_MAX_KM):
+        self.path = path
+        self.max_km = max_km
+        self._cells: Optional[Dict[str, List[Tuple[float, float, str]]]] = None
+        self._lock = threading.Lock()
+
+    def _index(self) -> Dict[str, List[Tuple[float, float, str]]]:
+        if self._cells is None:
+            with self._lock:
+                if self._cells is None:
+                    cells = defaultdict(list)
+                    with open(self.path, newline="", encoding="utf-8") as f:
+                        for row in csv.DictReader(f):
+                            lat, lng = float(row["latitude"]), float(row["longitude"])
+                            parts = [row["name"], row["admin1"], row["country"]]
+                            name = ", ".join(p for p in parts if p)
+                            cells[geohash.encode(lat, lng, precision=GAZETTEER_CELL_PRECISION)].append((lat, lng, name))
+                    self._cells = dict(cells)
+        return self._cells
+
+    def reverse(self, lat: float, lng: float) -> Optional[str]:
+        cells = self._index()
+        cell = geohash.encode(lat, lng, precision=GAZETTEER_CELL_PRECISION)
+
+        best_name, best_km = None, self.max_km
+        for h in [cell] + geohash.neighbors(cell):
+            for city_lat, city_lng, name in cells.get(h, ()):
+                km = haversine(lat, lng, city_lat, city_lng)
+                if km <= best_km:
+                    best_name, best_km = name, km
+        return best_name
+
+
+geocoding_providers = {
+    "google": GoogleGeocodingProvider(),
+    "offline": OfflineGeocodingProvider(),
+}
+
+
+def get_location_name_from_coords(lat: float, lng: float) -> str:
+    for provider_name in GEOCODER_POLICIES[GEOCODER_POLICY]:
+        name = geocoding_providers[provider_name].reverse(lat, lng)
+        if name:
+            return name
+    return DEFAULT_LOCATION
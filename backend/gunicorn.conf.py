@@ -0,0 +1,39 @@
+# Production server profile: the gunicorn master imports the app once (preload_app),
+# then forks uvicorn workers that share its memory pages copy-on-write.
+# Run with: gunicorn -c gunicorn.conf.py main:app
+import multiprocessing
+import os
+
+
+bind = f"{os.getenv('API_HOST', '0.0.0.0')}:{os.getenv('API_PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+# Per-process state (realtime broker, rate limits) reads the worker count from here
+os.environ["WEB_CONCURRENCY"] = str(workers)
+# Picks uvloop and httptools when installed (loop="auto", http="auto")
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+
+# Passed through to uvicorn as timeout_keep_alive and the listen backlog
+keepalive = int(os.getenv("KEEPALIVE", 5))
+backlog = int(os.getenv("BACKLOG", 2048))
+timeout = int(os.getenv("WORKER_TIMEOUT", 30))
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", 20))
+
+accesslog = "-"
+errorlog = "-"
+
+# Split the database connection budget across workers (read by database.make_engine)
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", 60))
+os.environ.setdefault("DB_POOL_SIZE", str(max(2, DB_MAX_CONNECTIONS // workers)))
+os.environ.setdefault("DB_MAX_OVERFLOW", "0")
+
+# Schema setup runs once as its own step, not in every worker's lifespan
+os.environ.setdefault("SCHEMA_INIT_ON_STARTUP", "false")
+
+
+def post_fork(server, worker):
+    # Pooled connections opened in the master must not be shared with children
+    import database
+    database.engine.dispose(close=False)
+    for replica in database.replica_engines:
+        replica.dispose(close=False)
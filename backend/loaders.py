@@ -0,0 +1,43 @@
+from sqlalchemy.orm import Session, joinedload
+from typing import Dict, Iterable, Optional
+
+from database import AuthUser
+
+
+# DataLoader-style cache of username -> AuthUser, scoped to a single DB session.
+# Batched callers prime every username they need up front so the lookups collapse
+# into one IN query; later loads for the same session are served from memory.
+class UserLoader:
+    def __init__(self, db: Session):
+        self.db = db
+        self._cache: Dict[str, Optional[AuthUser]] = {}
+
+    def prime(self, usernames: Iterable[str]) -> None:
+        missing = {name for name in usernames if name not in self._cache}
+        if not missing:
+            return
+
+        users = (
+            self.db.query(AuthUser)
+            .options(joinedload(AuthUser.profile))
+            .filter(AuthUser.username.in_(missing), AuthUser.deleted_at.is_(None))
+            .all()
+        )
+        for user in users:
+            self._cache[user.username] = user
+
+        # Remember misses too so a 404 is not re-queried
+        for name in missing:
+            self._cache.setdefault(name, None)
+
+    def load(self, username: str) -> Optional[AuthUser]:
+        if username not in self._cache:
+            self.prime([username])
+        return self._cache[username]
+
+
+def get_user_loader(db: Session) -> UserLoader:
+    loader = db.info.get("user_loader")
+    if loader is None:
+        loader = db.info["user_loader"] = UserLoader(db)
+    return loader
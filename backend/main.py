@@ -1,15 +1,29 @@
-from fastapi import Depends, FastAPI, HTTPException, status
+from dotenv import load_dotenv
+load_dotenv()  # Before any module below reads its settings from the environment
+
+from fastapi import Depends, FastAPI, HTTPException, Request, status
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-import uvicorn
 import os
 
-from database import create_tables_if_not_exist
+from database import create_tables_if_not_exist, engine, replica_engines
+from dbpool import DB_ADMISSION_RETRY_AFTER, PoolOverloaded, render_metrics
+from activity import activity_writer
+from purger import purger
+from feed_ranking import affinity_writer
+from replicas import ReadYourWritesMiddleware
+from ratelimit import RateLimitMiddleware
 from auth import router as auth_router
 from users import router as users_router
 from posts import router as posts_router
 from file import router as file_router
+from batch import router as batch_router
+from realtime import router as realtime_router, get_broker, shutdown_broker
+from notifications import router as notifications_router, notification_writer
+from tags import router as tags_router
 
 
 
@@ -18,21 +32,39 @@ SERVER_URL = os.getenv("SERVER_URL", "http://localhost:8000")
 API_HOST = os.getenv("API_HOST", "0.0.0.0")
 API_PORT = int(os.getenv("API_PORT", 8000))
 FRONTEND_ORIGINS = [o.strip() for o in os.getenv("FRONTEND_ORIGINS", "http://localhost:5173").split(',') if o]
+# Production runs schema setup once, separately (python database.py), so workers start fast
+SCHEMA_INIT_ON_STARTUP = os.getenv("SCHEMA_INIT_ON_STARTUP", "true").lower() == "true"
 
 # App
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    create_tables_if_not_exist()
+    if SCHEMA_INIT_ON_STARTUP:
+        create_tables_if_not_exist()
+    purger.wake()  # Finish deletions left over from a previous run
+    get_broker()  # Fails startup on a broker that cannot serve this deployment
     yield
+    activity_writer.shutdown()
+    notification_writer.shutdown()
+    affinity_writer.shutdown()
+    purger.shutdown()
+    shutdown_broker()
 app = FastAPI(lifespan=lifespan)
 
 app.include_router(auth_router)
 app.include_router(users_router)
 app.include_router(posts_router)
 app.include_router(file_router)
+app.include_router(batch_router)
+app.include_router(realtime_router)
+app.include_router(notifications_router)
+app.include_router(tags_router)
 app.mount("/static", StaticFiles(directory="uploads"), name="static")
 
 
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(RateLimitMiddleware)
+
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -43,11 +75,30 @@ app.add_middleware(
 )
 
 
+# Database overload fails fast with 503 rather than hanging until a gateway timeout
+@app.exception_handler(PoolOverloaded)
+@app.exception_handler(PoolTimeoutError)
+async def database_busy(request: Request, exc: Exception):
+    return JSONResponse(
+        {"detail": "Server is busy, try again shortly"},
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={"Retry-After": str(DB_ADMISSION_RETRY_AFTER)},
+    )
+
+
 @app.get("/")
 async def read_root():
     return {"Hello": "World"}
 
 
+# Connection pool metrics for this worker, in Prometheus text format
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    engines = {"primary": engine, **{f"replica{i}": replica for i, replica in enumerate(replica_engines)}}
+    return PlainTextResponse(render_metrics(engines), media_type="text/plain; version=0.0.4")
+
+
 # Run app
 if __name__ == "__main__":
+    import uvicorn  # Workers are started by gunicorn or the uvicorn CLI, which import it themselves
     uvicorn.run(app, host=API_HOST, port=API_PORT)
\ No newline at end of file
@@ -0,0 +1,195 @@
+# Upload validation: sniffs the real type from magic bytes and reads dimensions (and video
+# duration) from the container headers, without decoding pixel data. Parsing touches a
+# few header bytes, so it runs in the thread pool: shipping a 10 MB upload to another
+# process would cost more than the parse itself.
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
+import struct
+import os
+
+
+# Decompression-bomb guards: a tiny file can declare an enormous canvas
+MEDIA_MAX_PIXELS = int(os.getenv("MEDIA_MAX_PIXELS", 50_000_000))
+MEDIA_MAX_DIMENSION = int(os.getenv("MEDIA_MAX_DIMENSION", 16384))
+MEDIA_MAX_VIDEO_SECONDS = float(os.getenv("MEDIA_MAX_VIDEO_SECONDS", 180))
+
+EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp",
+    "image/tiff": ".tiff",
+    "video/mp4": ".mp4",
+}
+
+
+class MediaError(ValueError):
+    pass
+
+
+def sniff_content_type(content: bytes) -> Optional[str]:
+    if content.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if content.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if content[:4] == b"RIFF" and content[8:12] == b"WEBP":
+        return "image/webp"
+    if content[:4] in (b"II*\x00", b"MM\x00*"):
+        return "image/tiff"
+    if content[4:8] == b"ftyp":
+        return "video/mp4"
+    return None
+
+
+# ---------------------------
+# Header parsers: return (width, height[, duration])
+# ---------------------------
+def _png_size(content: bytes):
+    if content[12:16] != b"IHDR" or len(content) < 24:
+        raise MediaError("Malformed PNG header")
+    if b"IEND" not in content[-12:]:
+        raise MediaError("Truncated PNG")
+    return struct.unpack(">II", content[16:24])
+
+
+def _jpeg_size(content: bytes):
+    i = 2
+    while i + 4 <= len(content):
+        if content[i] != 0xFF:
+            raise MediaError("Malformed JPEG segment")
+        marker = content[i + 1]
+        if marker == 0xFF:  # Fill byte
+            i += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:  # Markers without a length
+            i += 2
+            continue
+        (length,) = struct.unpack(">H", content[i + 2:i + 4])
+        # SOF0..SOF15 except DHT (C4), JPG (C8) and DAC (CC) carry the frame size
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            if i + 9 > len(content):
+                break
+            # Scan data cannot contain FF D9, so a missing end-of-image after the frame
+            # header means the upload was cut off (an embedded thumbnail's comes before it)
+            if content.find(b"\xff\xd9", i + 2 + length) == -1:
+                raise MediaError("Truncated JPEG")
+            height, width = struct.unpack(">HH", content[i + 5:i + 9])
+            return width, height
+        if marker == 0xDA:  # Scan data before any frame header
+            break
+        i += 2 + length
+    raise MediaError("JPEG has no frame header")
+
+
+def _webp_size(content: bytes):
+    (riff_size,) = struct.unpack("<I", content[4:8])
+    if riff_size + 8 > len(content):
+        raise MediaError("Truncated WebP")
+    chunk = content[12:16]
+    if chunk == b"VP8 " and content[23:26] == b"\x9d\x01\x2a":
+        width, height = struct.unpack("<HH", content[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and content[20] == 0x2F:
+        (bits,) = struct.unpack("<I", content[21:25])
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        width = int.from_bytes(content[24:27], "little") + 1
+        height = int.from_bytes(content[27:30], "little") + 1
+        return width, height
+    raise MediaError("Malformed WebP header")
+
+
+def _tiff_size(content: bytes):
+    endian = "<" if content[:2] == b"II" else ">"
+    (ifd,) = struct.unpack(endian + "I", content[4:8])
+    if ifd + 2 > len(content):
+        raise MediaError("Malformed TIFF header")
+    (count,) = struct.unpack(endian + "H", content[ifd:ifd + 2])
+    size = {}
+    for n in range(count):
+        entry = content[ifd + 2 + n * 12:ifd + 14 + n * 12]
+        if len(entry) < 12:
+            break
+        tag, kind = struct.unpack(endian + "HH", entry[:4])
+        if tag in (256, 257):  # ImageWidth, ImageLength
+            fmt = "H" if kind == 3 else "I"
+            size[tag] = struct.unpack(endian + fmt, entry[8:8 + struct.calcsize(fmt)])[0]
+    if 256 not in size or 257 not in size:
+        raise MediaError("TIFF has no image size")
+    return size[256], size[257]
+
+
+def _mp4_boxes(content: bytes, start: int, end: int):
+    i = start
+    while i + 8 <= end:
+        size, kind = struct.unpack(">I4s", content[i:i + 8])
+        header = 8
+        if size == 1:
+            (size,) = struct.unpack(">Q", content[i + 8:i + 16])
+            header = 16
+        elif size == 0:
+            size = end - i
+        if size < header or i + size > end:
+            raise MediaError("Malformed MP4 box")
+        yield kind, i + header, i + size
+        i += size
+
+
+def _mp4_info(content: bytes):
+    duration = None
+    width = height = 0
+    for kind, start, end in _mp4_boxes(content, 0, len(content)):
+        if kind != b"moov":
+            continue
+        for sub, sub_start, sub_end in _mp4_boxes(content, start, end):
+            if sub == b"mvhd":
+                if content[sub_start] == 1:
+                    timescale, length = struct.unpack(">IQ", content[sub_start + 20:sub_start + 32])
+                else:
+                    timescale, length = struct.unpack(">II", content[sub_start + 12:sub_start + 20])
+                duration = length / timescale if timescale else None
+            elif sub == b"trak" and not width:
+                for box, box_start, box_end in _mp4_boxes(content, sub_start, sub_end):
+                    if box == b"tkhd":
+                        # 16.16 fixed-point width and height close the box
+                        w, h = struct.unpack(">II", content[box_end - 8:box_end])
+                        width, height = w >> 16, h >> 16
+    if duration is None:
+        raise MediaError("MP4 has no movie header")
+    if not width or not height:
+        raise MediaError("MP4 has no video track")
+    return width, height, duration
+
+
+PARSERS = {
+    "image/jpeg": _jpeg_size,
+    "image/png": _png_size,
+    "image/webp": _webp_size,
+    "image/tiff": _tiff_size,
+    "video/mp4": _mp4_info,
+}
+
+
+def inspect_media(content: bytes) -> dict:
+    content_type = sniff_content_type(content)
+    if content_type is None:
+        raise MediaError("Unsupported or unrecognized file type")
+
+    try:
+        info = PARSERS[content_type](content)
+    except (struct.error, IndexError):
+        raise MediaError("Malformed file header")
+    width, height = info[0], info[1]
+    duration = info[2] if len(info) > 2 else None
+
+    if not width or not height:
+        raise MediaError("Invalid dimensions")
+    if width > MEDIA_MAX_DIMENSION or height > MEDIA_MAX_DIMENSION or width * height > MEDIA_MAX_PIXELS:
+        raise MediaError("Image dimensions too large")
+    if duration is not None and duration > MEDIA_MAX_VIDEO_SECONDS:
+        raise MediaError("Video too long")
+
+    return {"content_type": content_type, "width": width, "height": height, "duration": duration}
+
+
+async def validate_media(content: bytes) -> dict:
+    return await run_in_threadpool(inspect_media, content)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 from datetime import datetime
 
 # Data Models:
@@ -50,10 +50,16 @@ class UserProfileResponse(BaseModel):
     following_count: Optional[int] = None
     posts_count: Optional[int] = None
     is_following: Optional[bool] = None
+    follows_you: Optional[bool] = None
 
 class SuggestedUserResponse(BaseModel):
     users: List[UserProfileResponse]
 
+class PaginatedUsersResponse(BaseModel):
+    users: List[UserProfileResponse]
+    isEnd: bool = Field(..., alias="isEnd")
+    nextCursor: Optional[str] = None
+
 
 # Post Models
 class PostCreateInput(BaseModel):
@@ -77,12 +83,23 @@ class PostResponse(BaseModel):
     image_url: str
     location: Optional[LocationModel] = None
     is_liked: Optional[bool] = None
+    is_saved: Optional[bool] = None
     likes_count: int
     comments_count: int
+    width: Optional[int] = None
+    height: Optional[int] = None
 
 class PaginatedPostsResponse(BaseModel):
     posts: List[PostResponse]
     isEnd: bool = Field(..., alias="isEnd")
+    nextCursor: Optional[str] = None
+
+class TagPostsResponse(BaseModel):
+    tag: str
+    posts_count: int
+    posts: List[PostResponse]
+    isEnd: bool = Field(..., alias="isEnd")
+    nextCursor: Optional[str] = None
 
 class NearbyPostsResponse(BaseModel):
     posts: List[PostResponse]
@@ -110,10 +127,44 @@ class CommentResponse(BaseModel):
 class PaginatedCommentsResponse(BaseModel):
     comments: List[CommentResponse]
     isEnd: bool = Field(..., alias="isEnd")
+    nextCursor: Optional[str] = None
+
+
+# Notification Models
+class NotificationResponse(BaseModel):
+    notification_id: int
+    verb: str
+    post_id: Optional[int] = None
+    actor: UserProfileResponse
+    others_count: int
+    is_read: bool
+    updated_at: datetime
+
+class PaginatedNotificationsResponse(BaseModel):
+    notifications: List[NotificationResponse]
+    isEnd: bool = Field(..., alias="isEnd")
+    nextCursor: Optional[str] = None
+
+class UnreadCountResponse(BaseModel):
+    unread_count: int
+
+
+# Batch Models
+class BatchSubRequest(BaseModel):
+    id: str
+    path: str
+    params: Dict[str, Any] = {}
+
+class BatchRequestInput(BaseModel):
+    requests: List[BatchSubRequest] = Field(..., min_length=1, max_length=10)
 
 
 # File Upload Models
 class FileUploadResponse(BaseModel):
     url: str
+    content_type: Optional[str] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    duration: Optional[float] = None
 
 
@@ -0,0 +1,240 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Response
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import delete, select, tuple_, update
+from sqlalchemy.sql import func
+from collections import OrderedDict
+from typing import Optional
+import os
+
+from database import AuthUser, Notification, NotificationActor, NotificationInbox, insert_ignore, keyset_value
+from auth import get_db, get_current_user
+from activity import BatchWriter, defer_until_commit
+from utils import to_utc, encode_cursor, decode_cursor
+import models
+from datetime import datetime
+
+
+NOTIFICATION_INBOX_SIZE = int(os.getenv("NOTIFICATION_INBOX_SIZE", 200))
+NOTIFICATION_BATCH_SIZE = int(os.getenv("NOTIFICATION_BATCH_SIZE", 500))
+NOTIFICATION_FLUSH_INTERVAL = float(os.getenv("NOTIFICATION_FLUSH_INTERVAL", 1.0))
+
+
+def _add_unread(db: Session, user_id: int):
+    # Two workers may create the same inbox at once; the loser's insert is a no-op
+    db.execute(insert_ignore(db, NotificationInbox, ["user_id"]), {"user_id": user_id, "unread_count": 0})
+    db.execute(
+        update(NotificationInbox)
+        .where(NotificationInbox.user_id == user_id)
+        .values(unread_count=func.coalesce(NotificationInbox.unread_count, 0) + 1)
+    )
+
+
+def _trim_inbox(db: Session, user_id: int):
+    # Keep only the newest NOTIFICATION_INBOX_SIZE rows per user
+    cutoff = (
+        db.query(Notification.id)
+        .filter(Notification.user_id == user_id)
+        .order_by(Notification.id.desc())
+        .offset(NOTIFICATION_INBOX_SIZE)
+        .limit(1)
+        .scalar()
+    )
+    if cutoff is None:
+        return
+    trimmed = select(Notification.id).where(Notification.user_id == user_id, Notification.id <= cutoff)
+    db.execute(delete(NotificationActor).where(NotificationActor.notification_id.in_(trimmed)))
+    db.query(Notification).filter(
+        Notification.user_id == user_id,
+        Notification.id <= cutoff
+    ).delete(synchronize_session=False)
+
+    # Trimmed rows may have been unread; the remaining set is bounded, so recount
+    unread = (
+        select(func.count(Notification.id))
+        .where(Notification.user_id == user_id, Notification.is_read.is_(False))
+        .scalar_subquery()
+    )
+    db.execute(update(NotificationInbox).where(NotificationInbox.user_id == user_id).values(unread_count=unread))
+
+
+def deliver_notifications(db: Session, events: list):
+    # Group the batch so a burst of likes on one post becomes a single upsert
+    groups = OrderedDict()
+    for e in events:
+        key = (e["user_id"], e["group_key"])
+        group = groups.setdefault(key, {"verb": e["verb"], "post_id": e["post_id"], "actors": []})
+        if e["actor_id"] not in group["actors"]:
+            group["actors"].append(e["actor_id"])
+
+    for (user_id, group_key), group in groups.items():
+        actors = group["actors"]
+        notification = (
+            db.query(Notification)
+            .filter(
+                Notification.user_id == user_id,
+                Notification.group_key == group_key,
+                Notification.is_read.is_(False)
+            )
+            .order_by(Notification.id.desc())
+            .first()
+        )
+        created = notification is None
+        if created:
+            notification = Notification(
+                user_id=user_id,
+                verb=group["verb"],
+                group_key=group_key,
+                post_id=group["post_id"],
+                last_actor_id=actors[-1],
+                actor_count=0,
+                is_read=False,
+            )
+            db.add(notification)
+            db.flush()
+            _add_unread(db, user_id)
+
+        # Each actor counts once per notification: A liking again after B (unlike, like)
+        # is already recorded and changes nothing
+        seen = set(db.scalars(
+            select(NotificationActor.actor_id)
+            .where(NotificationActor.notification_id == notification.id, NotificationActor.actor_id.in_(actors))
+        ).all())
+        new_actors = [a for a in actors if a not in seen]
+        if new_actors:
+            db.execute(
+                insert_ignore(db, NotificationActor, ["notification_id", "actor_id"]),
+                [{"notification_id": notification.id, "actor_id": a} for a in new_actors]
+            )
+            # Counted from the rows, so a concurrent delivery of the same actor cannot add it twice
+            notification.actor_count = (
+                select(func.count())
+                .where(NotificationActor.notification_id == notification.id)
+                .scalar_subquery()
+            )
+            if not created:
+                notification.last_actor_id = new_actors[-1]
+                notification.updated_at = func.now()
+
+        if created:
+            db.flush()
+            _trim_inbox(db, user_id)
+
+
+notification_writer = BatchWriter(
+    "notification-writer", deliver_notifications, NOTIFICATION_BATCH_SIZE, NOTIFICATION_FLUSH_INTERVAL
+)
+
+
+# Called by action handlers; delivery happens after commit, off the request path
+def notify(db: Session, user_id: int, actor_id: int, verb: str, post_id: Optional[int] = None):
+    if user_id == actor_id:
+        return
+    group_key = f"{verb}:{post_id}" if post_id is not None else verb
+    defer_until_commit(db, notification_writer, {
+        "user_id": user_id,
+        "actor_id": actor_id,
+        "verb": verb,
+        "group_key": group_key,
+        "post_id": post_id,
+    })
+
+
+router = APIRouter(
+    prefix="/notifications",
+    tags=["notifications"],
+    dependencies=[Depends(get_current_user)]  # all routes require auth
+)
+
+
+# ---------------------------
+# List notifications (newest activity first)
+# ---------------------------
+@router.get("", response_model=models.PaginatedNotificationsResponse)
+def get_notifications(
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(20, ge=1, le=50),
+    db: Session = Depends(get_db),
+    current_user: AuthUser = Depends(get_current_user)
+):
+    query = db.query(Notification).filter(Notification.user_id == current_user.id)
+    if cursor:
+        try:
+            last_updated, last_id = decode_cursor(cursor, datetime, int)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        query = query.filter(
+            tuple_(Notification.updated_at, Notification.id) < tuple_(keyset_value(last_updated), last_id)
+        )
+
+    notifications = (
+        query
+        .order_by(Notification.updated_at.desc(), Notification.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+    is_end = len(notifications) <= limit
+    notifications = notifications[:limit]
+
+    # Batch load the most recent actor of each notification
+    actor_ids = {n.last_actor_id for n in notifications}
+    actors = {
+        user.id: user
+        for user in db.query(AuthUser)
+        .options(joinedload(AuthUser.profile))
+        .filter(AuthUser.id.in_(actor_ids))
+        .all()
+    }
+
+    result = []
+    for n in notifications:
+        actor = actors.get(n.last_actor_id)
+        if actor is None:
+            continue
+        result.append({
+            "notification_id": n.id,
+            "verb": n.verb,
+            "post_id": n.post_id,
+            "actor": {
+                "user_id": actor.id,
+                "username": actor.username,
+                "avatar_url": actor.profile.avatar_url if actor.profile else None,
+            },
+            "others_count": n.actor_count - 1,
+            "is_read": n.is_read,
+            "updated_at": to_utc(n.updated_at),
+        })
+
+    next_cursor = None
+    if not is_end:
+        last = notifications[-1]
+        next_cursor = encode_cursor(last.updated_at, last.id)
+
+    return {"notifications": result, "isEnd": is_end, "nextCursor": next_cursor}
+
+
+# ---------------------------
+# Unread count
+# ---------------------------
+@router.get("/unread-count", response_model=models.UnreadCountResponse)
+def get_unread_count(db: Session = Depends(get_db), current_user: AuthUser = Depends(get_current_user)):
+    inbox = db.get(NotificationInbox, current_user.id)
+    return {"unread_count": inbox.unread_count if inbox else 0}
+
+
+# ---------------------------
+# Mark all notifications as read
+# ---------------------------
+@router.post("/mark-read", status_code=status.HTTP_200_OK)
+def mark_notifications_read(db: Session = Depends(get_db), current_user: AuthUser = Depends(get_current_user)):
+    db.execute(
+        update(Notification)
+        .where(Notification.user_id == current_user.id, Notification.is_read.is_(False))
+        .values(is_read=True)
+    )
+    db.execute(
+        update(NotificationInbox)
+        .where(NotificationInbox.user_id == current_user.id)
+        .values(unread_count=0)
+    )
+    db.commit()
+    return Response(status_code=status.HTTP_200_OK)
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, status, Response
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import case, desc, select, or_
+from sqlalchemy.orm import Session, contains_eager, joinedload
+from sqlalchemy import and_, case, desc, func, select, or_, tuple_
 
 from database import (
     AuthUser,
@@ -10,102 +10,182 @@ from database import (
     Post,
     SavedPost,
     Comment,
-    Following
+    Following,
+    MediaFile,
+    PostLocation,
+    geo_region,
+    keyset_value
 )
-from auth import get_db, get_current_user 
+from auth import get_db, get_read_db, get_current_user, get_current_read_user, oauth_2_scheme
+from realtime import publish_event
+from activity import record_activity
+from notifications import notify
+from serializers import FastJSONResponse, post_card, comment_card
+from coalesce import coalesce_read
+from purger import purger
+from feed_ranking import bump_feed_version, feed_cache, record_affinity
+from engagement import bump_engagement_version, engagement_cache
+from tags import index_captions, unindex_post_tags
 import models
-from utils import to_utc, get_location_name_from_coords, get_geohash_precision_from_zoom, haversine, minmax_scale
+from utils import to_utc, get_geohash_precision_from_zoom, haversine, minmax_scale, encode_cursor, decode_cursor
+from geocoder import get_location_name_from_coords
 from datetime import datetime, timezone
+from typing import Optional
 import geohash
+import os
+
+
+# Work cap for the adaptive nearby search, in ring probes (one capped COUNT each)
+NEARBY_MAX_PROBES = int(os.getenv("NEARBY_MAX_PROBES", 4))
+# A ring with more than target * NEARBY_DENSE_FACTOR candidates is narrowed
+NEARBY_DENSE_FACTOR = int(os.getenv("NEARBY_DENSE_FACTOR", 4))
 
 
 router = APIRouter(
     prefix="/posts",
     tags=["posts"],
-    dependencies=[Depends(get_current_user)]  # all routes require auth
+    dependencies=[Depends(oauth_2_scheme)]  # all routes require auth; each one resolves its user
 )
 
 
 # ---------------------------
 # Get feed for a user
 # ---------------------------
+def decode_feed_cursor(cursor: str):
+    # Head pages: (snapshot_id, position). Tail pages: (snapshot_id, followed, created_at, post_id),
+    # the sort key of the last tail post, which starts past the whole ranked head.
+    # Raises ValueError on anything else.
+    try:
+        snapshot_id, position = decode_cursor(cursor, int, int)
+        tail_key = None
+    except ValueError:
+        snapshot_id, *tail_key = decode_cursor(cursor, int, int, datetime, int)
+        position = None
+    if position is not None and position < 0:
+        raise ValueError("Invalid cursor")
+    return snapshot_id, position, tail_key
+
+
 @router.get("/feed", response_model=models.PaginatedPostsResponse)
 def get_feed(
-    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None),
     limit: int = Query(10, ge=1, le=50),
-    db: Session = Depends(get_db),
-    current_user: AuthUser = Depends(get_current_user)
+    db: Session = Depends(get_read_db),
+    current_user: AuthUser = Depends(get_current_read_user)
 ):
-    # Query once: get following IDs as a list
-    following_ids_list = db.query(Following.following_id).filter(
-        Following.follower_id == current_user.id
-    ).all()
-
-    # Convert to set of ints for fast lookup in Python
-    following_ids = {row[0] for row in following_ids_list}
-
-    # Build SQL subquery from the same list
-    posts = (
-        db.query(
-            Post,
-            case(
-                (Post.user_id.in_(following_ids), 1),
-                else_=0
-            ).label("priority")
+    # Ranked head: a bounded candidate set scored by affinity, follows, recency and
+    # popularity. The first page takes the viewer's latest ranking snapshot; the cursor
+    # names it, so later pages walk the same order however the feed is re-ranked meanwhile.
+    if cursor:
+        try:
+            snapshot_id, position, tail_key = decode_feed_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        snapshot = feed_cache.pinned(db, current_user, snapshot_id)
+    else:
+        snapshot_id, snapshot = feed_cache.latest(db, current_user)
+        position, tail_key = 0, None
+    ranked_ids, following_ids = snapshot.ranked_ids, snapshot.following_ids
+    if position is None:
+        position = len(ranked_ids)
+
+    head_ids = ranked_ids[position:position + limit]
+    head_posts = {
+        post.id: post
+        for post in db.query(Post)
+        .options(joinedload(Post.user).joinedload(AuthUser.profile))
+        .filter(Post.id.in_(head_ids), Post.deleted_at.is_(None))
+        .all()
+    } if head_ids else {}
+    post_objs = [head_posts[post_id] for post_id in head_ids if post_id in head_posts]
+
+    # Past the ranked head: everything else, followed authors first, then by recency
+    tail_limit = limit - len(head_ids)
+    tail_posts = []
+    if tail_limit > 0:
+        followed = case((Post.user_id.in_(following_ids), 1), else_=0)
+        query = (
+            db.query(Post)
+            .options(
+                joinedload(Post.user).joinedload(AuthUser.profile)
+            )
+            .filter(Post.deleted_at.is_(None), ~Post.id.in_(ranked_ids))
         )
-        .options(
-            joinedload(Post.user).joinedload(AuthUser.profile)
+        if tail_key:
+            last_followed, last_created, last_post_id = tail_key
+            older = tuple_(Post.created_at, Post.id) < tuple_(keyset_value(last_created), last_post_id)
+            query = query.filter(or_(followed < last_followed, and_(followed == last_followed, older)))
+        tail_posts = (
+            query
+            .order_by(followed.desc(), Post.created_at.desc(), Post.id.desc())
+            .limit(tail_limit)
+            .all()
         )
-        .order_by(desc("priority"), Post.created_at.desc())
-        .offset(offset)
-        .limit(limit)
-        .all()
-    )
-
+        post_objs += tail_posts
 
-    # Extract post objects
-    post_objs = [post for post, _ in posts]
     post_ids = [post.id for post in post_objs]
 
-    # Find which of these posts the current user has liked
-    liked_post_ids = {
-        like.post_id
-        for like in db.query(PostLike).filter(
-            PostLike.user_id == current_user.id,
-            PostLike.post_id.in_(post_ids)
-        ).all()
-    }
+    # Viewer flags from the cached engagement snapshot
+    liked_post_ids, saved_post_ids = engagement_cache.flags(db, current_user, post_ids)
 
     # Build response
-    result = []
-    for post, _ in posts:
-        user = post.user
-        profile = user.profile
-
-        result.append({
-            "post_id": post.id,
-            "image_url": post.image_url,
-            "caption": post.caption,
-            "created_at": to_utc(post.created_at),
-            "likes_count": post.likes_count,
-            "comments_count": post.comments_count,
-            "location": {
-                "name": post.location_name,
-                "longitude": post.longitude,
-                "latitude": post.latitude
-            },
-            "is_liked": post.id in liked_post_ids,
-            "user": {
-                "user_id": user.id,
-                "username": user.username,
-                "avatar_url": profile.avatar_url if profile else None,
-                "is_following": user.id in following_ids,
-            }
-        })
+    result = [
+        post_card(post, post.id in liked_post_ids, post.user_id in following_ids, post.id in saved_post_ids)
+        for post in post_objs
+    ]
 
     # Determine if this is the last page
-    is_end = len(post_objs) < limit
-    return {"posts": result, "isEnd": is_end}
+    is_end = tail_limit > 0 and len(tail_posts) < tail_limit
+    next_cursor = None
+    if not is_end:
+        if tail_posts:
+            last = tail_posts[-1]
+            next_cursor = encode_cursor(snapshot_id, int(last.user_id in following_ids), last.created_at, last.id)
+        else:
+            next_cursor = encode_cursor(snapshot_id, position + len(head_ids))
+    return FastJSONResponse({"posts": result, "isEnd": is_end, "nextCursor": next_cursor})
+
+
+def nearby_candidates_query(db: Session, cell: str, following_ids: Optional[set]):
+    # The 3x3 block of cells around the viewer; filtering on geo_region lets Postgres
+    # prune to the partitions covering it
+    hashes = [cell] + geohash.neighbors(cell)
+    query = db.query(PostLocation.post_id).filter(
+        PostLocation.geo_region.in_({geo_region(h) for h in hashes}),
+        or_(*[PostLocation.geohash.startswith(h) for h in hashes])
+    )
+    if following_ids is not None:
+        query = query.filter(PostLocation.user_id.in_(following_ids))
+    return query
+
+
+def count_capped(query, cap: int) -> int:
+    # Counts at most cap rows, so probing a dense city costs no more than a sparse town
+    return query.session.query(func.count()).select_from(query.limit(cap).subquery()).scalar()
+
+
+def select_nearby_candidates(db: Session, user_geohash: str, precision: int, target: int, following_ids: Optional[set]):
+    # Widen (shorter geohash) while the ring has too few posts, narrow (longer geohash)
+    # while it has many times more than needed, probing at most NEARBY_MAX_PROBES rings
+    dense = target * NEARBY_DENSE_FACTOR
+    query = nearby_candidates_query(db, user_geohash[:precision], following_ids)
+    count = count_capped(query, dense + 1)
+    direction = -1 if count < target else (1 if count > dense else 0)
+
+    for _ in range(NEARBY_MAX_PROBES - 1):
+        next_precision = precision + direction
+        if direction == 0 or not (1 <= next_precision <= len(user_geohash)):
+            break
+        next_query = nearby_candidates_query(db, user_geohash[:next_precision], following_ids)
+        next_count = count_capped(next_query, dense + 1)
+
+        if direction > 0 and next_count < target:
+            break  # Narrowing further would leave too few candidates
+        precision, query, count = next_precision, next_query, next_count
+        if (direction < 0 and count >= target) or (direction > 0 and count <= dense):
+            break
+
+    return query
 
 
 @router.get("/geographic-nearby", response_model=models.NearbyPostsResponse)
@@ -115,35 +195,37 @@ def geographic_nearby_feed(
     zoom: int = Query(5, ge=1, le=18),
     following_only: bool = Query(False),
     limit: int = Query(20, ge=1, le=50),
-    db: Session = Depends(get_db),
-    current_user: AuthUser = Depends(get_current_user)
+    db: Session = Depends(get_read_db),
+    current_user: AuthUser = Depends(get_current_read_user)
 ):
     if not (-90 <= latitude <= 90) or not (-180 <= longitude <= 180):
         raise HTTPException(status_code=400, detail="Invalid latitude or longitude")
     
-    # Get geohash precision based on zoom level
-    precision = get_geohash_precision_from_zoom(zoom)
-    user_geohash = geohash.encode(latitude, longitude, precision=8)
-    user_geohash = user_geohash[:precision]
-    neighbors = geohash.neighbors(user_geohash)
-    all_hashes = [user_geohash] + neighbors
-
-    # Preselect nearby posts (limit to limit*5 for performance)
-    query = db.query(Post).filter(or_(*[Post.geoHash.startswith(h) for h in all_hashes]))
-
-    # If following_only is True, filter to only posts from followed users
+    # Restrict to followed users if following_only is True
+    following_ids_set = None
     if following_only:
         following_ids = db.query(Following.following_id).filter(
             Following.follower_id == current_user.id
         ).all()
         following_ids_set = {row[0] for row in following_ids}
-        query = query.filter(Post.user_id.in_(following_ids_set))
 
-    preselected_posts = query.order_by(Post.created_at.desc()).limit(limit * 5).all()
+    # Preselect nearby post IDs (limit to limit*5 for performance) from a geohash ring sized
+    # to local density, starting from the precision the zoom level suggests
+    target = limit * 5
+    user_geohash = geohash.encode(latitude, longitude, precision=8)
+    query = select_nearby_candidates(db, user_geohash, get_geohash_precision_from_zoom(zoom), target, following_ids_set)
+
+    candidate_ids = [row[0] for row in query.order_by(PostLocation.created_at.desc()).limit(target).all()]
+    preselected_posts = (
+        db.query(Post)
+        .options(joinedload(Post.user).joinedload(AuthUser.profile))
+        .filter(Post.id.in_(candidate_ids), Post.deleted_at.is_(None))
+        .all()
+    ) if candidate_ids else []
 
     # If no posts found, return empty response
     if not preselected_posts:
-        return models.NearbyPostsResponse(posts=[])
+        return FastJSONResponse({"posts": []})
 
     # Calculate raw metrics and store
     now = datetime.now(timezone.utc)
@@ -183,14 +265,8 @@ def geographic_nearby_feed(
     post_ids = [post.id for post in final_posts]
 
 
-    # Find which of these posts the current user has liked
-    liked_post_ids = {
-        like.post_id
-        for like in db.query(PostLike).filter(
-            PostLike.user_id == current_user.id,
-            PostLike.post_id.in_(post_ids)
-        ).all()
-    }
+    # Viewer flags from the cached engagement snapshot
+    liked_post_ids, saved_post_ids = engagement_cache.flags(db, current_user, post_ids)
 
     # Query once: get following IDs as a list
     following_ids_list = db.query(Following.following_id).filter(
@@ -201,33 +277,12 @@ def geographic_nearby_feed(
     following_ids = {row[0] for row in following_ids_list}
 
     # Build response
-    result = []
-    for post in final_posts:
-        user = post.user
-        profile = user.profile
-
-        result.append({
-            "post_id": post.id,
-            "image_url": post.image_url,
-            "caption": post.caption,
-            "created_at": to_utc(post.created_at),
-            "likes_count": post.likes_count,
-            "comments_count": post.comments_count,
-            "location": {
-                "name": post.location_name,
-                "longitude": post.longitude,
-                "latitude": post.latitude
-            },
-            "is_liked": post.id in liked_post_ids,
-            "user": {
-                "user_id": user.id,
-                "username": user.username,
-                "avatar_url": profile.avatar_url if profile else None,
-                "is_following": user.id in following_ids,
-            }
-        })
-
-    return models.NearbyPostsResponse(posts=result)
+    result = [
+        post_card(post, post.id in liked_post_ids, post.user_id in following_ids, post.id in saved_post_ids)
+        for post in final_posts
+    ]
+
+    return FastJSONResponse({"posts": result})
 
     
 
@@ -236,7 +291,7 @@ def geographic_nearby_feed(
 # ---------------------------
 @router.post("/like", status_code=status.HTTP_200_OK)
 def like_post(data: models.PostLikeInput, db: Session = Depends(get_db), current_user: AuthUser = Depends(get_current_user)):
-    post = db.query(Post).filter(Post.id == data.post_id).first()
+    post = db.query(Post).filter(Post.id == data.post_id, Post.deleted_at.is_(None)).first()
     if not post:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
 
@@ -251,8 +306,15 @@ def like_post(data: models.PostLikeInput, db: Session = Depends(get_db), current
 
     # Increment like count
     post.likes_count += 1
+    likes_count = post.likes_count
+    record_activity(db, current_user.id, "like_post", post_id=data.post_id, target_user_id=post.user_id)
+    record_affinity(db, current_user.id, post.user_id, "like_post")
+    engagement_version = bump_engagement_version(db, current_user)
+    notify(db, post.user_id, current_user.id, "like_post", post_id=data.post_id)
 
     db.commit()
+    engagement_cache.record(current_user.id, "liked", data.post_id, True, engagement_version)
+    publish_event(f"post:{data.post_id}", "post_liked", post_id=data.post_id, user_id=current_user.id, likes_count=likes_count)
     return Response(status_code=status.HTTP_200_OK)
 
 
@@ -261,7 +323,7 @@ def like_post(data: models.PostLikeInput, db: Session = Depends(get_db), current
 # ---------------------------
 @router.post("/unlike", status_code=status.HTTP_200_OK)
 def unlike_post(data: models.PostLikeInput, db: Session = Depends(get_db), current_user: AuthUser = Depends(get_current_user)):
-    post = db.query(Post).filter(Post.id == data.post_id).first()
+    post = db.query(Post).filter(Post.id == data.post_id, Post.deleted_at.is_(None)).first()
     if not post:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
 
@@ -275,8 +337,14 @@ def unlike_post(data: models.PostLikeInput, db: Session = Depends(get_db), curre
     # Decrement like count
     if post.likes_count > 0:
         post.likes_count -= 1
+    likes_count = post.likes_count
+    record_activity(db, current_user.id, "unlike_post", post_id=data.post_id, target_user_id=post.user_id)
+    record_affinity(db, current_user.id, post.user_id, "unlike_post")
+    engagement_version = bump_engagement_version(db, current_user)
 
     db.commit()
+    engagement_cache.record(current_user.id, "liked", data.post_id, False, engagement_version)
+    publish_event(f"post:{data.post_id}", "post_unliked", post_id=data.post_id, user_id=current_user.id, likes_count=likes_count)
     return Response(status_code=status.HTTP_200_OK)
 
 
@@ -300,8 +368,11 @@ def like_comment(data: models.CommentLikeInput, db: Session = Depends(get_db), c
 
     # Increment like count
     comment.likes_count += 1
+    post_id, likes_count = comment.post_id, comment.likes_count
+    record_activity(db, current_user.id, "like_comment", post_id=post_id, comment_id=data.comment_id, target_user_id=comment.user_id)
 
     db.commit()
+    publish_event(f"post:{post_id}", "comment_liked", post_id=post_id, comment_id=data.comment_id, likes_count=likes_count)
     return Response(status_code=status.HTTP_200_OK)
 
 
@@ -324,8 +395,11 @@ def unlike_comment(data: models.CommentLikeInput, db: Session = Depends(get_db),
     # Decrement like count
     if comment.likes_count > 0:
         comment.likes_count -= 1
+    post_id, likes_count = comment.post_id, comment.likes_count
+    record_activity(db, current_user.id, "unlike_comment", post_id=post_id, comment_id=data.comment_id, target_user_id=comment.user_id)
 
     db.commit()
+    publish_event(f"post:{post_id}", "comment_unliked", post_id=post_id, comment_id=data.comment_id, likes_count=likes_count)
     return Response(status_code=status.HTTP_200_OK)
 
 
@@ -334,7 +408,7 @@ def unlike_comment(data: models.CommentLikeInput, db: Session = Depends(get_db),
 # ---------------------------
 @router.post("/save-post", status_code=status.HTTP_200_OK)
 def save_post(data: models.SavedPostInput, db: Session = Depends(get_db), current_user: AuthUser = Depends(get_current_user)):
-    post = db.query(Post).filter(Post.id == data.post_id).first()
+    post = db.query(Post).filter(Post.id == data.post_id, Post.deleted_at.is_(None)).first()
     if not post:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
 
@@ -346,8 +420,12 @@ def save_post(data: models.SavedPostInput, db: Session = Depends(get_db), curren
     # Create new save
     new_save = SavedPost(user_id=current_user.id, post_id=data.post_id)
     db.add(new_save)
+    record_activity(db, current_user.id, "save_post", post_id=data.post_id, target_user_id=post.user_id)
+    record_affinity(db, current_user.id, post.user_id, "save_post")
+    engagement_version = bump_engagement_version(db, current_user)
 
     db.commit()
+    engagement_cache.record(current_user.id, "saved", data.post_id, True, engagement_version)
     return Response(status_code=status.HTTP_200_OK)
 
 
@@ -356,7 +434,7 @@ def save_post(data: models.SavedPostInput, db: Session = Depends(get_db), curren
 # ---------------------------
 @router.post("/unsave-post", status_code=status.HTTP_200_OK)
 def unsave_post(data: models.SavedPostInput, db: Session = Depends(get_db), current_user: AuthUser = Depends(get_current_user)):
-    post = db.query(Post).filter(Post.id == data.post_id).first()
+    post = db.query(Post).filter(Post.id == data.post_id, Post.deleted_at.is_(None)).first()
     if not post:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
 
@@ -366,8 +444,12 @@ def unsave_post(data: models.SavedPostInput, db: Session = Depends(get_db), curr
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Save not found for this user")
 
     db.delete(save)
+    record_activity(db, current_user.id, "unsave_post", post_id=data.post_id, target_user_id=post.user_id)
+    record_affinity(db, current_user.id, post.user_id, "unsave_post")
+    engagement_version = bump_engagement_version(db, current_user)
 
     db.commit()
+    engagement_cache.record(current_user.id, "saved", data.post_id, False, engagement_version)
     return Response(status_code=status.HTTP_200_OK)
 
 
@@ -392,6 +474,9 @@ def create_post(
         # Currently overrides location_name if provided
         data.location_name = get_location_name_from_coords(data.latitude, data.longitude)
 
+    # Dimensions recorded when the image was uploaded and validated
+    media = db.get(MediaFile, data.image_url.rsplit("/", 1)[-1])
+
     new_post = Post(
         user_id=current_user.id,
         image_url=data.image_url,
@@ -399,15 +484,31 @@ def create_post(
         location_name=data.location_name,
         latitude=data.latitude,
         longitude=data.longitude,
-        geoHash=geo_hash
+        geoHash=geo_hash,
+        width=media.width if media else None,
+        height=media.height if media else None
     )
     db.add(new_post)
 
     # Increment user's post count
     current_user.profile.posts_count += 1
 
+    # Flush to assign the post ID for the activity log, location and caption indexes
+    db.flush()
+    if geo_hash:
+        db.add(PostLocation(
+            geo_region=geo_region(geo_hash),
+            post_id=new_post.id,
+            geohash=geo_hash,
+            user_id=current_user.id
+        ))
+    index_captions(db, [(new_post.id, current_user.id, new_post.caption, None)])
+    record_activity(db, current_user.id, "create_post", post_id=new_post.id)
+    bump_feed_version(current_user)
+
     db.commit()
     db.refresh(new_post)
+    publish_event(f"user:{current_user.id}", "post_created", post_id=new_post.id, user_id=current_user.id)
     return {"post_id": new_post.id}
 
 
@@ -420,19 +521,29 @@ def delete_post(
     db: Session = Depends(get_db),
     current_user: AuthUser = Depends(get_current_user)
 ):
-    post = db.query(Post).filter(Post.id == data.post_id).first()
+    post = db.query(Post).filter(Post.id == data.post_id, Post.deleted_at.is_(None)).first()
     if not post:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
     if post.user_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You do not have permission to delete this post")
 
-    db.delete(post)
+    # Soft delete: hidden from reads now, likes/comments/saves are removed by the purger
+    post.deleted_at = datetime.now(timezone.utc)
+    if post.geoHash:
+        db.query(PostLocation).filter(
+            PostLocation.geo_region == geo_region(post.geoHash),
+            PostLocation.post_id == post.id
+        ).delete(synchronize_session=False)
+    unindex_post_tags(db, post.id)
 
     # Decrement user's post count
     if current_user.profile.posts_count > 0:
         current_user.profile.posts_count -= 1
+    record_activity(db, current_user.id, "delete_post", post_id=data.post_id)
 
     db.commit()
+    purger.wake()
+    publish_event(f"post:{data.post_id}", "post_deleted", post_id=data.post_id)
     return Response(status_code=status.HTTP_200_OK)
 
 
@@ -445,7 +556,7 @@ def add_comment(
     db: Session = Depends(get_db),
     current_user: AuthUser = Depends(get_current_user)
 ):
-    post = db.query(Post).filter(Post.id == data.post_id).first()
+    post = db.query(Post).filter(Post.id == data.post_id, Post.deleted_at.is_(None)).first()
     if not post:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
 
@@ -456,8 +567,17 @@ def add_comment(
     )
     db.add(new_comment)
     post.comments_count += 1
+    comments_count = post.comments_count
+    db.flush()
+    record_activity(db, current_user.id, "comment", post_id=data.post_id, comment_id=new_comment.id, target_user_id=post.user_id)
+    record_affinity(db, current_user.id, post.user_id, "comment")
+    notify(db, post.user_id, current_user.id, "comment", post_id=data.post_id)
     db.commit()
     db.refresh(new_comment)
+    publish_event(
+        f"post:{data.post_id}", "comment_added",
+        post_id=data.post_id, comment_id=new_comment.id, user_id=current_user.id, comments_count=comments_count
+    )
 
     return {
         "comment_id": new_comment.id,
@@ -479,31 +599,66 @@ def add_comment(
 @router.get("/{post_id}/comments", response_model=models.PaginatedCommentsResponse)
 def get_post_comments(
     post_id: int,
-    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None),
     limit: int = Query(10, ge=1, le=50),
-    db: Session = Depends(get_db),
-    current_user: AuthUser = Depends(get_current_user)
+    sort: str = Query("top", pattern="^(top|newest)$"),
+    db: Session = Depends(get_read_db),
+    current_user: AuthUser = Depends(get_current_read_user)
 ):
-    # Validate post exists
-    post = db.query(Post).filter(Post.id == post_id).first()
-    if not post:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
-
-    # Eager-load user and profile on each comment
-    comments = (
-        db.query(Comment)
-        .options(
-            joinedload(Comment.user).joinedload(AuthUser.profile)
+    # Keyset on (likes_count, id) or (created_at, id), both served by a (post_id, key, id) index
+    if sort == "newest":
+        sort_key, key_type = Comment.created_at, datetime
+    else:
+        sort_key, key_type = Comment.likes_count, int
+
+    last_key = last_id = None
+    if cursor:
+        try:
+            last_key, last_id = decode_cursor(cursor, key_type, int)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+    # The page itself is the same for every viewer, so identical concurrent requests share one fetch
+    def fetch_page():
+        # Validate post exists
+        post = db.query(Post).filter(Post.id == post_id, Post.deleted_at.is_(None)).first()
+        if not post:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
+
+        # Comments of deleted accounts disappear at once; the purger removes them later
+        query = (
+            db.query(Comment)
+            .join(Comment.user)
+            .options(
+                contains_eager(Comment.user).joinedload(AuthUser.profile)
+            )
+            .filter(Comment.post_id == post_id, AuthUser.deleted_at.is_(None))
         )
-        .filter(Comment.post_id == post_id)
-        .order_by(Comment.likes_count.desc())
-        .offset(offset)
-        .limit(limit)
-        .all()
-    )
+        if cursor:
+            query = query.filter(tuple_(sort_key, Comment.id) < tuple_(keyset_value(last_key), last_id))
+
+        # Fetch one extra row to know whether another page exists
+        comments = (
+            query
+            .order_by(sort_key.desc(), Comment.id.desc())
+            .limit(limit + 1)
+            .all()
+        )
+        is_end = len(comments) <= limit
+        comments = comments[:limit]
+
+        next_cursor = None
+        if not is_end:
+            last = comments[-1]
+            next_cursor = encode_cursor(last.created_at if sort == "newest" else last.likes_count, last.id)
+
+        cards = [comment_card(comment, None) for comment in comments]
+        return {"comments": cards, "isEnd": is_end, "nextCursor": next_cursor}
 
-    # Batch load liked comment IDs
-    comment_ids = [comment.id for comment in comments]
+    page = coalesce_read(("post-comments", post_id, cursor, limit, sort), fetch_page)
+
+    # Batch load liked comment IDs for this viewer
+    comment_ids = [card["comment_id"] for card in page["comments"]]
     liked_comment_ids = {
         like.comment_id
         for like in db.query(CommentLike).filter(
@@ -512,22 +667,6 @@ def get_post_comments(
         ).all()
     }
 
-    # Format response
-    result = []
-    for comment in comments:
-        result.append({
-            "comment_id": comment.id,
-            "content": comment.content,
-            "created_at": to_utc(comment.created_at),
-            "likes_count": comment.likes_count,
-            "is_liked": comment.id in liked_comment_ids,
-            "user": {
-                "user_id": comment.user.id,
-                "username": comment.user.username,
-                "avatar_url": comment.user.profile.avatar_url if comment.user.profile else None,
-            }
-        })
-
-    # Determine if this is the last page
-    is_end = len(comments) < limit
-    return {"comments": result, "isEnd": is_end}
\ No newline at end of file
+    # Format response (copies, since the page may be shared with other requests)
+    result = [{**card, "is_liked": card["comment_id"] in liked_comment_ids} for card in page["comments"]]
+    return FastJSONResponse({"comments": result, "isEnd": page["isEnd"], "nextCursor": page["nextCursor"]})
@@ -0,0 +1,292 @@
+# Background removal of soft-deleted posts and accounts.
+# Delete routes only set deleted_at (reads skip those rows right away) and wake the
+# purger. It removes dependent rows with one set-based DELETE per table, in batches
+# of PURGE_BATCH_SIZE, each in its own short transaction, so a viral post or a large
+# account never loads its rows into memory or holds long locks. Counters on surviving
+# rows are recounted for what each batch touched, which keeps re-runs idempotent.
+# Foreign keys declare ON DELETE CASCADE for databases created with it; the purger does
+# not depend on that, so older schemas behave the same. Uploaded files that no surviving
+# post or avatar uses are deleted with their media_files rows.
+#   python purger.py    # one full pass, e.g. from cron when the API purger is disabled
+from sqlalchemy import delete, func, or_, select, tuple_, update
+from sqlalchemy.orm import Session
+from datetime import datetime, timezone
+from typing import Callable, Optional
+import threading
+import os
+
+from database import (
+    AuthRefreshToken,
+    AuthUser,
+    Comment,
+    CommentLike,
+    Following,
+    MediaFile,
+    Notification,
+    NotificationActor,
+    NotificationInbox,
+    Post,
+    PostLike,
+    PostLocation,
+    PostMention,
+    PostTag,
+    SavedPost,
+    UserAffinity,
+    UserProfile,
+    SessionLocal,
+)
+from tags import recount_tags
+from file import get_storage
+
+
+PURGE_BATCH_SIZE = int(os.getenv("PURGE_BATCH_SIZE", 1000))
+# Filenames checked against surviving posts per query
+MEDIA_REFERENCE_CHUNK = 100
+PURGE_INTERVAL = float(os.getenv("PURGE_INTERVAL", 60))
+PURGER_ENABLED = os.getenv("PURGER_ENABLED", "true").lower() == "true"
+
+
+def delete_in_batches(
+    db: Session,
+    model,
+    condition,
+    key_columns: list,
+    touched_column=None,
+    recount: Optional[Callable[[Session, set], None]] = None,
+) -> int:
+    # Repeatedly picks up to PURGE_BATCH_SIZE matching keys and deletes exactly those rows
+    columns = key_columns + ([touched_column] if touched_column is not None else [])
+    total = 0
+    while True:
+        rows = db.execute(select(*columns).where(condition).limit(PURGE_BATCH_SIZE)).all()
+        if not rows:
+            return total
+
+        if len(key_columns) == 1:
+            match = key_columns[0].in_([row[0] for row in rows])
+        else:
+            match = tuple_(*key_columns).in_([tuple(row[:len(key_columns)]) for row in rows])
+        db.execute(delete(model).where(match))
+
+        if recount is not None:
+            recount(db, {row[-1] for row in rows})
+        db.commit()
+
+        total += len(rows)
+        if len(rows) < PURGE_BATCH_SIZE:
+            return total
+
+
+# ---------------------------
+# Counter recounts
+# ---------------------------
+def recount_post_likes(db: Session, post_ids: set):
+    count = select(func.count()).where(PostLike.post_id == Post.id).scalar_subquery()
+    db.execute(update(Post).where(Post.id.in_(post_ids)).values(likes_count=count))
+
+
+def recount_post_comments(db: Session, post_ids: set):
+    count = select(func.count()).where(Comment.post_id == Post.id).scalar_subquery()
+    db.execute(update(Post).where(Post.id.in_(post_ids)).values(comments_count=count))
+
+
+def recount_comment_likes(db: Session, comment_ids: set):
+    count = select(func.count()).where(CommentLike.comment_id == Comment.id).scalar_subquery()
+    db.execute(update(Comment).where(Comment.id.in_(comment_ids)).values(likes_count=count))
+
+
+def recount_followers(db: Session, user_ids: set):
+    count = select(func.count()).where(Following.following_id == UserProfile.user_id).scalar_subquery()
+    db.execute(update(UserProfile).where(UserProfile.user_id.in_(user_ids)).values(followers_count=count))
+
+
+def recount_following(db: Session, user_ids: set):
+    count = select(func.count()).where(Following.follower_id == UserProfile.user_id).scalar_subquery()
+    db.execute(update(UserProfile).where(UserProfile.user_id.in_(user_ids)).values(following_count=count))
+
+
+# ---------------------------
+# Uploaded media
+# ---------------------------
+def media_filename(image_url: str) -> str:
+    return image_url.rsplit("/", 1)[-1]
+
+
+def purge_media(db: Session, filenames: set):
+    # Uploads are content-addressed, so one file can back several posts and avatars: only
+    # files nothing surviving points at are removed. Matched on the filename suffix rather
+    # than the full URL, which carries whatever SERVER_URL was set when the link was made.
+    filenames = list(filenames)
+    referenced = set()
+    for i in range(0, len(filenames), MEDIA_REFERENCE_CHUNK):
+        chunk = filenames[i:i + MEDIA_REFERENCE_CHUNK]
+        for column in (Post.image_url, UserProfile.avatar_url):
+            urls = db.scalars(select(column).where(or_(*(column.endswith("/" + name) for name in chunk)))).all()
+            referenced.update(media_filename(url) for url in urls)
+    orphans = [name for name in filenames if name not in referenced]
+    if not orphans:
+        return
+
+    db.execute(delete(MediaFile).where(MediaFile.filename.in_(orphans)))
+    db.commit()
+    storage = get_storage()
+    for name in orphans:
+        storage.delete(name)
+
+
+# ---------------------------
+# Purge passes
+# ---------------------------
+def purge_posts(db: Session, post_ids: list):
+    filenames = {media_filename(url) for url in db.scalars(select(Post.image_url).where(Post.id.in_(post_ids)))}
+    post_comments = select(Comment.id).where(Comment.post_id.in_(post_ids))
+    delete_in_batches(db, CommentLike, CommentLike.comment_id.in_(post_comments), [CommentLike.user_id, CommentLike.comment_id])
+    delete_in_batches(db, Comment, Comment.post_id.in_(post_ids), [Comment.id])
+    delete_in_batches(db, PostLike, PostLike.post_id.in_(post_ids), [PostLike.user_id, PostLike.post_id])
+    delete_in_batches(db, SavedPost, SavedPost.post_id.in_(post_ids), [SavedPost.user_id, SavedPost.post_id])
+    delete_in_batches(
+        db, PostTag, PostTag.post_id.in_(post_ids), [PostTag.tag, PostTag.post_id],
+        touched_column=PostTag.tag, recount=recount_tags,
+    )
+    delete_in_batches(db, PostMention, PostMention.post_id.in_(post_ids), [PostMention.user_id, PostMention.post_id])
+    db.execute(delete(PostLocation).where(PostLocation.post_id.in_(post_ids)))
+    db.execute(delete(Post).where(Post.id.in_(post_ids)))
+    db.commit()
+    purge_media(db, filenames)
+
+
+def purge_users(db: Session, user_ids: list):
+    # Their own posts were soft-deleted with the account and are purged by purge_posts
+    user_comments = select(Comment.id).where(Comment.user_id.in_(user_ids))
+    delete_in_batches(db, CommentLike, CommentLike.comment_id.in_(user_comments), [CommentLike.user_id, CommentLike.comment_id])
+    delete_in_batches(
+        db, CommentLike, CommentLike.user_id.in_(user_ids), [CommentLike.user_id, CommentLike.comment_id],
+        touched_column=CommentLike.comment_id, recount=recount_comment_likes,
+    )
+    delete_in_batches(
+        db, Comment, Comment.user_id.in_(user_ids), [Comment.id],
+        touched_column=Comment.post_id, recount=recount_post_comments,
+    )
+    delete_in_batches(
+        db, PostLike, PostLike.user_id.in_(user_ids), [PostLike.user_id, PostLike.post_id],
+        touched_column=PostLike.post_id, recount=recount_post_likes,
+    )
+    delete_in_batches(db, SavedPost, SavedPost.user_id.in_(user_ids), [SavedPost.user_id, SavedPost.post_id])
+    delete_in_batches(
+        db, Following, Following.follower_id.in_(user_ids), [Following.follower_id, Following.following_id],
+        touched_column=Following.following_id, recount=recount_followers,
+    )
+    delete_in_batches(
+        db, Following, Following.following_id.in_(user_ids), [Following.follower_id, Following.following_id],
+        touched_column=Following.follower_id, recount=recount_following,
+    )
+    user_notifications = select(Notification.id).where(Notification.user_id.in_(user_ids))
+    delete_in_batches(
+        db, NotificationActor,
+        or_(NotificationActor.notification_id.in_(user_notifications), NotificationActor.actor_id.in_(user_ids)),
+        [NotificationActor.notification_id, NotificationActor.actor_id],
+    )
+    delete_in_batches(db, Notification, Notification.user_id.in_(user_ids), [Notification.id])
+    delete_in_batches(db, PostMention, PostMention.user_id.in_(user_ids), [PostMention.user_id, PostMention.post_id])
+    delete_in_batches(
+        db, UserAffinity, or_(UserAffinity.viewer_id.in_(user_ids), UserAffinity.author_id.in_(user_ids)),
+        [UserAffinity.viewer_id, UserAffinity.author_id],
+    )
+
+    db.execute(delete(AuthRefreshToken).where(AuthRefreshToken.user_id.in_(user_ids)))
+    db.execute(delete(NotificationInbox).where(NotificationInbox.user_id.in_(user_ids)))
+    db.execute(delete(UserProfile).where(UserProfile.user_id.in_(user_ids)))
+    # Uploads the account never posted (its avatar, unused uploads); files its posts used
+    # were handled with those posts
+    uploads = set(db.scalars(select(MediaFile.filename).where(MediaFile.uploaded_by.in_(user_ids))))
+    db.execute(delete(AuthUser).where(AuthUser.id.in_(user_ids)))
+    db.commit()
+    purge_media(db, uploads)
+
+
+def run_purge_pass(db: Session) -> int:
+    purged = 0
+
+    # Posts a deleted account still owns (e.g. created concurrently with the deletion)
+    deleted_users = select(AuthUser.id).where(AuthUser.deleted_at.isnot(None))
+    db.execute(
+        update(Post)
+        .where(Post.user_id.in_(deleted_users), Post.deleted_at.is_(None))
+        .values(deleted_at=datetime.now(timezone.utc))
+    )
+    db.execute(
+        delete(PostLocation)
+        .where(PostLocation.post_id.in_(select(Post.id).where(Post.user_id.in_(deleted_users))))
+    )
+    db.commit()
+
+    while True:
+        post_ids = db.scalars(select(Post.id).where(Post.deleted_at.isnot(None)).limit(PURGE_BATCH_SIZE)).all()
+        if not post_ids:
+            break
+        purge_posts(db, post_ids)
+        purged += len(post_ids)
+
+    while True:
+        user_ids = db.scalars(select(AuthUser.id).where(AuthUser.deleted_at.isnot(None)).limit(PURGE_BATCH_SIZE)).all()
+        if not user_ids:
+            break
+        purge_users(db, user_ids)
+        purged += len(user_ids)
+
+    return purged
+
+
+# Background thread that runs a purge pass when woken and every PURGE_INTERVAL seconds
+class Purger:
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def wake(self):
+        if not PURGER_ENABLED:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="purger", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+
+            db = SessionLocal()
+            try:
+                run_purge_pass(db)
+            except Exception as e:
+                db.rollback()
+                print(f"purger: pass failed: {e}")
+            finally:
+                db.close()
+
+    def shutdown(self, timeout: float = 5.0):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            self._wake.set()
+            thread.join(timeout)
+
+
+purger = Purger(PURGE_INTERVAL)
+
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        print(f"Purged {run_purge_pass(db)} posts and accounts")
+    finally:
+        db.close()
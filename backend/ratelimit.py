@@ -0,0 +1,151 @@
+from fastapi import HTTPException
+from starlette.requests import HTTPConnection
+from starlette.responses import JSONResponse
+from collections import OrderedDict, namedtuple
+from typing import List, Optional, Tuple
+import threading
+import time
+import math
+import os
+
+from auth import get_user_id_from_token
+
+
+RATE_LIMITS_ENABLED = os.getenv("RATE_LIMITS_ENABLED", "true").lower() == "true"
+# Server processes, each with its own in-memory buckets; gunicorn.conf.py exports its worker count here
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", 1))
+# Only trust X-Forwarded-For behind a proxy that sets it
+TRUST_FORWARDED_FOR = os.getenv("TRUST_FORWARDED_FOR", "false").lower() == "true"
+
+# capacity = burst size, rate = tokens refilled per second
+RateLimit = namedtuple("RateLimit", ["capacity", "rate"])
+
+# The limits below are for the whole deployment. Per-process stores split them evenly
+# between workers (see InMemoryRateLimitStore).
+
+# Per-client limits, keyed by user ID from the JWT or by IP for anonymous calls
+ROUTE_LIMITS = {
+    ("POST", "/auth/login"): RateLimit(5, 5 / 60),
+    ("POST", "/auth/token"): RateLimit(5, 5 / 60),
+    ("POST", "/auth/register"): RateLimit(3, 3 / 60),
+    ("POST", "/posts/like"): RateLimit(30, 1),
+    ("POST", "/posts/unlike"): RateLimit(30, 1),
+    ("POST", "/posts/add-comment"): RateLimit(10, 0.2),
+    ("POST", "/posts/create"): RateLimit(10, 0.05),
+    ("POST", "/file/upload-file"): RateLimit(10, 0.1),
+}
+# Applied to every request from a client, on top of any route limit
+DEFAULT_CLIENT_LIMIT = RateLimit(100, 20)
+# Not limited at all: static files are keyed by IP, so a page of images behind one NAT
+# would otherwise spend the API budget of everyone sharing the address
+EXEMPT_PATH_PREFIXES = ("/static/",)
+# Shared by all clients: protects the geocoder quota behind create_post
+GLOBAL_LIMITS = {
+    ("POST", "/posts/create"): RateLimit(50, 10),
+}
+
+
+# Token buckets held in process memory, bounded by evicting least recently used keys.
+# take() is the whole interface, so a shared store (e.g. Redis) can replace it.
+# Each of `workers` processes holds its own buckets, so every limit is divided between
+# them: the deployment-wide rate holds however requests spread. A client pinned to one
+# worker by keep-alive gets only that worker's share, and a burst is never below one
+# request per worker, so the smallest limits allow up to `workers` requests at once.
+class InMemoryRateLimitStore:
+    def __init__(self, max_keys: int = 100_000, workers: int = 1):
+        self.max_keys = max_keys
+        self.workers = max(1, workers)
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def share(self, limit: RateLimit) -> RateLimit:
+        return RateLimit(max(1, limit.capacity / self.workers), limit.rate / self.workers)
+
+    def take(self, buckets: List[Tuple[str, RateLimit]]) -> float:
+        # Takes one token from every bucket, or from none: returns 0 when all had one,
+        # else seconds until the slowest is available. A rejected request spends nothing.
+        now = time.monotonic()
+        with self._lock:
+            refilled, wait = [], 0.0
+            for key, limit in buckets:
+                limit = self.share(limit)
+                tokens, updated = self._buckets.pop(key, (limit.capacity, now))
+                tokens = min(limit.capacity, tokens + (now - updated) * limit.rate)
+                refilled.append((key, tokens))
+                if tokens < 1:
+                    wait = max(wait, (1 - tokens) / limit.rate)
+            for key, tokens in refilled:
+                self._buckets[key] = (tokens if wait else tokens - 1, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+# Store factory (swap via RATE_LIMIT_BACKEND, or set_rate_limit_store() for a shared store)
+_store = None
+
+def get_rate_limit_store():
+    global _store
+    if _store is None:
+        backend = os.getenv("RATE_LIMIT_BACKEND", "memory")
+        if backend != "memory":
+            raise ValueError(f"Unsupported rate limit backend: {backend}")
+        _store = InMemoryRateLimitStore(workers=WEB_CONCURRENCY)
+    return _store
+
+def set_rate_limit_store(store):
+    global _store
+    _store = store
+
+
+def client_key(conn: HTTPConnection) -> str:
+    auth_header = conn.headers.get("authorization", "")
+    if auth_header.lower().startswith("bearer "):
+        try:
+            return f"user:{get_user_id_from_token(auth_header[7:])}"
+        except HTTPException:
+            pass  # Expired or invalid token: limit by IP instead
+
+    if TRUST_FORWARDED_FOR and conn.headers.get("x-forwarded-for"):
+        return "ip:" + conn.headers["x-forwarded-for"].split(",")[0].strip()
+    return f"ip:{conn.client.host if conn.client else 'unknown'}"
+
+
+# Rejects over-limit requests with 429 before routing, so no DB session is opened for them
+class RateLimitMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not RATE_LIMITS_ENABLED or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        wait = self.check(HTTPConnection(scope))
+        if wait:
+            response = JSONResponse(
+                {"detail": "Too many requests"},
+                status_code=429,
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+    def check(self, conn: HTTPConnection) -> Optional[float]:
+        route = (conn.scope["method"], conn.scope["path"])
+        if route[1].startswith(EXEMPT_PATH_PREFIXES):
+            return None
+        client = client_key(conn)
+
+        # The client's own buckets come first and the shared one last, so a client over
+        # its limit is turned away without touching what other clients share
+        buckets = []
+        route_limit = ROUTE_LIMITS.get(route)
+        if route_limit:
+            buckets.append((f"{client}:{route[0]}:{route[1]}", route_limit))
+        buckets.append((f"{client}:*", DEFAULT_CLIENT_LIMIT))
+        global_limit = GLOBAL_LIMITS.get(route)
+        if global_limit:
+            buckets.append((f"global:{route[0]}:{route[1]}", global_limit))
+        return get_rate_limit_store().take(buckets) or None
@@ -0,0 +1,272 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status, WebSocket
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import text
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Set
+import asyncio
+import threading
+import logging
+import select
+import json
+import re
+import os
+
+from database import AuthUser, SessionLocal, engine
+from auth import get_current_user, load_current_user
+
+
+logger = logging.getLogger(__name__)
+
+TOPIC_PATTERN = re.compile(r"^(post|user):\d+$")
+MAX_TOPICS = 50
+SSE_KEEPALIVE_SECONDS = 15
+# Server processes sharing the broker; gunicorn.conf.py exports its worker count here
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", 1))
+REALTIME_CHANNEL = "realtime_events"
+REALTIME_RECONNECT_SECONDS = 1.0
+
+
+# A single client's view of the broker: a bounded queue bound to the client's event loop
+class Subscription:
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_queue_size: int):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self.topics: Set[str] = set()
+
+    def deliver(self, event: dict):
+        # Runs on the subscriber's loop. Slow clients lose their oldest deltas rather than
+        # growing memory; they can refetch to resync.
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+
+# In-process broker. publish() is thread-safe, so the sync route handlers (which run in
+# the threadpool) can call it directly after committing.
+class InMemoryBroker:
+    def __init__(self, max_queue_size: int = 100):
+        self.max_queue_size = max_queue_size
+        self._subscribers: Dict[str, Set[Subscription]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, topics: Iterable[str] = ()) -> Subscription:
+        subscription = Subscription(asyncio.get_running_loop(), self.max_queue_size)
+        self.add_topics(subscription, topics)
+        return subscription
+
+    def add_topics(self, subscription: Subscription, topics: Iterable[str]):
+        with self._lock:
+            for topic in topics:
+                subscription.topics.add(topic)
+                self._subscribers[topic].add(subscription)
+
+    def remove_topics(self, subscription: Subscription, topics: Iterable[str]):
+        with self._lock:
+            for topic in topics:
+                subscription.topics.discard(topic)
+                subscribers = self._subscribers.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[topic]
+
+    def unsubscribe(self, subscription: Subscription):
+        self.remove_topics(subscription, list(subscription.topics))
+
+    def publish(self, topic: str, event: dict):
+        with self._lock:
+            subscribers = list(self._subscribers.get(topic, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # Subscriber's loop already closed; it will be cleaned up on disconnect
+                pass
+
+    def shutdown(self):
+        pass
+
+
+# Cross-worker broker over Postgres LISTEN/NOTIFY. publish() sends a NOTIFY; every worker
+# (this one included) holds one listening connection outside the pool, and its listener
+# thread hands each notification to the worker's local subscribers.
+class PostgresBroker(InMemoryBroker):
+    def __init__(self, engine, max_queue_size: int = 100):
+        super().__init__(max_queue_size)
+        self.engine = engine
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._listen, name="realtime-listener", daemon=True)
+        self._thread.start()
+
+    def publish(self, topic: str, event: dict):
+        payload = json.dumps({"topic": topic, "event": event}, default=str)
+        with self.engine.begin() as conn:
+            conn.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": REALTIME_CHANNEL, "payload": payload})
+
+    def _connect(self):
+        cargs, cparams = self.engine.dialect.create_connect_args(self.engine.url)
+        conn = self.engine.dialect.dbapi.connect(*cargs, **cparams)
+        conn.autocommit = True
+        conn.cursor().execute(f"LISTEN {REALTIME_CHANNEL}")
+        return conn
+
+    def _listen(self):
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = self._connect()
+                while not self._stop.is_set():
+                    if select.select([conn], [], [], 1.0) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        message = json.loads(conn.notifies.pop(0).payload)
+                        InMemoryBroker.publish(self, message["topic"], message["event"])
+            except Exception:
+                # Events published while disconnected are lost; clients refetch to resync
+                logger.exception("realtime: listener connection failed, reconnecting")
+                self._stop.wait(REALTIME_RECONNECT_SECONDS)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+    def shutdown(self):
+        self._stop.set()
+        self._thread.join(timeout=5)
+
+
+# Broker factory: REALTIME_BROKER=postgres (the default on Postgres) fans out across worker
+# processes; memory only reaches subscribers of the process that published, so it is
+# refused when several workers serve the app. set_broker() installs any other broker.
+_broker = None
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        default = "postgres" if engine.dialect.name == "postgresql" else "memory"
+        backend = os.getenv("REALTIME_BROKER", default)
+        max_queue_size = int(os.getenv("REALTIME_QUEUE_SIZE", 100))
+        if backend == "postgres":
+            _broker = PostgresBroker(engine, max_queue_size=max_queue_size)
+        elif backend == "memory":
+            if WEB_CONCURRENCY > 1:
+                raise RuntimeError(
+                    f"REALTIME_BROKER=memory cannot reach subscribers across {WEB_CONCURRENCY} workers; "
+                    "use REALTIME_BROKER=postgres or a single worker"
+                )
+            _broker = InMemoryBroker(max_queue_size=max_queue_size)
+        else:
+            raise ValueError(f"Unsupported realtime broker: {backend}")
+    return _broker
+
+def set_broker(broker):
+    global _broker
+    _broker = broker
+
+def shutdown_broker():
+    if _broker is not None:
+        _broker.shutdown()
+
+
+def publish_event(topic: str, event_type: str, **payload):
+    get_broker().publish(topic, {"type": event_type, "topic": topic, **payload})
+
+
+def parse_topics(raw: Optional[str]) -> Set[str]:
+    topics = {t.strip() for t in (raw or "").split(",") if t.strip()}
+    if len(topics) > MAX_TOPICS or any(not TOPIC_PATTERN.match(t) for t in topics):
+        raise ValueError("Invalid topics")
+    return topics
+
+
+router = APIRouter(prefix="/realtime", tags=["realtime"])
+
+
+# ---------------------------
+# Server-sent events stream
+# ---------------------------
+@router.get("/events")
+async def stream_events(
+    topics: str = Query(..., description="Comma separated topics, e.g. post:12,user:3"),
+    current_user: AuthUser = Depends(get_current_user)
+):
+    try:
+        topic_set = parse_topics(topics)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid topics")
+
+    broker = get_broker()
+    subscription = broker.subscribe(topic_set)
+
+    async def stream():
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            broker.unsubscribe(subscription)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+# ---------------------------
+# WebSocket stream
+# ---------------------------
+def authenticate_socket(token: str) -> AuthUser:
+    # Same check as get_current_user: a valid token of a deleted account is refused
+    db = SessionLocal()
+    try:
+        return load_current_user(token, db)
+    finally:
+        db.close()
+
+
+@router.websocket("/ws")
+async def websocket_events(websocket: WebSocket, token: str = Query(...), topics: Optional[str] = Query(None)):
+    # Browsers cannot set headers on a WebSocket handshake, so the access token comes as a query param
+    try:
+        topic_set = parse_topics(topics)
+        await run_in_threadpool(authenticate_socket, token)
+    except (HTTPException, ValueError):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    broker = get_broker()
+    subscription = broker.subscribe(topic_set)
+
+    async def send_events():
+        while True:
+            await websocket.send_json(await subscription.queue.get())
+
+    async def receive_commands():
+        # Clients adjust topics as they scroll: {"subscribe": [...]} / {"unsubscribe": [...]}
+        while True:
+            message = await websocket.receive_json()
+            try:
+                added = parse_topics(",".join(message.get("subscribe", [])))
+                removed = parse_topics(",".join(message.get("unsubscribe", [])))
+            except (AttributeError, TypeError, ValueError):
+                await websocket.send_json({"type": "error", "detail": "Invalid topics"})
+                continue
+            if len(subscription.topics | added) > MAX_TOPICS:
+                await websocket.send_json({"type": "error", "detail": "Too many topics"})
+                continue
+            broker.add_topics(subscription, added)
+            broker.remove_topics(subscription, removed)
+
+    # Either side ending (usually a disconnect surfacing in receive) tears down both
+    tasks = [asyncio.create_task(send_events()), asyncio.create_task(receive_commands())]
+    try:
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        for task in done:
+            task.exception()  # Disconnects end the stream; retrieve so they are not logged as unhandled
+    finally:
+        broker.unsubscribe(subscription)
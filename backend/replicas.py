@@ -0,0 +1,98 @@
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from contextvars import ContextVar
+from typing import Optional
+import itertools
+import threading
+import time
+import os
+
+from database import engine, replica_engines
+from dbpool import check_admission
+
+
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", 30))
+READ_YOUR_WRITES_SECONDS = int(os.getenv("READ_YOUR_WRITES_SECONDS", 5))
+READ_PRIMARY_COOKIE = "read_primary"
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+# POST routes that only read (their body carries the query)
+READ_ONLY_PATHS = {"/batch"}
+
+# Set per request by ReadYourWritesMiddleware
+read_from_primary: ContextVar[bool] = ContextVar("read_from_primary", default=False)
+
+
+# Round-robin over replica engines, skipping any that failed recently
+class ReplicaRouter:
+    def __init__(self, engines: list):
+        self.engines = engines
+        self._cycle = itertools.cycle(range(len(engines))) if engines else None
+        self._unhealthy_until = {}
+        self._lock = threading.Lock()
+
+    def choose(self):
+        if not self.engines:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            for _ in range(len(self.engines)):
+                candidate = self.engines[next(self._cycle)]
+                if self._unhealthy_until.get(candidate, 0) <= now:
+                    return candidate
+        return None
+
+    def mark_unhealthy(self, replica):
+        with self._lock:
+            self._unhealthy_until[replica] = time.monotonic() + REPLICA_RETRY_SECONDS
+
+
+replica_router = ReplicaRouter(replica_engines)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+
+def new_read_session() -> Session:
+    # Primary when there are no healthy replicas or the client just wrote
+    if not read_from_primary.get():
+        replica = replica_router.choose()
+        if replica is not None:
+            check_admission(replica)
+            db = ReadSessionLocal(bind=replica)
+            try:
+                db.connection()  # Checkout runs the pre-ping
+                return db
+            except DBAPIError:
+                db.close()
+                replica_router.mark_unhealthy(replica)
+    check_admission(engine)
+    return ReadSessionLocal(bind=engine)
+
+
+# Pins a client's reads to the primary for a short window after any successful write,
+# via a cookie so the pin holds across workers.
+class ReadYourWritesMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        is_write = scope["method"] not in SAFE_METHODS and scope["path"] not in READ_ONLY_PATHS
+        token = read_from_primary.set(is_write or READ_PRIMARY_COOKIE in HTTPConnection(scope).cookies)
+
+        async def send_wrapper(message):
+            if is_write and message["type"] == "http.response.start" and message["status"] < 400:
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "set-cookie",
+                    f"{READ_PRIMARY_COOKIE}=1; Max-Age={READ_YOUR_WRITES_SECONDS}; Path=/; HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            read_from_primary.reset(token)
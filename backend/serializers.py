@@ -0,0 +1,79 @@
+from fastapi.responses import JSONResponse
+from typing import Optional
+import json
+
+from utils import to_utc
+
+try:
+    import orjson
+except ImportError:  # Optional speedup; falls back to the stdlib encoder
+    orjson = None
+
+
+# Response class for trusted, already-shaped payloads built by the card helpers below.
+# Returning it from a route skips FastAPI's response_model validation and jsonable_encoder
+# pass (response_model stays on the route for the OpenAPI schema).
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+    return json.dumps(content, default=_json_default, separators=(",", ":")).encode("utf-8")
+
+
+def _json_default(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat().replace("+00:00", "Z")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+# Cards carry every field of their response model so the fast path matches the validated shape
+def user_card(user, is_following: Optional[bool] = None, follows_you: Optional[bool] = None) -> dict:
+    profile = user.profile
+    return {
+        "user_id": user.id,
+        "username": user.username,
+        "full_name": None,
+        "bio": None,
+        "avatar_url": profile.avatar_url if profile else None,
+        "followers_count": None,
+        "following_count": None,
+        "posts_count": None,
+        "is_following": is_following,
+        "follows_you": follows_you,
+    }
+
+
+def post_card(post, is_liked: bool, is_following: Optional[bool] = None, is_saved: Optional[bool] = None) -> dict:
+    return {
+        "post_id": post.id,
+        "user": user_card(post.user, is_following),
+        "created_at": to_utc(post.created_at),
+        "caption": post.caption,
+        "image_url": post.image_url,
+        "location": {
+            "name": post.location_name,
+            "longitude": post.longitude,
+            "latitude": post.latitude
+        },
+        "is_liked": is_liked,
+        "is_saved": is_saved,
+        "likes_count": post.likes_count,
+        "comments_count": post.comments_count,
+        "width": post.width,
+        "height": post.height,
+    }
+
+
+def comment_card(comment, is_liked: bool) -> dict:
+    return {
+        "comment_id": comment.id,
+        "user": user_card(comment.user),
+        "created_at": to_utc(comment.created_at),
+        "content": comment.content,
+        "likes_count": comment.likes_count,
+        "is_liked": is_liked,
+    }
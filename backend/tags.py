@@ -0,0 +1,221 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import func, insert, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from collections import defaultdict
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+import unicodedata
+import re
+
+from database import AuthUser, Post, PostMention, PostTag, Tag, keyset_value
+from auth import get_read_db, get_current_read_user, oauth_2_scheme
+from notifications import notify
+from serializers import FastJSONResponse, post_card
+from engagement import engagement_cache
+from utils import encode_cursor, decode_cursor
+import models
+
+
+MAX_TAGS_PER_POST = 30
+MAX_MENTIONS_PER_POST = 20
+# A tag or mention starts at a word boundary: "a#b" and "me@mail.com" are neither
+TAG_PATTERN = re.compile(r"(?<![\w#&])#(\w{1,64})")
+MENTION_PATTERN = re.compile(r"(?<![\w@])@([\w.]{1,64})")
+
+
+# ---------------------------
+# Caption parsing
+# ---------------------------
+def normalize_tag(tag: str) -> str:
+    # "#Café" and "#café" are the same tag
+    return unicodedata.normalize("NFKC", tag.lstrip("#")).casefold()
+
+
+def extract_tags(caption: Optional[str]) -> List[str]:
+    tags = []
+    for match in TAG_PATTERN.finditer(caption or ""):
+        tag = normalize_tag(match.group(1))
+        if tag.isdigit() or tag in tags:  # "#1" is a number, not a tag
+            continue
+        tags.append(tag)
+        if len(tags) == MAX_TAGS_PER_POST:
+            break
+    return tags
+
+
+def extract_mentions(caption: Optional[str]) -> List[str]:
+    usernames = []
+    for match in MENTION_PATTERN.finditer(caption or ""):
+        username = match.group(1).rstrip(".")  # "thanks @ana." ends a sentence
+        if username and username not in usernames:
+            usernames.append(username)
+            if len(usernames) == MAX_MENTIONS_PER_POST:
+                break
+    return usernames
+
+
+# ---------------------------
+# Index maintenance
+# ---------------------------
+def ensure_tags(db: Session, names: Iterable[str]):
+    names = set(names)
+    existing = set(db.scalars(select(Tag.name).where(Tag.name.in_(names))).all())
+    missing = [{"name": name, "posts_count": 0} for name in names - existing]
+    if not missing:
+        return
+    # Two posts may introduce the same tag at once; the loser's insert is a no-op
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        stmt = postgresql.insert(Tag).on_conflict_do_nothing(index_elements=["name"])
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(Tag).on_conflict_do_nothing(index_elements=["name"])
+    else:
+        stmt = insert(Tag)
+    db.execute(stmt, missing)
+
+
+def index_captions(db: Session, posts: List[Tuple[int, int, Optional[str], Optional[datetime]]], notify_mentions: bool = True):
+    # posts: (post_id, author_id, caption, created_at). created_at is None for posts created
+    # in this transaction (the index rows default to now()); imports pass the post's own.
+    # Links tags and mentions, and counts each tag once per post.
+    tag_rows, tag_increments = [], defaultdict(int)
+    mentions = {}
+    for post_id, author_id, caption, created_at in posts:
+        stamp = {"created_at": created_at} if created_at is not None else {}
+        for tag in extract_tags(caption):
+            tag_rows.append({"tag": tag, "post_id": post_id, **stamp})
+            tag_increments[tag] += 1
+        usernames = extract_mentions(caption)
+        if usernames:
+            mentions[post_id] = (author_id, usernames, stamp)
+
+    if tag_rows:
+        ensure_tags(db, tag_increments)
+        insert_rows(db, PostTag, tag_rows)
+        # One UPDATE per distinct increment; a single post only ever adds 1
+        by_increment = defaultdict(list)
+        for tag, n in tag_increments.items():
+            by_increment[n].append(tag)
+        for n, names in by_increment.items():
+            db.execute(
+                update(Tag)
+                .where(Tag.name.in_(names))
+                .values(posts_count=func.coalesce(Tag.posts_count, 0) + n)
+                .execution_options(synchronize_session=False)
+            )
+
+    if mentions:
+        wanted = {username for _, usernames, _ in mentions.values() for username in usernames}
+        user_ids = dict(db.execute(
+            select(AuthUser.username, AuthUser.id).where(AuthUser.username.in_(wanted), AuthUser.deleted_at.is_(None))
+        ).all())
+        mention_rows = []
+        for post_id, (author_id, usernames, stamp) in mentions.items():
+            for username in usernames:
+                if username in user_ids:
+                    mention_rows.append({"user_id": user_ids[username], "post_id": post_id, **stamp})
+                    if notify_mentions:
+                        notify(db, user_ids[username], author_id, "mention", post_id=post_id)
+        if mention_rows:
+            insert_rows(db, PostMention, mention_rows)
+
+
+def insert_rows(db: Session, model, rows: List[dict]):
+    # Executemany needs one key set per statement: rows with and without created_at
+    for stamped in (True, False):
+        batch = [row for row in rows if ("created_at" in row) == stamped]
+        if batch:
+            db.execute(insert(model), batch)
+
+
+def unindex_post_tags(db: Session, post_id: int):
+    # Soft-deleted posts leave their tag pages now; the purger drops the rows and recounts
+    db.execute(
+        update(Tag)
+        .where(Tag.name.in_(select(PostTag.tag).where(PostTag.post_id == post_id)), Tag.posts_count > 0)
+        .values(posts_count=Tag.posts_count - 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def recount_tags(db: Session, names):
+    # names: a collection of tag names or a select() of them
+    count = (
+        select(func.count())
+        .select_from(PostTag)
+        .join(Post, Post.id == PostTag.post_id)
+        .where(PostTag.tag == Tag.name, Post.deleted_at.is_(None))
+        .scalar_subquery()
+    )
+    db.execute(
+        update(Tag)
+        .where(Tag.name.in_(names))
+        .values(posts_count=count)
+        .execution_options(synchronize_session=False)
+    )
+
+
+router = APIRouter(
+    prefix="/tags",
+    tags=["tags"],
+    dependencies=[Depends(oauth_2_scheme)]  # all routes require auth; each one resolves its user
+)
+
+
+# ---------------------------
+# Posts with a tag (newest first)
+# ---------------------------
+@router.get("/{tag}", response_model=models.TagPostsResponse)
+def get_tag_posts(
+    tag: str,
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_read_db),
+    current_user: AuthUser = Depends(get_current_read_user)
+):
+    name = normalize_tag(tag)
+    existing_tag = db.get(Tag, name)
+    if not existing_tag:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tag not found")
+
+    # Page over the (tag, created_at, post_id) index alone
+    query = db.query(PostTag.created_at, PostTag.post_id).filter(PostTag.tag == name)
+    if cursor:
+        try:
+            last_created, last_post_id = decode_cursor(cursor, datetime, int)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        query = query.filter(tuple_(PostTag.created_at, PostTag.post_id) < tuple_(keyset_value(last_created), last_post_id))
+
+    # Fetch one extra row to know whether another page exists
+    entries = query.order_by(PostTag.created_at.desc(), PostTag.post_id.desc()).limit(limit + 1).all()
+    is_end = len(entries) <= limit
+    entries = entries[:limit]
+
+    next_cursor = None
+    if not is_end:
+        next_cursor = encode_cursor(*entries[-1])
+
+    # Hydrate the page in one query; soft-deleted posts are skipped until the purger drops their rows
+    post_ids = [post_id for _, post_id in entries]
+    posts_by_id = {
+        post.id: post
+        for post in db.query(Post)
+        .options(joinedload(Post.user).joinedload(AuthUser.profile))
+        .filter(Post.id.in_(post_ids), Post.deleted_at.is_(None))
+        .all()
+    }
+    liked_post_ids, saved_post_ids = engagement_cache.flags(db, current_user, post_ids)
+
+    result = [
+        post_card(posts_by_id[post_id], post_id in liked_post_ids, is_saved=post_id in saved_post_ids)
+        for post_id in post_ids if post_id in posts_by_id
+    ]
+    return FastJSONResponse({
+        "tag": name,
+        "posts_count": existing_tag.posts_count or 0,
+        "posts": result,
+        "isEnd": is_end,
+        "nextCursor": next_cursor,
+    })
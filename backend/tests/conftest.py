@@ -0,0 +1,37 @@
+# Tests run from backend/ (python -m pytest tests) against a scratch SQLite database
+import tempfile
+import sys
+import os
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}")
+os.environ.setdefault("RATE_LIMITS_ENABLED", "false")
+os.environ.setdefault("PURGER_ENABLED", "false")
+os.environ.setdefault("GMAPS_CLIENT", "fake")
+
+import uuid
+import pytest
+
+from database import AuthUser, Base, SessionLocal, engine
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(engine)
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def make_user(db):
+    # Committed accounts with unique names, so tests sharing the database never collide
+    def make() -> AuthUser:
+        name = uuid.uuid4().hex[:12]
+        user = AuthUser(email=f"{name}@example.com", username=name)
+        db.add(user)
+        db.commit()
+        return user
+    return make
@@ -0,0 +1,7 @@
+# The offline benchmarks build their own fake rows; keep them in step with the serializers
+import benchmark_serialization
+
+
+def test_serialization_benchmark_page_is_valid():
+    payload = benchmark_serialization.make_page()
+    assert benchmark_serialization.validated_path(payload) and benchmark_serialization.fast_path(payload)
@@ -0,0 +1,51 @@
+# Bulk import: records for unknown or deleted accounts are skipped, and post counts are
+# fixed for committed batches even when a later batch fails
+from argparse import Namespace
+from datetime import datetime, timezone
+import json
+import pytest
+
+from database import Post, UserProfile
+import bulk_posts
+from bulk_posts import PostImporter
+
+
+def test_skips_unknown_and_deleted_users(db, make_user):
+    live, deleted = make_user(), make_user()
+    deleted.deleted_at = datetime.now(timezone.utc)
+    db.commit()
+
+    importer = PostImporter(db, geocode=False)
+    importer.import_batch([
+        {"user_id": live.id, "image_url": "http://localhost/static/a.jpg"},
+        {"user_id": deleted.id, "image_url": "http://localhost/static/b.jpg"},
+        {"user_id": 10_000_000, "image_url": "http://localhost/static/c.jpg"},
+        {"username": deleted.username, "image_url": "http://localhost/static/d.jpg"},
+        {"username": live.username, "image_url": "http://localhost/static/e.jpg"},
+    ])
+    assert (importer.inserted, importer.skipped) == (2, 3)
+    assert db.query(Post).filter(Post.user_id == deleted.id).count() == 0
+
+
+def test_counts_fixed_when_a_later_batch_fails(db, make_user, tmp_path, monkeypatch):
+    user = make_user()
+    db.add(UserProfile(user_id=user.id, posts_count=0))
+    db.commit()
+    path = tmp_path / "posts.jsonl"
+    path.write_text("\n".join(
+        json.dumps({"user_id": user.id, "image_url": f"http://localhost/static/{i}.jpg"}) for i in range(3)
+    ))
+
+    import_batch = PostImporter.import_batch
+
+    def fail_second(self, batch):
+        if self.inserted:
+            raise RuntimeError("disk full")
+        import_batch(self, batch)
+    monkeypatch.setattr(PostImporter, "import_batch", fail_second)
+
+    args = Namespace(path=str(path), format="jsonl", batch_size=2, no_geocode=True)
+    with pytest.raises(RuntimeError):
+        bulk_posts.run_import(args)
+    db.expire_all()
+    assert db.get(UserProfile, user.id).posts_count == 2
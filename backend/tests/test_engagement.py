@@ -0,0 +1,49 @@
+# Engagement cache memory budget, with snapshots built in memory instead of loaded
+import pytest
+
+from database import AuthUser
+import engagement
+from engagement import EngagementCache, PostIdSet, ViewerEngagement
+
+
+@pytest.fixture(autouse=True)
+def fake_loader(monkeypatch):
+    # Viewer n has liked n * 10 posts and saved none
+    def load(db, user_id, version):
+        liked = PostIdSet(list(range(user_id * 10, 0, -1)), engagement.ENGAGEMENT_RECENT_LIMIT)
+        return ViewerEngagement(version, liked, PostIdSet([], engagement.ENGAGEMENT_RECENT_LIMIT))
+    monkeypatch.setattr(engagement, "load_engagement", load)
+
+
+def viewer(user_id: int) -> AuthUser:
+    return AuthUser(id=user_id, engagement_version=0)
+
+
+def test_evicts_least_recent_viewers_over_the_id_budget():
+    cache = EngagementCache(max_entries=100, max_ids=60)
+    for user_id in (1, 2, 3):  # 10 + 20 + 30 IDs
+        cache.get(None, viewer(user_id))
+    cache.get(None, viewer(1))  # Now the most recent
+    cache.get(None, viewer(4))  # 60 + 40 is over budget: drops 2, then 3
+    assert list(cache._entries) == [1, 4]
+    assert cache._ids == 50
+
+
+def test_entry_cap_still_applies():
+    cache = EngagementCache(max_entries=2, max_ids=10_000)
+    for user_id in (1, 2, 3):
+        cache.get(None, viewer(user_id))
+    assert list(cache._entries) == [2, 3]
+    assert cache._ids == 50
+
+
+def test_recorded_changes_count_against_the_budget():
+    cache = EngagementCache(max_entries=100, max_ids=31)
+    cache.get(None, viewer(1))
+    cache.get(None, viewer(2))
+    cache.record(2, "saved", 500, added=True, old_version=0)
+    assert cache._ids == 31
+    cache.record(2, "saved", 501, added=True, old_version=1)
+    assert list(cache._entries) == [2] and cache._ids == 22
+    cache.record(2, "liked", 5, added=False, old_version=2)
+    assert cache._ids == 21
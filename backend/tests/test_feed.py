@@ -0,0 +1,73 @@
+# Feed ranking: top-author selection, and the cursor that pins a ranking across pages
+from datetime import datetime, timedelta, timezone
+import pytest
+
+from database import AuthUser, UserAffinity
+from utils import encode_cursor
+import feed_ranking
+import posts
+
+
+def test_top_authors_are_picked_after_decay(db, make_user, monkeypatch):
+    monkeypatch.setattr(feed_ranking, "FEED_TOP_AUTHORS", 1)
+    viewer, stale, fresh = make_user(), make_user(), make_user()
+    now = datetime.now(timezone.utc)
+    year_ago = now - timedelta(days=365)
+    # A large score from a year ago decays below a small one from today
+    db.add_all([
+        UserAffinity(viewer_id=viewer.id, author_id=stale.id, score=10.0 * feed_ranking.epoch_weight(year_ago), updated_at=year_ago),
+        UserAffinity(viewer_id=viewer.id, author_id=fresh.id, score=2.0 * feed_ranking.epoch_weight(now), updated_at=now),
+    ])
+    db.commit()
+
+    assert feed_ranking.top_affinities(db, viewer.id, now) == {fresh.id: pytest.approx(2.0)}
+
+
+def test_affinity_accumulates_and_never_goes_negative(db, make_user):
+    viewer, author = make_user(), make_user()
+    events = [{"viewer_id": viewer.id, "author_id": author.id, "delta": delta} for delta in (1.0, 2.0)]
+    feed_ranking.apply_affinity(db, events)
+    feed_ranking.apply_affinity(db, events[:1])  # The pair exists now: updated in place
+    db.commit()
+    now = datetime.now(timezone.utc)
+    assert feed_ranking.top_affinities(db, viewer.id, now) == {author.id: pytest.approx(4.0)}
+
+    feed_ranking.apply_affinity(db, [{"viewer_id": viewer.id, "author_id": author.id, "delta": -10.0}])
+    db.commit()
+    assert db.get(UserAffinity, (viewer.id, author.id)).score == 0.0
+    assert feed_ranking.top_affinities(db, viewer.id, now) == {}
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-a-cursor",
+    encode_cursor(7, -1),
+    encode_cursor("x", 0),
+    encode_cursor([1, 2, 3], 0),
+])
+def test_rejects_bad_cursors(cursor):
+    with pytest.raises(ValueError):
+        posts.decode_feed_cursor(cursor)
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 5, 1, 12, 0, 0)
+    assert posts.decode_feed_cursor(encode_cursor(7, 1)) == (7, 1, None)
+    assert posts.decode_feed_cursor(encode_cursor(7, 1, created_at, 9)) == (7, None, [1, created_at, 9])
+
+
+def test_cursor_pages_keep_their_snapshot(monkeypatch):
+    rankings = iter([[3, 2, 1], [9, 8, 7], [6, 5, 4]])
+    monkeypatch.setattr(feed_ranking, "rank_feed", lambda db, viewer_id: (next(rankings), set()))
+    cache = feed_ranking.FeedCache(ttl=60, max_entries=10)
+    viewer = AuthUser(id=1, feed_version=0)
+
+    first_id, first = cache.latest(None, viewer)
+    assert cache.latest(None, viewer)[0] == first_id  # Reused within the TTL
+    viewer.feed_version = 1  # A follow re-ranks the next first page...
+    second_id, second = cache.latest(None, viewer)
+    assert second_id != first_id and second.ranked_ids == [9, 8, 7]
+    # ...while a scroll that started earlier stays on its own ranking
+    assert cache.pinned(None, viewer, first_id).ranked_ids == [3, 2, 1]
+    # An unknown snapshot (another worker's) is ranked once, then kept under its id
+    assert cache.pinned(None, viewer, 12345).ranked_ids == [6, 5, 4]
+    assert cache.pinned(None, viewer, 12345).ranked_ids == [6, 5, 4]
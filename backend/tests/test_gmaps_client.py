@@ -0,0 +1,45 @@
+# The geocoder client is chosen on first use, from the environment as it is then
+import pytest
+
+import utils
+
+
+@pytest.fixture(autouse=True)
+def fresh_client(monkeypatch):
+    monkeypatch.setattr(utils, "_gmaps_client", None)
+
+
+def test_setting_read_after_import(monkeypatch):
+    monkeypatch.setenv("GMAPS_CLIENT", "fake")
+    from fake_gmaps import FakeGoogleMapsClient
+    assert isinstance(utils.get_gmaps_client(), FakeGoogleMapsClient)
+
+
+def test_rejects_unknown_client(monkeypatch):
+    monkeypatch.setenv("GMAPS_CLIENT", "bing")
+    with pytest.raises(ValueError):
+        utils.get_gmaps_client()
+
+
+def test_missing_key_is_its_own_error(monkeypatch):
+    monkeypatch.setenv("GMAPS_CLIENT", "google")
+    monkeypatch.setenv("GOOGLE_API", "")
+    with pytest.raises(utils.MissingApiKeyError):
+        utils.get_gmaps_client()
+
+
+def test_geocoder_warns_once_without_a_key(monkeypatch, caplog):
+    from geocoder import GoogleGeocodingProvider
+    monkeypatch.setenv("GMAPS_CLIENT", "google")
+    monkeypatch.setenv("GOOGLE_API", "")
+    provider = GoogleGeocodingProvider()
+    assert provider.reverse(48.85, 2.35) is None
+    assert provider.reverse(48.85, 2.35) is None
+    assert [r.levelname for r in caplog.records if r.name == "geocoder"] == ["WARNING"]
+
+
+def test_geocoder_raises_on_a_misconfigured_client(monkeypatch):
+    from geocoder import GoogleGeocodingProvider
+    monkeypatch.setenv("GMAPS_CLIENT", "bing")
+    with pytest.raises(ValueError):
+        GoogleGeocodingProvider().reverse(48.85, 2.35)
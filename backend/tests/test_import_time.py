@@ -0,0 +1,36 @@
+# Cold-start budget: importing the app must stay cheap and must not pull in modules that
+# are only needed on first use (the geocoder client) or by the process launcher.
+import subprocess
+import json
+import sys
+import os
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", 3.0))
+LAZY_MODULES = ("googlemaps", "fake_gmaps", "uvicorn")
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import main
+print(json.dumps({"seconds": time.perf_counter() - start, "modules": sorted(sys.modules)}))
+"""
+
+
+def import_main() -> dict:
+    env = {**os.environ, "GOOGLE_API": ""}
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_import_main_within_budget():
+    # Best of three, so a cold disk cache on the first run does not fail the suite
+    seconds = min(import_main()["seconds"] for _ in range(3))
+    assert seconds < IMPORT_BUDGET_SECONDS, f"import main took {seconds:.2f}s (budget {IMPORT_BUDGET_SECONDS}s)"
+
+
+def test_import_main_defers_heavy_modules():
+    modules = {name.split(".")[0] for name in import_main()["modules"]}
+    assert not modules.intersection(LAZY_MODULES)
@@ -0,0 +1,62 @@
+# Keyset paging over imported rows: posts stamped from Python land in the same second,
+# and every page must pick up exactly where the last one stopped
+import json
+import uuid
+import pytest
+from sqlalchemy import text
+
+from database import AuthUser, Post, PostTag, engine, normalize_sqlite_timestamps
+from bulk_posts import PostImporter
+import tags
+
+
+def import_posts(db, user: AuthUser, tag: str, count: int):
+    # One second, a different microsecond per post
+    PostImporter(db, geocode=False).import_batch([
+        {
+            "user_id": user.id,
+            "image_url": f"http://localhost/static/{user.username}{i}.jpg",
+            "caption": f"#{tag}",
+            "created_at": f"2024-05-01T12:00:00.{i:06d}Z",
+        }
+        for i in range(count)
+    ])
+
+
+def test_tag_pages_cover_same_second_posts(db, make_user):
+    tag = "t" + uuid.uuid4().hex[:8]
+    user = make_user()
+    import_posts(db, user, tag, 5)
+
+    seen, cursor = [], None
+    while True:
+        response = tags.get_tag_posts(tag, cursor=cursor, limit=2, db=db, current_user=user)
+        page = json.loads(response.body)
+        seen += [post["post_id"] for post in page["posts"]]
+        cursor = page["nextCursor"]
+        if page["isEnd"]:
+            break
+
+    expected = db.query(PostTag.post_id).filter(PostTag.tag == tag).order_by(PostTag.post_id.desc()).all()
+    assert seen == [post_id for (post_id,) in expected]
+
+
+@pytest.mark.skipif(engine.dialect.name != "sqlite", reason="stored text format is SQLite's")
+def test_imported_timestamps_stored_like_server_defaults(db, make_user):
+    tag = "t" + uuid.uuid4().hex[:8]
+    user = make_user()
+    import_posts(db, user, tag, 1)
+    stored = db.execute(text("SELECT created_at FROM posts WHERE user_id = :user_id"), {"user_id": user.id}).scalar()
+    indexed = db.execute(text("SELECT created_at FROM post_tags WHERE tag = :tag"), {"tag": tag}).scalar()
+    assert stored == indexed == "2024-05-01 12:00:00"
+    assert db.get(Post, db.query(Post.id).filter(Post.user_id == user.id).scalar()).created_at.second == 0
+
+
+@pytest.mark.skipif(engine.dialect.name != "sqlite", reason="stored text format is SQLite's")
+def test_startup_normalizes_older_imports(db, make_user):
+    tag = "t" + uuid.uuid4().hex[:8]
+    import_posts(db, make_user(), tag, 1)
+    db.execute(text("UPDATE post_tags SET created_at = created_at || '.000123' WHERE tag = :tag"), {"tag": tag})
+    db.commit()
+    normalize_sqlite_timestamps()
+    assert db.execute(text("SELECT created_at FROM post_tags WHERE tag = :tag"), {"tag": tag}).scalar() == "2024-05-01 12:00:00"
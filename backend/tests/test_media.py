@@ -0,0 +1,116 @@
+# Upload header parsers, against minimal files built byte by byte for each format
+import struct
+import pytest
+
+from media import MediaError, inspect_media
+
+
+def jpeg(width: int, height: int, eoi: bool = True) -> bytes:
+    app0 = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00"
+    sof0 = b"\xff\xc0" + struct.pack(">HBHHB", 11, 8, height, width, 1) + b"\x01\x11\x00"
+    sos = b"\xff\xda" + struct.pack(">HB", 8, 1) + b"\x01\x00\x00\x3f\x00"
+    return b"\xff\xd8" + app0 + sof0 + sos + b"\x12\x34\x56" + (b"\xff\xd9" if eoi else b"")
+
+
+def png_chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + b"\x00\x00\x00\x00"
+
+
+def png(width: int, height: int, iend: bool = True) -> bytes:
+    ihdr = png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+    body = b"\x89PNG\r\n\x1a\n" + ihdr + png_chunk(b"IDAT", b"\x00" * 16)
+    return body + png_chunk(b"IEND", b"") if iend else body
+
+
+def webp(chunk: bytes, payload: bytes) -> bytes:
+    body = b"WEBP" + chunk + struct.pack("<I", len(payload)) + payload
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+
+def webp_vp8(width: int, height: int) -> bytes:
+    return webp(b"VP8 ", b"\x00\x00\x00\x9d\x01\x2a" + struct.pack("<HH", width, height) + b"\x00" * 4)
+
+
+def webp_vp8l(width: int, height: int) -> bytes:
+    bits = (width - 1) | ((height - 1) << 14)
+    return webp(b"VP8L", b"\x2f" + struct.pack("<I", bits) + b"\x00" * 4)
+
+
+def webp_vp8x(width: int, height: int) -> bytes:
+    return webp(b"VP8X", b"\x00" * 4 + (width - 1).to_bytes(3, "little") + (height - 1).to_bytes(3, "little"))
+
+
+def tiff(width: int, height: int, endian: str = "<") -> bytes:
+    magic = b"II*\x00" if endian == "<" else b"MM\x00*"
+    entries = [
+        struct.pack(endian + "HHI", 256, 3, 1) + struct.pack(endian + "H", width) + b"\x00\x00",
+        struct.pack(endian + "HHII", 257, 4, 1, height),
+    ]
+    return magic + struct.pack(endian + "I", 8) + struct.pack(endian + "H", len(entries)) + b"".join(entries) + b"\x00" * 4
+
+
+def box(kind: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I", 8 + len(payload)) + kind + payload
+
+
+def mp4(width: int, height: int, seconds: int, timescale: int = 1000) -> bytes:
+    mvhd = box(b"mvhd", b"\x00" * 12 + struct.pack(">II", timescale, seconds * timescale) + b"\x00" * 80)
+    tkhd = box(b"tkhd", b"\x00" * 76 + struct.pack(">II", width << 16, height << 16))
+    moov = box(b"moov", mvhd + box(b"trak", tkhd))
+    return box(b"ftyp", b"isom\x00\x00\x02\x00") + moov + box(b"mdat", b"\x00" * 32)
+
+
+@pytest.mark.parametrize("content, content_type, size", [
+    (jpeg(640, 480), "image/jpeg", (640, 480)),
+    (png(300, 200), "image/png", (300, 200)),
+    (webp_vp8(320, 240), "image/webp", (320, 240)),
+    (webp_vp8l(1000, 750), "image/webp", (1000, 750)),
+    (webp_vp8x(4000, 3000), "image/webp", (4000, 3000)),
+    (tiff(800, 600, "<"), "image/tiff", (800, 600)),
+    (tiff(800, 600, ">"), "image/tiff", (800, 600)),
+    (mp4(1920, 1080, 30), "video/mp4", (1920, 1080)),
+])
+def test_reads_type_and_size(content, content_type, size):
+    info = inspect_media(content)
+    assert info["content_type"] == content_type
+    assert (info["width"], info["height"]) == size
+
+
+def test_mp4_duration():
+    assert inspect_media(mp4(1280, 720, 12, timescale=90000))["duration"] == 12
+
+
+@pytest.mark.parametrize("content", [
+    jpeg(640, 480, eoi=False),
+    jpeg(640, 480)[:40],
+    png(300, 200, iend=False),
+    webp_vp8(320, 240)[:-4],
+    tiff(800, 600)[:12],
+    mp4(1920, 1080, 30)[:-8],
+], ids=["jpeg-no-eoi", "jpeg-cut", "png-no-iend", "webp-cut", "tiff-cut", "mp4-cut"])
+def test_rejects_truncated(content):
+    with pytest.raises(MediaError):
+        inspect_media(content)
+
+
+@pytest.mark.parametrize("content", [
+    b"GIF89a" + b"\x00" * 32,
+    b"\xff\xd8\xff" + b"\x00" * 32,
+    b"\x89PNG\r\n\x1a\n" + png_chunk(b"tEXt", b"x" * 13),
+    webp(b"VP8 ", b"\x00" * 10),
+    box(b"ftyp", b"isom\x00\x00\x02\x00") + box(b"mdat", b"\x00" * 8),
+], ids=["unknown", "jpeg-garbage", "png-no-ihdr", "webp-bad-frame", "mp4-no-moov"])
+def test_rejects_malformed(content):
+    with pytest.raises(MediaError):
+        inspect_media(content)
+
+
+@pytest.mark.parametrize("content, message", [
+    (png(20000, 10), "Image dimensions too large"),
+    (webp_vp8x(10000, 10000), "Image dimensions too large"),
+    (jpeg(0, 480), "Invalid dimensions"),
+    (mp4(640, 360, 600), "Video too long"),
+])
+def test_enforces_limits(content, message):
+    with pytest.raises(MediaError, match=message):
+        inspect_media(content)
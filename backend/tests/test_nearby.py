@@ -0,0 +1,76 @@
+# Adaptive geohash ring for the nearby feed, against post_locations rows inserted directly
+import geohash
+import pytest
+
+from database import Post, PostLocation, geo_region
+import posts
+import users
+
+VIEWER = "u4pruydq"
+TARGET = 5  # select_nearby_candidates narrows above TARGET * NEARBY_DENSE_FACTOR
+
+
+@pytest.fixture(autouse=True)
+def locations(db, monkeypatch):
+    monkeypatch.setattr(posts, "NEARBY_DENSE_FACTOR", 4)
+    monkeypatch.setattr(posts, "NEARBY_MAX_PROBES", 8)
+    db.query(PostLocation).delete()
+    db.commit()
+    yield
+    db.query(PostLocation).delete()
+    db.commit()
+
+
+def far_cell() -> str:
+    # A precision-3 cell inside the viewer's precision-2 ring but outside its precision-3 one
+    ring = {VIEWER[:3], *geohash.neighbors(VIEWER[:3])}
+    return next(VIEWER[:2] + c for c in "0123456789bcdefghjkmnpqrstuvwxyz" if VIEWER[:2] + c not in ring)
+
+
+def add_locations(db, cell: str, n: int, first_id: int):
+    for post_id in range(first_id, first_id + n):
+        hash_ = cell + VIEWER[len(cell):]
+        db.add(PostLocation(geo_region=geo_region(hash_), post_id=post_id, geohash=hash_, user_id=1))
+    db.commit()
+
+
+def candidates(db, precision: int) -> set:
+    query = posts.select_nearby_candidates(db, VIEWER, precision, TARGET, None)
+    return {post_id for (post_id,) in query.all()}
+
+
+def test_sparse_area_widens_until_enough(db):
+    add_locations(db, far_cell(), 10, first_id=1)
+    assert candidates(db, 6) == set(range(1, 11))
+
+
+def test_dense_area_narrows_to_the_viewer(db):
+    add_locations(db, VIEWER, 10, first_id=1)
+    add_locations(db, far_cell(), 100, first_id=100)
+    assert candidates(db, 2) == set(range(1, 11))
+
+
+def test_narrowing_keeps_enough_candidates(db):
+    # The viewer's own cell has too few posts, so the dense outer ring is kept
+    add_locations(db, VIEWER, 3, first_id=1)
+    add_locations(db, far_cell(), 100, first_id=100)
+    assert len(candidates(db, 2)) == 103
+
+
+def test_probe_cap(db, monkeypatch):
+    monkeypatch.setattr(posts, "NEARBY_MAX_PROBES", 2)
+    add_locations(db, far_cell(), 10, first_id=1)
+    # Two probes only reach precision 5, which holds nothing
+    assert candidates(db, 6) == set()
+
+
+def test_deleted_account_leaves_the_location_index(db, make_user):
+    user = make_user()
+    post = Post(user_id=user.id, image_url="http://localhost/static/a.jpg", geoHash=VIEWER)
+    db.add(post)
+    db.flush()
+    db.add(PostLocation(geo_region=geo_region(VIEWER), post_id=post.id, geohash=VIEWER, user_id=user.id))
+    db.commit()
+
+    users.delete_account(db, user)
+    assert candidates(db, 8) == set()
@@ -0,0 +1,24 @@
+# In-memory rate limits are deployment-wide and split between worker processes
+from ratelimit import InMemoryRateLimitStore, RateLimit
+
+
+def burst(store: InMemoryRateLimitStore, limit: RateLimit) -> int:
+    allowed = 0
+    while not store.take([("ip:1", limit)]):
+        allowed += 1
+    return allowed
+
+
+def test_single_worker_gets_the_whole_limit():
+    assert burst(InMemoryRateLimitStore(), RateLimit(8, 1 / 3600)) == 8
+
+
+def test_limit_divided_between_workers():
+    store = InMemoryRateLimitStore(workers=4)
+    assert burst(store, RateLimit(8, 1 / 3600)) == 2
+    # Refill is shared out too: a full token per worker takes four times as long
+    assert store.take([("ip:1", RateLimit(8, 1 / 3600))]) > 3 * 3600
+
+
+def test_worker_share_never_below_one_request():
+    assert burst(InMemoryRateLimitStore(workers=8), RateLimit(3, 3 / 60)) == 1
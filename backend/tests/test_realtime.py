@@ -0,0 +1,44 @@
+# Realtime: broker selection per deployment, and the WebSocket handshake's account check
+from datetime import datetime, timezone
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from auth import create_access_token
+import realtime
+
+
+@pytest.fixture
+def broker_reset(monkeypatch):
+    monkeypatch.setattr(realtime, "_broker", None)
+
+
+def test_memory_broker_refused_with_several_workers(broker_reset, monkeypatch):
+    monkeypatch.setattr(realtime, "WEB_CONCURRENCY", 4)
+    monkeypatch.setenv("REALTIME_BROKER", "memory")
+    with pytest.raises(RuntimeError):
+        realtime.get_broker()
+
+
+def test_memory_broker_with_one_worker(broker_reset, monkeypatch):
+    monkeypatch.setattr(realtime, "WEB_CONCURRENCY", 1)
+    monkeypatch.delenv("REALTIME_BROKER", raising=False)
+    assert type(realtime.get_broker()) is realtime.InMemoryBroker
+
+
+def test_websocket_refuses_deleted_account(db, make_user):
+    live, deleted = make_user(), make_user()
+    deleted.deleted_at = datetime.now(timezone.utc)
+    db.commit()
+    app = FastAPI()
+    app.include_router(realtime.router)
+    client = TestClient(app)
+
+    url = "/realtime/ws?topics=post:1&token="
+    with client.websocket_connect(url + create_access_token({"sub": str(live.id)})):
+        pass
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with client.websocket_connect(url + create_access_token({"sub": str(deleted.id)})):
+            pass
+    assert closed.value.code == 1008
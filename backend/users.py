@@ -1,19 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status, Response
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status, Response
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import case, desc, select
-from utils import to_utc
+from sqlalchemy import and_, case, delete, desc, or_, select, tuple_, update
+from datetime import datetime, timezone
 
 from database import (
     AuthUser,
+    AuthRefreshToken,
     UserProfile,
     PostLike,
     CommentLike,
     Post,
     SavedPost,
     Comment,
-    Following
+    Following,
+    PostLocation,
+    PostMention,
+    PostTag,
+    keyset_value
 )
-from auth import get_db, get_current_user 
+from auth import get_db, get_read_db, get_current_user, get_current_read_user, oauth_2_scheme
+from loaders import get_user_loader
+from activity import record_activity
+from notifications import notify
+from serializers import FastJSONResponse, post_card, user_card
+from coalesce import coalesce_read
+from purger import purger
+from feed_ranking import bump_feed_version
+from engagement import engagement_cache
+from tags import recount_tags
+from etags import REVALIDATE_HEADERS, etag_matches, make_etag, posts_tag
+from utils import encode_cursor, decode_cursor
 import models
 from typing import List, Optional
 
@@ -21,7 +37,7 @@ from typing import List, Optional
 router = APIRouter(
     prefix="/users",
     tags=["users"],
-    dependencies=[Depends(get_current_user)]  # all routes require auth
+    dependencies=[Depends(oauth_2_scheme)]  # all routes require auth; each one resolves its user
 )
 
 
@@ -31,8 +47,8 @@ router = APIRouter(
 @router.get("/suggestions", response_model=models.SuggestedUserResponse)
 def get_user_suggestions(
     limit: int = Query(10, ge=1, le=100),
-    db: Session = Depends(get_db),
-    current_user: AuthUser = Depends(get_current_user)
+    db: Session = Depends(get_read_db),
+    current_user: AuthUser = Depends(get_current_read_user)
 ):
     # Subquery of users the current user is already following
     following_subquery = (
@@ -46,7 +62,7 @@ def get_user_suggestions(
         db.query(AuthUser)
         .options(joinedload(AuthUser.profile))
         .outerjoin(UserProfile, AuthUser.id == UserProfile.user_id)
-        .filter(AuthUser.id != current_user.id)
+        .filter(AuthUser.id != current_user.id, AuthUser.deleted_at.is_(None))
         .filter(~AuthUser.id.in_(select(following_subquery.c.following_id)))
         .order_by(UserProfile.followers_count.desc())
         .limit(limit)
@@ -95,6 +111,9 @@ def follow_user(data: models.FollowUserInput, db: Session = Depends(get_db), cur
     # Increment following count for both users
     current_user.profile.following_count += 1
     user_to_follow.profile.followers_count += 1
+    record_activity(db, current_user.id, "follow", target_user_id=user_to_follow.id)
+    notify(db, user_to_follow.id, current_user.id, "follow")
+    bump_feed_version(current_user)
 
     db.commit()
     return Response(status_code=status.HTTP_200_OK)
@@ -122,6 +141,8 @@ def unfollow_user(data: models.FollowUserInput, db: Session = Depends(get_db), c
         current_user.profile.following_count -= 1
     if user_to_unfollow.profile.followers_count > 0:
         user_to_unfollow.profile.followers_count -= 1
+    record_activity(db, current_user.id, "unfollow", target_user_id=user_to_unfollow.id)
+    bump_feed_version(current_user)
 
     db.commit()
     return Response(status_code=status.HTTP_200_OK)
@@ -158,39 +179,80 @@ def update_profile(
     }
 
 
+# ---------------------------
+# Delete own account
+# ---------------------------
+@router.post("/delete-account", status_code=status.HTTP_200_OK)
+def delete_account(db: Session = Depends(get_db), current_user: AuthUser = Depends(get_current_user)):
+    # Soft delete: the account and its posts disappear now, the purger removes the rows later.
+    # Their location entries go at once, as for a single post, so nearby probes stop counting them.
+    now = datetime.now(timezone.utc)
+    current_user.deleted_at = now
+    db.execute(
+        update(Post)
+        .where(Post.user_id == current_user.id, Post.deleted_at.is_(None))
+        .values(deleted_at=now)
+    )
+    db.execute(
+        delete(PostLocation)
+        .where(PostLocation.post_id.in_(select(Post.id).where(Post.user_id == current_user.id)))
+        .execution_options(synchronize_session=False)
+    )
+    recount_tags(db, select(PostTag.tag).join(Post, Post.id == PostTag.post_id).where(Post.user_id == current_user.id))
+    db.query(AuthRefreshToken).filter(AuthRefreshToken.user_id == current_user.id).delete()
+
+    db.commit()
+    purger.wake()
+    response = Response(status_code=status.HTTP_200_OK)
+    response.delete_cookie("refresh_token")
+    return response
+
+
 # ---------------------------
 # Get any user's profile
 # ---------------------------
 @router.get("/{username}", response_model=models.UserProfileResponse)
 def get_user_profile(
     username: str,
-    db: Session = Depends(get_db),
-    current_user: AuthUser = Depends(get_current_user)
+    request: Request = None,
+    db: Session = Depends(get_read_db),
+    current_user: AuthUser = Depends(get_current_read_user)
 ):
-    user = db.query(AuthUser).filter(AuthUser.username == username).first()
-    if not user:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    # Shared by identical concurrent requests; only is_following depends on the viewer
+    def fetch_profile():
+        user = get_user_loader(db).load(username)
+        if not user:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
-    profile = user.profile
-    if not profile:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+        profile = user.profile
+        if not profile:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+
+        return {
+            "user_id": user.id,
+            "username": user.username,
+            "full_name": profile.full_name,
+            "bio": profile.bio,
+            "avatar_url": profile.avatar_url,
+            "followers_count": profile.followers_count,
+            "following_count": profile.following_count,
+            "posts_count": profile.posts_count,
+        }
+
+    profile = coalesce_read(("user-profile", username), fetch_profile)
 
     is_following = db.query(Following).filter(
         Following.follower_id == current_user.id,
-        Following.following_id == user.id
+        Following.following_id == profile["user_id"]
     ).first() is not None
 
-    return {
-        "user_id": user.id,
-        "username": user.username,
-        "full_name": profile.full_name,
-        "bio": profile.bio,
-        "avatar_url": profile.avatar_url,
-        "followers_count": profile.followers_count,
-        "following_count": profile.following_count,
-        "posts_count": profile.posts_count,
-        "is_following": is_following,
-    }
+    # The body is one row and a key lookup, so the tag is the body itself
+    body = {**profile, "is_following": is_following}
+    etag = make_etag(*body.values(), "profile")
+    headers = {"ETag": etag, **REVALIDATE_HEADERS}
+    if etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return FastJSONResponse(body, headers=headers)
 
 
 # ---------------------------
@@ -201,14 +263,28 @@ def get_user_posts(
     username: str,
     offset: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=50),
-    db: Session = Depends(get_db),
-    current_user: AuthUser = Depends(get_current_user)
+    request: Request = None,
+    db: Session = Depends(get_read_db),
+    current_user: AuthUser = Depends(get_current_read_user)
 ):
     # Check if the user exists
-    existing_user = db.query(AuthUser).filter(AuthUser.username == username).first()
+    existing_user = get_user_loader(db).load(username)
     if not existing_user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
+    # The first page is what a re-opened profile asks for; revalidate it from one aggregate
+    # over the posts index instead of loading and serializing the page
+    headers = {}
+    if offset == 0:
+        avatar_url = existing_user.profile.avatar_url if existing_user.profile else None
+        etag = make_etag(
+            existing_user.id, *posts_tag(db, existing_user.id), avatar_url,
+            current_user.id, current_user.engagement_version or 0, "posts", limit
+        )
+        headers = {"ETag": etag, **REVALIDATE_HEADERS}
+        if etag_matches(request, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
     # Eager-load user and profile for posts created by the user
     posts = (
         db.query(Post)
@@ -216,7 +292,7 @@ def get_user_posts(
             joinedload(Post.user)
             .joinedload(AuthUser.profile)
         )
-        .filter(Post.user_id == existing_user.id)
+        .filter(Post.user_id == existing_user.id, Post.deleted_at.is_(None))
         .order_by(Post.created_at.desc())
         .offset(offset)
         .limit(limit)
@@ -224,116 +300,70 @@ def get_user_posts(
     )
 
     post_ids = [post.id for post in posts]
-    liked_post_ids = {
-        like.post_id
-        for like in db.query(PostLike).filter(
-            PostLike.user_id == current_user.id,
-            PostLike.post_id.in_(post_ids)
-        ).all()
-    }
-
-    result = []
-    for post in posts:
-        user = post.user
-        profile = user.profile
+    liked_post_ids, saved_post_ids = engagement_cache.flags(db, current_user, post_ids)
 
-        result.append({
-            "post_id": post.id,
-            "image_url": post.image_url,
-            "caption": post.caption,
-            "created_at": to_utc(post.created_at),
-            "likes_count": post.likes_count,
-            "comments_count": post.comments_count,
-            "location": {
-                "name": post.location_name,
-                "longitude": post.longitude,
-                "latitude": post.latitude
-            },
-            "is_liked": post.id in liked_post_ids,
-            "user": {
-                "user_id": user.id,
-                "username": user.username,
-                "avatar_url": profile.avatar_url if profile else None
-            }
-        })
+    result = [post_card(post, post.id in liked_post_ids, is_saved=post.id in saved_post_ids) for post in posts]
 
     # Determine if this is the last page
     is_end = len(posts) < limit
-    return {"posts": result, "isEnd": is_end}
+    return FastJSONResponse({"posts": result, "isEnd": is_end}, headers=headers)
 
 
 
-# ---------------------------
-# Get liked posts for a user
-# ---------------------------
-@router.get("/{username}/liked-posts", response_model=models.PaginatedPostsResponse)
-def get_liked_posts(
-    username: str,
-    offset: int = Query(0, ge=0),
-    limit: int = Query(10, ge=1, le=50),
-    db: Session = Depends(get_db),
-    current_user: AuthUser = Depends(get_current_user)
-):
-    # Check if the user exists
-    existing_user = db.query(AuthUser).filter(AuthUser.username == username).first()
+def list_post_collection(db: Session, collection, username: str, cursor: Optional[str], limit: int, viewer: AuthUser):
+    existing_user = get_user_loader(db).load(username)
     if not existing_user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
-    # Get posts this user has liked (with related post → user → profile)
-    liked_entries = (
-        db.query(PostLike)
-        .options(
-            joinedload(PostLike.post)
-            .joinedload(Post.user)
-            .joinedload(AuthUser.profile)
-        )
-        .filter(PostLike.user_id == existing_user.id)
-        .order_by(PostLike.created_at.desc())
-        .offset(offset)
-        .limit(limit)
+    # Page over the (user_id, created_at, post_id) index alone, newest first
+    query = db.query(collection.created_at, collection.post_id).filter(collection.user_id == existing_user.id)
+    if cursor:
+        try:
+            last_created, last_post_id = decode_cursor(cursor, datetime, int)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        query = query.filter(tuple_(collection.created_at, collection.post_id) < tuple_(keyset_value(last_created), last_post_id))
+
+    # Fetch one extra row to know whether another page exists
+    entries = query.order_by(collection.created_at.desc(), collection.post_id.desc()).limit(limit + 1).all()
+    is_end = len(entries) <= limit
+    entries = entries[:limit]
+
+    next_cursor = None
+    if not is_end:
+        next_cursor = encode_cursor(*entries[-1])
+
+    # Hydrate the page in one query; soft-deleted posts are skipped until the purger drops their rows
+    post_ids = [post_id for _, post_id in entries]
+    posts_by_id = {
+        post.id: post
+        for post in db.query(Post)
+        .options(joinedload(Post.user).joinedload(AuthUser.profile))
+        .filter(Post.id.in_(post_ids), Post.deleted_at.is_(None))
         .all()
-    )
-
-    post_ids = [like.post_id for like in liked_entries]
-
-    # Check which liked posts are also liked by the current user
-    liked_post_ids_by_current_user = {
-        like.post_id
-        for like in db.query(PostLike).filter(
-            PostLike.user_id == current_user.id,
-            PostLike.post_id.in_(post_ids)
-        ).all()
     }
 
-    result = []
-    for like in liked_entries:
-        post = like.post
-        user = post.user
-        profile = user.profile
+    liked_post_ids, saved_post_ids = engagement_cache.flags(db, viewer, post_ids)
 
-        result.append({
-            "post_id": post.id,
-            "image_url": post.image_url,
-            "caption": post.caption,
-            "created_at": to_utc(post.created_at),
-            "likes_count": post.likes_count,
-            "comments_count": post.comments_count,
-            "location": {
-                "name": post.location_name,
-                "longitude": post.longitude,
-                "latitude": post.latitude
-            },
-            "is_liked": post.id in liked_post_ids_by_current_user,
-            "user": {
-                "user_id": user.id,
-                "username": user.username,
-                "avatar_url": profile.avatar_url if profile else None
-            }
-        })
+    result = [
+        post_card(posts_by_id[post_id], post_id in liked_post_ids, is_saved=post_id in saved_post_ids)
+        for post_id in post_ids if post_id in posts_by_id
+    ]
+    return FastJSONResponse({"posts": result, "isEnd": is_end, "nextCursor": next_cursor})
 
-    # Determine if this is the last page
-    is_end = len(liked_entries) < limit
-    return {"posts": result, "isEnd": is_end}
+
+# ---------------------------
+# Get liked posts for a user
+# ---------------------------
+@router.get("/{username}/liked-posts", response_model=models.PaginatedPostsResponse)
+def get_liked_posts(
+    username: str,
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_read_db),
+    current_user: AuthUser = Depends(get_current_read_user)
+):
+    return list_post_collection(db, PostLike, username, cursor, limit, current_user)
 
 
 # ---------------------------
@@ -342,67 +372,109 @@ def get_liked_posts(
 @router.get("/{username}/saved-posts", response_model=models.PaginatedPostsResponse)
 def get_saved_posts(
     username: str,
-    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None),
     limit: int = Query(10, ge=1, le=50),
-    db: Session = Depends(get_db),
-    current_user: AuthUser = Depends(get_current_user)
+    db: Session = Depends(get_read_db),
+    current_user: AuthUser = Depends(get_current_read_user)
+):
+    return list_post_collection(db, SavedPost, username, cursor, limit, current_user)
+
+
+# ---------------------------
+# Get posts that mention a user
+# ---------------------------
+@router.get("/{username}/mentions", response_model=models.PaginatedPostsResponse)
+def get_mentions(
+    username: str,
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_read_db),
+    current_user: AuthUser = Depends(get_current_read_user)
 ):
-    existing_user = db.query(AuthUser).filter(AuthUser.username == username).first()
+    return list_post_collection(db, PostMention, username, cursor, limit, current_user)
+
+
+def list_follow_edges(db: Session, username: str, cursor: Optional[str], limit: int, viewer_id: int, followers: bool):
+    existing_user = get_user_loader(db).load(username)
     if not existing_user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
-    # Eager-load post, user, and profile for saved posts
-    saved_posts = (
-        db.query(SavedPost)
-        .options(
-            joinedload(SavedPost.post)
-            .joinedload(Post.user)
-            .joinedload(AuthUser.profile)
-        )
-        .filter(SavedPost.user_id == existing_user.id)
-        .order_by(SavedPost.created_at.desc())
-        .offset(offset)
-        .limit(limit)
-        .all()
-    )
+    # Followers: edges pointing at the user; following: edges leaving the user
+    if followers:
+        anchor_col, other_col = Following.following_id, Following.follower_id
+    else:
+        anchor_col, other_col = Following.follower_id, Following.following_id
 
-    # Gather post IDs to check for likes
-    post_ids = [saved.post_id for saved in saved_posts]
-    liked_post_ids = {
-        like.post_id
-        for like in db.query(PostLike).filter(
-            PostLike.user_id == current_user.id,
-            PostLike.post_id.in_(post_ids)
+    # Keyset on (created_at, other user id), served by the (anchor, created_at, other) index
+    query = (
+        db.query(Following.created_at, AuthUser)
+        .join(AuthUser, AuthUser.id == other_col)
+        .options(joinedload(AuthUser.profile))
+        .filter(anchor_col == existing_user.id, AuthUser.deleted_at.is_(None))
+    )
+    if cursor:
+        try:
+            last_created, last_id = decode_cursor(cursor, datetime, int)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        query = query.filter(tuple_(Following.created_at, other_col) < tuple_(keyset_value(last_created), last_id))
+
+    # Fetch one extra row to know whether another page exists
+    rows = query.order_by(Following.created_at.desc(), other_col.desc()).limit(limit + 1).all()
+    is_end = len(rows) <= limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if not is_end:
+        last_created, last_user = rows[-1]
+        next_cursor = encode_cursor(last_created, last_user.id)
+
+    # One query for both directions between the viewer and everyone on the page
+    user_ids = [user.id for _, user in rows]
+    viewer_follows, follows_viewer = set(), set()
+    if user_ids:
+        edges = db.query(Following.follower_id, Following.following_id).filter(
+            or_(
+                and_(Following.follower_id == viewer_id, Following.following_id.in_(user_ids)),
+                and_(Following.following_id == viewer_id, Following.follower_id.in_(user_ids)),
+            )
         ).all()
-    }
+        for follower_id, following_id in edges:
+            if follower_id == viewer_id:
+                viewer_follows.add(following_id)
+            if following_id == viewer_id:
+                follows_viewer.add(follower_id)
 
-    # Build the response
-    result = []
-    for saved in saved_posts:
-        post = saved.post
-        user = post.user
-        profile = user.profile
+    result = [
+        user_card(user, user.id in viewer_follows, user.id in follows_viewer)
+        for _, user in rows
+    ]
+    return FastJSONResponse({"users": result, "isEnd": is_end, "nextCursor": next_cursor})
 
-        result.append({
-            "post_id": post.id,
-            "image_url": post.image_url,
-            "caption": post.caption,
-            "created_at": to_utc(post.created_at),
-            "likes_count": post.likes_count,
-            "comments_count": post.comments_count,
-            "location": {
-                "name": post.location_name,
-                "longitude": post.longitude,
-                "latitude": post.latitude
-            },
-            "is_liked": post.id in liked_post_ids,
-            "user": {
-                "user_id": user.id,
-                "username": user.username,
-                "avatar_url": profile.avatar_url if profile else None
-            }
-        })
 
-    # Determine if this is the last page
-    is_end = len(saved_posts) < limit
-    return {"posts": result, "isEnd": is_end}
\ No newline at end of file
+# ---------------------------
+# Get a user's followers
+# ---------------------------
+@router.get("/{username}/followers", response_model=models.PaginatedUsersResponse)
+def get_followers(
+    username: str,
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(20, ge=1, le=50),
+    db: Session = Depends(get_read_db),
+    current_user: AuthUser = Depends(get_current_read_user)
+):
+    return list_follow_edges(db, username, cursor, limit, current_user.id, followers=True)
+
+
+# ---------------------------
+# Get users a user follows
+# ---------------------------
+@router.get("/{username}/following", response_model=models.PaginatedUsersResponse)
+def get_following(
+    username: str,
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(20, ge=1, le=50),
+    db: Session = Depends(get_read_db),
+    current_user: AuthUser = Depends(get_current_read_user)
+):
+    return list_follow_edges(db, username, cursor, limit, current_user.id, followers=False)
@@ -1,9 +1,8 @@
 from datetime import datetime, timezone
-import googlemaps
-from googlemaps import geocoding
 import os
 import math
-from dotenv import load_dotenv
+import json
+import base64
 
 
 DEFAULT_LOCATION = "Planet Earth"
@@ -12,12 +11,42 @@ PRIORITY_POI_TYPES = [
     "cafe", "restaurant", "transit_station", "airport", "food", "park"
 ]
 
-# Initialize Google Maps client
-if not os.getenv("GOOGLE_API"):
-    load_dotenv()
-gmaps_client = googlemaps.Client(key=os.getenv("GOOGLE_API"))
+# Google Maps client, built on first geocode so startup neither imports googlemaps
+# nor fails when GOOGLE_API is missing. GMAPS_CLIENT=fake swaps in the in-process
+# stand-in from fake_gmaps (no network or key; used for offline runs and load tests).
+# Both settings are read here rather than at import, after .env has been loaded.
+GMAPS_CLIENTS = ("google", "fake")
+_gmaps_client = None
 
 
+# The one configuration callers may fall back from: any other error building the client
+# (unknown GMAPS_CLIENT, malformed key) is a deployment mistake and propagates
+class MissingApiKeyError(ValueError):
+    pass
+
+
+def get_gmaps_client():
+    global _gmaps_client
+    if _gmaps_client is not None:
+        return _gmaps_client
+
+    if not os.getenv("GMAPS_CLIENT") or not os.getenv("GOOGLE_API"):
+        from dotenv import load_dotenv
+        load_dotenv()
+    kind = os.getenv("GMAPS_CLIENT", "google")
+    if kind not in GMAPS_CLIENTS:
+        raise ValueError(f"Unsupported Google Maps client: {kind}")
+
+    if kind == "fake":
+        from fake_gmaps import FakeGoogleMapsClient
+        _gmaps_client = FakeGoogleMapsClient()
+    else:
+        if not os.getenv("GOOGLE_API"):
+            raise MissingApiKeyError("GOOGLE_API is not set")
+        import googlemaps
+        _gmaps_client = googlemaps.Client(key=os.getenv("GOOGLE_API"))
+    return _gmaps_client
+
 
 def to_utc(dt: datetime) -> datetime:
     if dt.tzinfo is None:
@@ -25,6 +54,26 @@ def to_utc(dt: datetime) -> datetime:
     return dt.astimezone(timezone.utc)
 
 
+def encode_cursor(*values) -> str:
+    # Opaque keyset cursor: the sort key of the last row on a page
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str, *types) -> tuple:
+    # Raises ValueError when the cursor is malformed or does not match the expected key shape
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        if not isinstance(payload, list) or len(payload) != len(types):
+            raise ValueError("Invalid cursor")
+        return tuple(
+            datetime.fromisoformat(value) if type_ is datetime else type_(value)
+            for value, type_ in zip(payload, types)
+        )
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
 def extract_display_location(address_components):
     def get_component(types_to_check):
         if isinstance(types_to_check, str):
@@ -60,8 +109,8 @@ def extract_display_location(address_components):
         return DEFAULT_LOCATION
 
 
-def get_location_name_from_coords(lat: float, lng: float) -> str:
-    results = geocoding.reverse_geocode(gmaps_client, (lat, lng))
+def display_location_from_results(results) -> str:
+    # Picks a display name from a Google reverse-geocode response
     if not results:
         return DEFAULT_LOCATION
 
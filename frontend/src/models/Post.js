@@ -11,8 +11,11 @@ export class Post {
     this.location = new Location(data.location || {});
 
     this.is_liked = data.is_liked || false;
+    this.is_saved = data.is_saved || false;
     this.likes_count = data.likes_count || 0;
     this.comments_count = data.comments_count || 0;
+    this.width = data.width || null;
+    this.height = data.height || null;
   }
 
   get displayName() {
@@ -28,6 +31,7 @@ export class Post {
       image_url: "${this.image_url}",
       location: ${this.location.toString()},
       is_liked: ${this.is_liked},
+      is_saved: ${this.is_saved},
       likes_count: ${this.likes_count},
       comments_count: ${this.comments_count}
     }`;
@@ -28,23 +28,28 @@ export const useUserProfileAPI = (username) => {
 /**
  * Factory for creating infinite queries for user posts, liked posts, or saved posts.
  * @param {string} endpoint_type - The type of posts endpoint ("posts", "liked-posts", "saved-posts").
+ * @param {boolean} cursorPaged - Whether the endpoint pages by cursor instead of offset.
  * @returns {function} Hook for fetching paginated posts for a user.
  */
-const createUserPostsQuery = (endpoint_type) => {
+const createUserPostsQuery = (endpoint_type, cursorPaged = false) => {
   return (username) =>
     useInfiniteQuery({
       queryKey: [endpoint_type, username],
-      queryFn: async ({ pageParam = 0 }) => {
+      queryFn: async ({ pageParam = cursorPaged ? null : 0 }) => {
+        const pageQuery = cursorPaged
+          ? (pageParam ? `&cursor=${encodeURIComponent(pageParam)}` : "")
+          : `&offset=${pageParam}`;
         const res = await apiFetch(
-          `/users/${username}/${endpoint_type}?offset=${pageParam}&limit=${POSTS_LIMIT}`
+          `/users/${username}/${endpoint_type}?limit=${POSTS_LIMIT}${pageQuery}`
         );
+        const nextPage = cursorPaged ? res.nextCursor : pageParam + POSTS_LIMIT;
         return {
           posts: res.posts.map((postData) => new Post(postData)),
-          nextOffset: res.isEnd ? null : pageParam + POSTS_LIMIT,
+          nextPage: res.isEnd ? null : nextPage,
           isEnd: res.isEnd,
         };
       },
-      getNextPageParam: (lastPage) => lastPage.nextOffset,
+      getNextPageParam: (lastPage) => lastPage.nextPage,
       enabled: !!username,
     });
 };
@@ -61,14 +66,14 @@ export const useUserPostsAPI = createUserPostsQuery("posts");
  * @param {string} username - The username of the user.
  * @returns {object} React Query useInfiniteQuery result containing Post instances.
  */
-export const useLikedUserPostsAPI = createUserPostsQuery("liked-posts");
+export const useLikedUserPostsAPI = createUserPostsQuery("liked-posts", true);
 
 /** 
  * Fetches posts saved by a user.
  * @param {string} username - The username of the user.
  * @returns {object} React Query useInfiniteQuery result containing Post instances.
  */
-export const useSavedUserPostsAPI = createUserPostsQuery("saved-posts");
+export const useSavedUserPostsAPI = createUserPostsQuery("saved-posts", true);
 
 /**
  * Fetches user suggestions for following.
@@ -93,15 +98,16 @@ export const useUserSuggestionsAPI = () => {
 export const usePostCommentsAPI = (postId, enabled=false) => {
   return useInfiniteQuery({
     queryKey: ["post-comments", postId],
-    queryFn: async ({ pageParam = 0 }) => {
-      const res = await apiFetch(`/posts/${postId}/comments?offset=${pageParam}&limit=${COMMENTS_LIMIT}`);
+    queryFn: async ({ pageParam = null }) => {
+      const cursorParam = pageParam ? `&cursor=${encodeURIComponent(pageParam)}` : "";
+      const res = await apiFetch(`/posts/${postId}/comments?limit=${COMMENTS_LIMIT}${cursorParam}`);
       return {
         comments: res.comments.map((commentData) => new Comment(commentData)),
-        nextOffset: res.isEnd ? null : pageParam + COMMENTS_LIMIT,
+        nextCursor: res.isEnd ? null : res.nextCursor,
         isEnd: res.isEnd,
       };
     },
-    getNextPageParam: (lastPage) => lastPage.nextOffset,
+    getNextPageParam: (lastPage) => lastPage.nextCursor,
     enabled: !!postId && enabled,
   });
 };
@@ -113,15 +119,16 @@ export const usePostCommentsAPI = (postId, enabled=false) => {
 export const usePostFeedAPI = () => {
   return useInfiniteQuery({
     queryKey: ["post-feed"],
-    queryFn: async ({ pageParam = 0 }) => {
-      const res = await apiFetch(`/posts/feed?offset=${pageParam}&limit=${FEED_LIMIT}`);
+    queryFn: async ({ pageParam = null }) => {
+      const cursorParam = pageParam ? `&cursor=${encodeURIComponent(pageParam)}` : "";
+      const res = await apiFetch(`/posts/feed?limit=${FEED_LIMIT}${cursorParam}`);
       return {
         posts: res.posts.map((postData) => new Post(postData)),
-        nextOffset: res.isEnd ? null : pageParam + FEED_LIMIT,
+        nextCursor: res.isEnd ? null : res.nextCursor,
         isEnd: res.isEnd,
       };
     },
-    getNextPageParam: (lastPage) => lastPage.nextOffset,
+    getNextPageParam: (lastPage) => lastPage.nextCursor,
   });
 };
 